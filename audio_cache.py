@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "AUDIO_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "audiobook-ai-agent", "audio")
+)
+DEFAULT_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "2048"))
+
+class AudioCache:
+    """Persistent, content-addressed cache of synthesized audio chunks."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size_mb=DEFAULT_CACHE_MAX_MB):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._size = None
+        # Use counts of files that running jobs still have to read
+        self._pinned = {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, voice_id, format="mp3", quality="high"):
+        """
+        Build the cache key for a chunk of text and its synthesis settings.
+
+        Whitespace is normalized first, so the same sentence extracted with
+        different line breaks maps to the same entry.
+
+        Args:
+            text (str): Text of the chunk
+            voice_id (str): Voice ID used for synthesis
+            format (str): Audio format
+            quality (str): Synthesis quality
+
+        Returns:
+            str: Hex digest identifying the audio
+        """
+        normalized = " ".join(text.split())
+        payload = json.dumps([normalized, voice_id, format, quality], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get_path(self, key, pin=False):
+        """
+        Look up a cached entry and mark it as recently used.
+
+        Args:
+            key (str): Cache key from make_key()
+            pin (bool): Also pin the entry (see pin()), in the same step so
+                no other thread can evict it in between
+
+        Returns:
+            str: Path to the cached audio file, or None on a miss
+        """
+        path = self._path_for(key)
+        with self._lock:
+            try:
+                os.utime(path, None)
+            except OSError:
+                return None
+            if pin:
+                self._pinned[path] = self._pinned.get(path, 0) + 1
+        return path
+
+    def get(self, key):
+        """
+        Read cached audio bytes.
+
+        Args:
+            key (str): Cache key from make_key()
+
+        Returns:
+            bytes: Cached audio data, or None on a miss
+        """
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data, pin=False):
+        """
+        Store audio bytes under a key, evicting old entries if needed.
+
+        Args:
+            key (str): Cache key from make_key()
+            data (bytes): Audio data to store
+            pin (bool): Also pin the entry (see pin()) before anything is
+                evicted
+
+        Returns:
+            str: Path to the cached audio file
+        """
+        path = self._path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary name first so readers never see partial files
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            if self._size is not None:
+                self._size += len(data) - previous
+            if pin:
+                self._pinned[path] = self._pinned.get(path, 0) + 1
+            self._evict(keep=path)
+
+        return path
+
+    def pin(self, path):
+        """
+        Keep a cached file from being evicted until unpin() is called.
+
+        A job pins its chunks while it still has to read them, so a book
+        larger than the cache cannot evict its own first chunks; the cache
+        may exceed its size limit meanwhile.
+
+        Files that get_path() or put() returned a moment ago may already be
+        gone; pass pin=True to them instead.
+
+        Args:
+            path (str): Path returned by get_path() or put()
+
+        Returns:
+            bool: True if the file is in the cache and is now pinned
+        """
+        with self._lock:
+            if os.path.dirname(os.path.dirname(path)) != self.cache_dir or not os.path.exists(path):
+                return False
+            self._pinned[path] = self._pinned.get(path, 0) + 1
+            return True
+
+    def unpin(self, path):
+        """
+        Release a file pinned with pin(), once for every successful pin().
+
+        Args:
+            path (str): Path of the pinned file
+        """
+        with self._lock:
+            count = self._pinned.pop(path, 0)
+            if count > 1:
+                self._pinned[path] = count - 1
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, keep=None):
+        """Remove least recently used entries until the cache fits its size limit."""
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+
+        if self._size <= self.max_size_bytes:
+            return
+
+        entries = self._entries()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self._size <= self.max_size_bytes:
+                break
+            if path == keep or path in self._pinned:
+                continue
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def size(self):
+        """
+        Get the total size of the cached audio.
+
+        Returns:
+            int: Size in bytes
+        """
+        with self._lock:
+            self._size = sum(size for _, size, _ in self._entries())
+            return self._size
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+# Global instance for easy access
+_audio_cache = None
+
+def get_audio_cache():
+    """Get or create the shared AudioCache instance."""
+    global _audio_cache
+    if _audio_cache is None:
+        _audio_cache = AudioCache()
+    return _audio_cache
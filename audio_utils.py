@@ -1,236 +1,646 @@
-from pydub import AudioSegment
-from io import BytesIO
-import requests
-import os
-import tempfile
-import re
-
-def split_text(text, chunk_size=3000):
-    """
-    Split text into chunks of specified size, trying to break at sentence boundaries.
-    
-    Args:
-        text (str): Text to split
-        chunk_size (int): Maximum size of each chunk
-        
-    Returns:
-        list: List of text chunks
-    """
-    if len(text) <= chunk_size:
-        return [text]
-    
-    # Split by sentences first
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    chunks = []
-    current_chunk = ""
-    
-    for sentence in sentences:
-        # If adding this sentence would exceed chunk size
-        if len(current_chunk + sentence) > chunk_size and current_chunk:
-            chunks.append(current_chunk.strip())
-            current_chunk = sentence
-        else:
-            current_chunk += " " + sentence if current_chunk else sentence
-    
-    # Add the last chunk
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    # If any chunk is still too long, force split
-    final_chunks = []
-    for chunk in chunks:
-        if len(chunk) > chunk_size:
-            # Force split at word boundaries
-            words = chunk.split()
-            temp_chunk = ""
-            for word in words:
-                if len(temp_chunk + " " + word) <= chunk_size:
-                    temp_chunk += " " + word if temp_chunk else word
-                else:
-                    if temp_chunk:
-                        final_chunks.append(temp_chunk.strip())
-                    temp_chunk = word
-            if temp_chunk:
-                final_chunks.append(temp_chunk.strip())
-        else:
-            final_chunks.append(chunk)
-    
-    return final_chunks
-
-def download_audio_from_url(url, timeout=30):
-    """
-    Download audio file from URL.
-    
-    Args:
-        url (str): URL to download audio from
-        timeout (int): Request timeout in seconds
-        
-    Returns:
-        AudioSegment: Downloaded audio segment
-    """
-    try:
-        response = requests.get(url, timeout=timeout)
-        response.raise_for_status()
-        
-        # Create audio segment from response content
-        audio = AudioSegment.from_file(BytesIO(response.content), format="mp3")
-        return audio
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Error downloading audio from {url}: {str(e)}")
-        return None
-    except Exception as e:
-        print(f"Error processing audio from {url}: {str(e)}")
-        return None
-
-def download_and_merge(audio_urls, output_path="audiobook.mp3"):
-    """
-    Download multiple audio files and merge them into a single file.
-    
-    Args:
-        audio_urls (list): List of audio URLs to download and merge
-        output_path (str): Path for the output merged audio file
-        
-    Returns:
-        bool: True if successful, False otherwise
-    """
-    try:
-        if not audio_urls:
-            print("No audio URLs provided")
-            return False
-        
-        print(f"Downloading and merging {len(audio_urls)} audio chunks...")
-        
-        # Download and merge audio segments
-        final_audio = AudioSegment.empty()
-        
-        for i, url in enumerate(audio_urls):
-            print(f"Processing chunk {i+1}/{len(audio_urls)}...")
-            
-            audio_segment = download_audio_from_url(url)
-            if audio_segment is None:
-                print(f"Failed to download audio from {url}")
-                continue
-            
-            # Add a small pause between chunks for better flow
-            if final_audio:
-                pause = AudioSegment.silent(duration=500)  # 0.5 second pause
-                final_audio += pause
-            
-            final_audio += audio_segment
-        
-        if not final_audio:
-            print("No audio segments were successfully downloaded")
-            return False
-        
-        # Export the merged audio
-        print(f"Exporting merged audio to {output_path}...")
-        final_audio.export(output_path, format="mp3", bitrate="192k")
-        
-        print(f"Successfully created audiobook: {output_path}")
-        return True
-        
-    except Exception as e:
-        print(f"Error merging audio files: {str(e)}")
-        return False
-
-def get_audio_duration(audio_path):
-    """
-    Get the duration of an audio file.
-    
-    Args:
-        audio_path (str): Path to the audio file
-        
-    Returns:
-        float: Duration in seconds
-    """
-    try:
-        audio = AudioSegment.from_mp3(audio_path)
-        return len(audio) / 1000.0  # Convert milliseconds to seconds
-    except Exception as e:
-        print(f"Error getting audio duration: {str(e)}")
-        return 0
-
-def format_duration(seconds):
-    """
-    Format duration in seconds to human-readable format.
-    
-    Args:
-        seconds (float): Duration in seconds
-        
-    Returns:
-        str: Formatted duration string
-    """
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    
-    if hours > 0:
-        return f"{hours}h {minutes}m {secs}s"
-    elif minutes > 0:
-        return f"{minutes}m {secs}s"
-    else:
-        return f"{secs}s"
-
-def normalize_audio(audio_segment):
-    """
-    Normalize audio volume for consistent levels.
-    
-    Args:
-        audio_segment (AudioSegment): Audio segment to normalize
-        
-    Returns:
-        AudioSegment: Normalized audio segment
-    """
-    try:
-        # Normalize to -20 dBFS
-        normalized = audio_segment.normalize()
-        return normalized
-    except Exception as e:
-        print(f"Error normalizing audio: {str(e)}")
-        return audio_segment
-
-def add_fade_effects(audio_segment, fade_in_ms=100, fade_out_ms=100):
-    """
-    Add fade in and fade out effects to audio.
-    
-    Args:
-        audio_segment (AudioSegment): Audio segment to process
-        fade_in_ms (int): Fade in duration in milliseconds
-        fade_out_ms (int): Fade out duration in milliseconds
-        
-    Returns:
-        AudioSegment: Audio segment with fade effects
-    """
-    try:
-        # Add fade in
-        if fade_in_ms > 0:
-            audio_segment = audio_segment.fade_in(fade_in_ms)
-        
-        # Add fade out
-        if fade_out_ms > 0:
-            audio_segment = audio_segment.fade_out(fade_out_ms)
-        
-        return audio_segment
-    except Exception as e:
-        print(f"Error adding fade effects: {str(e)}")
-        return audio_segment
-
-def estimate_processing_time(text_length, chunks_count):
-    """
-    Estimate the time needed to process text to speech.
-    
-    Args:
-        text_length (int): Length of text in characters
-        chunks_count (int): Number of text chunks
-        
-    Returns:
-        float: Estimated processing time in minutes
-    """
-    # Rough estimation: 1 character = 0.1 seconds of audio
-    audio_duration = text_length * 0.1 / 60  # Convert to minutes
-    
-    # Add overhead for API calls and processing
-    overhead = chunks_count * 0.5  # 30 seconds per chunk
-    
+from pydub import AudioSegment
+from io import BytesIO
+import requests
+import os
+import shutil
+import tempfile
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from utils.http_client import get_http_client
+from utils import metrics
+from utils.mp3_utils import Mp3PassthroughWriter, iter_frames, info_tag, probe_mp3
+from utils.chunk_index import build_index, write_index
+from utils.text_chunker import iter_chunks, SENTENCE_BOUNDARY
+
+def split_text(text, chunk_size=3000):
+    """
+    Split text into chunks of specified size, trying to break at sentence boundaries.
+    
+    Args:
+        text (str): Text to split
+        chunk_size (int): Maximum size of each chunk
+        
+    Returns:
+        list: List of text chunks
+    """
+    return [chunk.text for chunk in iter_chunks(text, chunk_size, SENTENCE_BOUNDARY)]
+
+def download_audio_bytes(url, timeout=30):
+    """
+    Download the raw bytes of an audio file from URL.
+    
+    Args:
+        url (str): URL to download audio from
+        timeout (int): Request timeout in seconds
+        
+    Returns:
+        bytes: Encoded audio data, or None if failed
+    """
+    with metrics.timer("audio.download") as timer:
+        try:
+            response = get_http_client().get(url, timeout=timeout)
+            response.raise_for_status()
+            timer.add(bytes=len(response.content))
+            return response.content
+            
+        except requests.exceptions.RequestException as e:
+            timer.add(errors=1)
+            print(f"Error downloading audio from {url}: {str(e)}")
+            return None
+
+def download_audio_from_url(url, timeout=30):
+    """
+    Download audio file from URL.
+    
+    Args:
+        url (str): URL to download audio from
+        timeout (int): Request timeout in seconds
+        
+    Returns:
+        AudioSegment: Downloaded audio segment
+    """
+    try:
+        content = download_audio_bytes(url, timeout)
+        if content is None:
+            return None
+        
+        # Create audio segment from response content
+        with metrics.timer("audio.decode", bytes=len(content)):
+            audio = AudioSegment.from_file(BytesIO(content), format="mp3")
+        return audio
+        
+    except Exception as e:
+        print(f"Error processing audio from {url}: {str(e)}")
+        return None
+
+def load_audio_segment(source, timeout=30):
+    """
+    Load audio from either a URL or a local file path.
+    
+    Args:
+        source (str): URL or path of the audio file
+        timeout (int): Request timeout in seconds for URLs
+        
+    Returns:
+        AudioSegment: Loaded audio segment, or None if failed
+    """
+    if os.path.isfile(source):
+        try:
+            with metrics.timer("audio.decode", bytes=os.path.getsize(source)):
+                return AudioSegment.from_file(source, format="mp3")
+        except Exception as e:
+            print(f"Error processing audio from {source}: {str(e)}")
+            return None
+    
+    return download_audio_from_url(source, timeout)
+
+def load_audio_bytes(source, timeout=30):
+    """
+    Load the encoded bytes of an audio file from either a URL or a local file path.
+    
+    Args:
+        source (str): URL or path of the audio file
+        timeout (int): Request timeout in seconds for URLs
+        
+    Returns:
+        bytes: Encoded audio data, or None if failed
+    """
+    if os.path.isfile(source):
+        try:
+            with open(source, "rb") as f:
+                return f.read()
+        except OSError as e:
+            print(f"Error reading audio from {source}: {str(e)}")
+            return None
+    
+    return download_audio_bytes(source, timeout)
+
+class StreamingAudioWriter:
+    """Encode audio to a file incrementally, one segment at a time."""
+    
+    def __init__(self, output_path, format="mp3", bitrate="192k", pause_ms=500):
+        self.output_path = output_path
+        self.format = format
+        self.bitrate = bitrate
+        self.pause_ms = pause_ms
+        self.frame_rate = None
+        self.channels = None
+        self.segments_written = 0
+        self.duration_ms = 0
+        self._process = None
+        self._stderr = None
+    
+    def _start(self, audio_segment):
+        """Start the ffmpeg encoder using the stream parameters of the first segment."""
+        self.frame_rate = audio_segment.frame_rate
+        self.channels = audio_segment.channels
+        self._stderr = tempfile.TemporaryFile()
+        
+        command = [
+            AudioSegment.converter, "-y", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(self.frame_rate), "-ac", str(self.channels),
+            "-i", "pipe:0",
+            "-b:a", self.bitrate, "-f", self.format, self.output_path
+        ]
+        self._process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr
+        )
+    
+    def _write(self, data):
+        self._process.stdin.write(data)
+    
+    def append(self, audio_segment):
+        """
+        Encode one segment, preceded by the inter-chunk pause if needed.
+        
+        Args:
+            audio_segment (AudioSegment): Audio to append to the output
+        """
+        with metrics.timer("audio.encode") as timer:
+            if self._process is None:
+                self._start(audio_segment)
+            
+            # Every segment has to match the raw PCM layout the encoder expects
+            audio_segment = (
+                audio_segment
+                .set_frame_rate(self.frame_rate)
+                .set_channels(self.channels)
+                .set_sample_width(2)
+            )
+            
+            if self.segments_written and self.pause_ms > 0:
+                pause_frames = int(self.frame_rate * self.pause_ms / 1000)
+                self._write(b"\0" * (pause_frames * self.channels * 2))
+                self.duration_ms += self.pause_ms
+            
+            self._write(audio_segment.raw_data)
+            timer.add(bytes=len(audio_segment.raw_data))
+            self.duration_ms += len(audio_segment)
+            self.segments_written += 1
+    
+    def close(self):
+        """
+        Finish encoding and wait for the output file to be written.
+        
+        Returns:
+            bool: True if the encoder finished successfully, False otherwise
+        """
+        if self._process is None:
+            return False
+        
+        with metrics.timer("audio.finalize") as timer:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = self._process.wait()
+            if returncode != 0:
+                timer.add(errors=1)
+        
+        if returncode != 0:
+            self._stderr.seek(0)
+            error = self._stderr.read().decode("utf-8", errors="replace").strip()
+            print(f"Error encoding {self.output_path}: {error}")
+        self._stderr.close()
+        self._process = None
+        return returncode == 0
+    
+    def abort(self):
+        """Stop the encoder without finishing the output file."""
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._stderr.close()
+            self._process = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+def download_and_merge(audio_urls, output_path="audiobook.mp3", stream=False, passthrough=True, texts=None):
+    """
+    Download multiple audio files and merge them into a single file.
+    
+    Args:
+        audio_urls (list): List of audio URLs or local file paths to merge
+        output_path (str): Path for the output merged audio file
+        stream (bool): Encode each chunk as soon as it is loaded instead of
+            building the whole book in memory first. Peak memory is then
+            bounded by a single chunk.
+        passthrough (bool): Join the MP3 frames of the chunks as they are,
+            without decoding and re-encoding the book. Only chunks whose
+            stream parameters differ from the first one are re-encoded.
+        texts (list): Optional chunk_index.describe_text() of each chunk.
+            With passthrough, an index locating every chunk in the output
+            is then written next to it (see chunk_index).
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    writer = None
+    try:
+        if not audio_urls:
+            print("No audio URLs provided")
+            return False
+        
+        print(f"Downloading and merging {len(audio_urls)} audio chunks...")
+        
+        if passthrough:
+            return _passthrough_merge(audio_urls, output_path, texts)
+        
+        # Download and merge audio segments
+        final_audio = AudioSegment.empty()
+        if stream:
+            writer = StreamingAudioWriter(output_path, format="mp3", bitrate="192k", pause_ms=500)
+        
+        for i, url in enumerate(audio_urls):
+            print(f"Processing chunk {i+1}/{len(audio_urls)}...")
+            
+            audio_segment = load_audio_segment(url)
+            if audio_segment is None:
+                print(f"Failed to download audio from {url}")
+                continue
+            
+            if writer is not None:
+                writer.append(audio_segment)
+                continue
+            
+            with metrics.timer("audio.merge"):
+                # Add a small pause between chunks for better flow
+                if final_audio:
+                    pause = AudioSegment.silent(duration=500)  # 0.5 second pause
+                    final_audio += pause
+                
+                final_audio += audio_segment
+        
+        if writer is not None:
+            if not writer.segments_written:
+                print("No audio segments were successfully downloaded")
+                return False
+            
+            print(f"Finishing merged audio in {output_path}...")
+            if not writer.close():
+                return False
+            
+            print(f"Successfully created audiobook: {output_path}")
+            return True
+        
+        if not final_audio:
+            print("No audio segments were successfully downloaded")
+            return False
+        
+        # Export the merged audio
+        print(f"Exporting merged audio to {output_path}...")
+        with metrics.timer("audio.export"):
+            final_audio.export(output_path, format="mp3", bitrate="192k")
+        
+        print(f"Successfully created audiobook: {output_path}")
+        return True
+        
+    except Exception as e:
+        print(f"Error merging audio files: {str(e)}")
+        if writer is not None:
+            writer.abort()
+        return False
+
+def _passthrough_merge(audio_urls, output_path, texts=None):
+    """Merge audio files by copying their MP3 frames; see download_and_merge."""
+    writer = Mp3PassthroughWriter(output_path, pause_ms=500)
+    spans = []
+    try:
+        for i, url in enumerate(audio_urls):
+            print(f"Processing chunk {i+1}/{len(audio_urls)}...")
+            
+            data = load_audio_bytes(url)
+            if data is None or not writer.append(data):
+                print(f"Failed to download audio from {url}")
+                spans.append(None)
+                continue
+            spans.append(writer.spans[-1])
+        
+        if not writer.segments_written:
+            print("No audio segments were successfully downloaded")
+            return False
+        
+        writer.close()
+        if texts is not None:
+            write_index(output_path, build_index(output_path, writer, texts, spans))
+        print(f"Successfully created audiobook: {output_path} "
+              f"({writer.passthrough_chunks} chunks copied, {writer.transcoded_chunks} re-encoded)")
+        return True
+        
+    except Exception:
+        writer.abort()
+        raise
+
+def _escape_ffmetadata(value):
+    """Escape a value for an ffmpeg metadata file."""
+    return "".join("\\" + char if char in "=;#\\\n" else char for char in value)
+
+def merge_with_chapters(audio_paths, titles, output_path):
+    """
+    Join MP3 files into one audiobook with a chapter marker at the start of each.
+    
+    The audio is copied without re-encoding, and the chapters are written
+    as ID3 chapter frames, which audiobook players show as a chapter list.
+    
+    Args:
+        audio_paths (list): Paths of the chapter files, in order
+        titles (list): Title of each chapter
+        output_path (str): Path of the audiobook to write
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    work_dir = tempfile.mkdtemp(prefix="audiobook_chapters_")
+    try:
+        list_path = os.path.join(work_dir, "files.txt")
+        metadata_path = os.path.join(work_dir, "chapters.txt")
+        
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in audio_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            f.write(";FFMETADATA1\n")
+            start_ms = 0
+            for path, title in zip(audio_paths, titles):
+                end_ms = start_ms + int(round(get_audio_duration(path) * 1000))
+                f.write(f"[CHAPTER]\nTIMEBASE=1/1000\nSTART={start_ms}\nEND={end_ms}\n")
+                f.write(f"title={_escape_ffmetadata(title)}\n")
+                start_ms = end_ms
+        
+        command = [
+            AudioSegment.converter, "-y", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", metadata_path,
+            "-map", "0:a", "-map_metadata", "1", "-map_chapters", "1",
+            "-c", "copy", "-id3v2_version", "3", output_path
+        ]
+        with metrics.timer("audio.merge", items=len(audio_paths)):
+            result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            print(f"Error merging chapters: {result.stderr.decode('utf-8', errors='replace').strip()}")
+            return False
+        
+        print(f"Successfully created audiobook with {len(audio_paths)} chapters: {output_path}")
+        return True
+        
+    except Exception as e:
+        print(f"Error merging chapters: {str(e)}")
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def get_audio_duration(audio_path):
+    """
+    Get the duration of an audio file.
+    
+    MP3 files are measured from their headers without decoding; other
+    formats are decoded.
+    
+    Args:
+        audio_path (str): Path to the audio file
+        
+    Returns:
+        float: Duration in seconds
+    """
+    try:
+        with metrics.timer("audio.probe"):
+            info = probe_mp3(audio_path)
+        if info is not None:
+            return info.duration
+        
+        audio = AudioSegment.from_file(audio_path)
+        return len(audio) / 1000.0  # Convert milliseconds to seconds
+    except Exception as e:
+        print(f"Error getting audio duration: {str(e)}")
+        return 0
+
+def format_duration(seconds):
+    """
+    Format duration in seconds to human-readable format.
+    
+    Args:
+        seconds (float): Duration in seconds
+        
+    Returns:
+        str: Formatted duration string
+    """
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    
+    if hours > 0:
+        return f"{hours}h {minutes}m {secs}s"
+    elif minutes > 0:
+        return f"{minutes}m {secs}s"
+    else:
+        return f"{secs}s"
+
+def normalize_audio(audio_segment):
+    """
+    Normalize audio volume for consistent levels.
+    
+    Args:
+        audio_segment (AudioSegment): Audio segment to normalize
+        
+    Returns:
+        AudioSegment: Normalized audio segment
+    """
+    try:
+        # Normalize to -20 dBFS
+        normalized = audio_segment.normalize()
+        return normalized
+    except Exception as e:
+        print(f"Error normalizing audio: {str(e)}")
+        return audio_segment
+
+def add_fade_effects(audio_segment, fade_in_ms=100, fade_out_ms=100):
+    """
+    Add fade in and fade out effects to audio.
+    
+    Args:
+        audio_segment (AudioSegment): Audio segment to process
+        fade_in_ms (int): Fade in duration in milliseconds
+        fade_out_ms (int): Fade out duration in milliseconds
+        
+    Returns:
+        AudioSegment: Audio segment with fade effects
+    """
+    try:
+        # Add fade in
+        if fade_in_ms > 0:
+            audio_segment = audio_segment.fade_in(fade_in_ms)
+        
+        # Add fade out
+        if fade_out_ms > 0:
+            audio_segment = audio_segment.fade_out(fade_out_ms)
+        
+        return audio_segment
+    except Exception as e:
+        print(f"Error adding fade effects: {str(e)}")
+        return audio_segment
+
+def polish_chunk(source, output_path, fade_in_ms=100, fade_out_ms=100):
+    """
+    Normalize one chunk of audio and fade it in and out.
+    
+    The chunk is re-encoded with the sample rate, channels and bitrate of
+    the original, so chunks stay joinable without re-encoding. Runs in a
+    worker process of ChunkPolisher.
+    
+    Args:
+        source (str): Path of the chunk's MP3 file
+        output_path (str): Path of the processed file to write
+        fade_in_ms (int): Fade in duration in milliseconds
+        fade_out_ms (int): Fade out duration in milliseconds
+        
+    Returns:
+        tuple: (output_path, seconds), with None as the path if it failed
+    """
+    start = time.perf_counter()
+    try:
+        with open(source, "rb") as f:
+            data = f.read()
+        bitrate = next(header.bitrate for offset, header in iter_frames(data)
+                       if info_tag(data, offset, header) is None)
+        
+        audio_segment = AudioSegment.from_file(BytesIO(data), format="mp3")
+        audio_segment = add_fade_effects(normalize_audio(audio_segment), fade_in_ms, fade_out_ms)
+        audio_segment.export(output_path, format="mp3", bitrate=f"{bitrate}k")
+        return output_path, time.perf_counter() - start
+        
+    except Exception as e:
+        print(f"Error post-processing audio from {source}: {str(e)}")
+        return None, time.perf_counter() - start
+
+class ChunkPolisher:
+    """
+    Normalize and fade chunks on a pool of processes before they are merged.
+    
+    Each chunk is processed on its own, so a book is never decoded as a
+    whole, and chunks are submitted as soon as they are synthesized, so
+    the work overlaps with synthesis of later chunks. result() waits for a
+    chunk in merge order. A chunk that fails to process is merged as it
+    was synthesized.
+    """
+    
+    def __init__(self, max_workers=None, fade_in_ms=100, fade_out_ms=100):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.fade_in_ms = fade_in_ms
+        self.fade_out_ms = fade_out_ms
+        self.work_dir = tempfile.mkdtemp(prefix="audiobook_polish_")
+        self.chunks = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._futures = {}
+        self._submitted = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+    
+    def submit(self, path):
+        """
+        Start processing a chunk in the background.
+        
+        Args:
+            path (str): Path of the chunk's audio file, or None for a failed chunk
+        """
+        if not path:
+            return
+        with self._lock:
+            if path in self._futures:
+                return
+            self._submitted += 1
+            output_path = os.path.join(self.work_dir, f"polished_{self._submitted:05d}.mp3")
+            self._futures[path] = self._executor.submit(polish_chunk, path, output_path,
+                                                        self.fade_in_ms, self.fade_out_ms)
+    
+    def result(self, path, index=None):
+        """
+        Wait for a chunk to be processed.
+        
+        Args:
+            path (str): Path of the chunk's audio file, as passed to submit()
+            index (int): Chunk index to attribute the processing time to
+            
+        Returns:
+            str: Path of the processed file, or path itself if processing failed
+        """
+        if not path:
+            return path
+        self.submit(path)
+        with self._lock:
+            future = self._futures.pop(path)
+        
+        polished_path, seconds = future.result()
+        metrics.observe("audio.polish", seconds, errors=0 if polished_path else 1, chunk=index)
+        with self._lock:
+            self.chunks += 1
+            self.seconds += seconds
+            if polished_path is None:
+                self.failed += 1
+        return polished_path or path
+    
+    def discard(self, polished_path):
+        """Delete a processed file once it has been merged."""
+        if polished_path and os.path.dirname(polished_path) == self.work_dir and os.path.exists(polished_path):
+            os.remove(polished_path)
+    
+    def summary(self):
+        """
+        Describe the work done.
+        
+        Returns:
+            dict: JSON-serializable summary for the job report
+        """
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "chunks": self.chunks,
+                "failed": self.failed,
+                "chunk_seconds": self.seconds,
+                "seconds_per_chunk": self.seconds / self.chunks if self.chunks else 0.0,
+                "wall_seconds": time.perf_counter() - self._started
+            }
+    
+    def close(self):
+        """Stop the worker processes and delete the processed files."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def estimate_processing_time(text_length, chunks_count):
+    """
+    Estimate the time needed to process text to speech.
+    
+    Args:
+        text_length (int): Length of text in characters
+        chunks_count (int): Number of text chunks
+        
+    Returns:
+        float: Estimated processing time in minutes
+    """
+    # Rough estimation: 1 character = 0.1 seconds of audio
+    audio_duration = text_length * 0.1 / 60  # Convert to minutes
+    
+    # Add overhead for API calls and processing
+    overhead = chunks_count * 0.5  # 30 seconds per chunk
+    
     return audio_duration + overhead 
\ No newline at end of file
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Headless batch converter for Audiobook AI Agent
+Converts whole directories or lists of PDF books to audiobooks without Streamlit
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from utils.pdf_reader import extract_text_from_pdf, get_pdf_info
+from utils.audio_utils import split_text, download_and_merge, get_audio_duration, format_duration
+from utils.murf_api import get_murf_api, text_to_speech_murf, DEFAULT_MAX_CONCURRENCY
+from utils.chunk_index import describe_text, read_index
+from utils.text_chunker import fingerprint_chunk
+from utils.pipeline import repair_audiobook
+from utils import metrics
+
+# Load environment variables
+load_dotenv()
+
+def find_pdfs(inputs):
+    """
+    Collect the PDF files to convert.
+
+    Each input can be a PDF file, a directory searched recursively for PDFs,
+    or a manifest: a JSON list of paths or a text file with one path per line.
+    Relative paths in a manifest are resolved against the manifest's directory.
+
+    Args:
+        inputs (list): Paths given on the command line
+
+    Returns:
+        list: Absolute paths of the PDF files, without duplicates
+    """
+    pdfs = []
+    for source in inputs:
+        if os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                pdfs.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+        elif source.lower().endswith(".pdf"):
+            pdfs.append(source)
+        elif os.path.isfile(source):
+            with open(source, "r", encoding="utf-8") as f:
+                content = f.read()
+            if source.lower().endswith(".json"):
+                entries = json.loads(content)
+            else:
+                entries = [line.strip() for line in content.splitlines()]
+            base_dir = os.path.dirname(os.path.abspath(source))
+            pdfs.extend(
+                os.path.join(base_dir, entry) for entry in entries
+                if entry and not entry.startswith("#")
+            )
+        else:
+            print(f"⚠️  Skipping {source}: not a PDF, directory or manifest")
+
+    seen = set()
+    unique = []
+    for path in map(os.path.abspath, pdfs):
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+def convert_book(pdf_path, output_path, api_pool, voice_id, chunk_size):
+    """
+    Convert one PDF to an audiobook, sending its chunks through the shared API pool.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        output_path (str): Path of the audiobook to write
+        api_pool (ThreadPoolExecutor): Pool that bounds API requests across all books
+        voice_id (str): Voice ID to use for synthesis
+        chunk_size (int): Maximum length of each text chunk
+
+    A JSON report of the time spent in each stage is written next to the
+    audiobook unless metrics are switched off.
+
+    Returns:
+        dict: Statistics of the conversion
+    """
+    with metrics.job_scope(os.path.basename(pdf_path)) as recorder:
+        stats = _convert_book(pdf_path, output_path, api_pool, voice_id, chunk_size)
+        if metrics.ENABLED:
+            recorder.extra.update(stats)
+            recorder.write_report(metrics.report_path(output_path))
+    return stats
+
+def _convert_book(pdf_path, output_path, api_pool, voice_id, chunk_size):
+    name = os.path.basename(pdf_path)
+    stats = {
+        "book": name, "ok": False, "pages": 0, "chunks": 0, "audio_seconds": 0.0,
+        "extract_seconds": 0.0, "synth_seconds": 0.0, "wall_seconds": 0.0,
+        "requests_saved": 0, "chars_saved": 0, "error": None
+    }
+    start = time.perf_counter()
+
+    try:
+        stats["pages"] = get_pdf_info(pdf_path)["page_count"]
+        text = extract_text_from_pdf(pdf_path, parallel=True)
+        stats["extract_seconds"] = time.perf_counter() - start
+        if not text.strip():
+            raise Exception("no text could be extracted")
+
+        chunks = split_text(text, chunk_size)
+        stats["chunks"] = len(chunks)
+        print(f"📖 {name}: {stats['pages']} pages, {len(chunks)} chunks")
+
+        # Repeated text such as running headers is synthesized once and its audio used at every position
+        repeats = {}
+        for i, chunk in enumerate(chunks):
+            repeats.setdefault(fingerprint_chunk(chunk), []).append(i)
+
+        synth_start = time.perf_counter()
+        futures = {
+            first: api_pool.submit(metrics.in_context(text_to_speech_murf, first), chunks[first], voice_id)
+            for first, *_ in repeats.values()
+        }
+        audio_urls = [None] * len(chunks)
+        for indices in repeats.values():
+            url = futures[indices[0]].result()
+            for i in indices:
+                audio_urls[i] = url
+            # Repeats only saved a request if the first occurrence got audio
+            if url:
+                stats["requests_saved"] += len(indices) - 1
+                stats["chars_saved"] += sum(len(chunks[i]) for i in indices[1:])
+        stats["synth_seconds"] = time.perf_counter() - synth_start
+
+        failed = [i + 1 for i, url in enumerate(audio_urls) if not url]
+        if failed:
+            raise Exception(f"{len(failed)} chunks failed to convert (first: chunk {failed[0]})")
+
+        if not download_and_merge(audio_urls, output_path, stream=True,
+                                  texts=[describe_text(chunk) for chunk in chunks]):
+            raise Exception("merging audio failed")
+
+        # Chunks whose audio could not be downloaded are synthesized again and spliced in
+        index = read_index(output_path)
+        if index is not None and index["missing"]:
+            print(f"🩺 {name}: repairing {len(index['missing'])} chunks the merge skipped")
+            repair = repair_audiobook(pdf_path, output_path, voice_id, chunk_size, texts=chunks)
+            if repair["unrepaired"]:
+                raise Exception(f"{len(repair['unrepaired'])} chunks could not be repaired")
+
+        stats["audio_seconds"] = get_audio_duration(output_path)
+        stats["ok"] = True
+        print(f"✅ {name} → {output_path}")
+    except Exception as e:
+        stats["error"] = str(e)
+        print(f"❌ {name}: {str(e)}")
+
+    stats["wall_seconds"] = time.perf_counter() - start
+    return stats
+
+def repair_book(pdf_path, output_path, voice_id, chunk_size, deep=False):
+    """
+    Re-synthesize only the missing or damaged chunks of an existing audiobook.
+
+    Args:
+        pdf_path (str): Path to the PDF file the audiobook was made from
+        output_path (str): Path of the audiobook
+        voice_id (str): Voice ID to use for synthesis
+        chunk_size (int): Maximum length of each text chunk of the conversion
+        deep (bool): Also decode every chunk to find damage inside it
+
+    Returns:
+        bool: True if the audiobook is intact afterwards
+    """
+    name = os.path.basename(pdf_path)
+    try:
+        summary = repair_audiobook(pdf_path, output_path, voice_id, chunk_size, deep=deep)
+    except Exception as e:
+        print(f"❌ {name}: {str(e)}")
+        return False
+
+    if summary["unrepaired"]:
+        print(f"⚠️ {name}: {len(summary['unrepaired'])} damaged chunks could not be repaired, "
+              f"the audiobook was left unchanged")
+    elif summary["repaired"]:
+        print(f"✅ {name}: repaired {len(summary['repaired'])} of {summary['checked']} chunks")
+    else:
+        print(f"✅ {name}: all {summary['checked']} chunks are intact")
+    return not summary["unrepaired"]
+
+def _rate(amount, seconds):
+    return amount / seconds if seconds > 0 else 0.0
+
+def print_summary(results, wall_seconds):
+    """Print per-book and total throughput."""
+    print()
+    print(f"{'book':<32} {'status':>6} {'pages/s':>8} {'chunks/s':>9} {'audio':>10} {'audio min/wall min':>19}")
+    for stats in results:
+        print(
+            f"{stats['book'][:32]:<32} {'ok' if stats['ok'] else 'failed':>6} "
+            f"{_rate(stats['pages'], stats['extract_seconds']):>8.1f} "
+            f"{_rate(stats['chunks'], stats['synth_seconds']):>9.2f} "
+            f"{format_duration(stats['audio_seconds']):>10} "
+            f"{_rate(stats['audio_seconds'], stats['wall_seconds']):>19.1f}"
+        )
+
+    pages = sum(stats["pages"] for stats in results)
+    chunks = sum(stats["chunks"] for stats in results)
+    audio_seconds = sum(stats["audio_seconds"] for stats in results)
+    succeeded = sum(1 for stats in results if stats["ok"])
+    print()
+    print(f"📊 {succeeded}/{len(results)} books converted in {format_duration(wall_seconds)}")
+    requests_saved = sum(stats["requests_saved"] for stats in results)
+    if requests_saved:
+        print(f"   ♻️ Repeated text synthesized once: {requests_saved} requests and "
+              f"{sum(stats['chars_saved'] for stats in results):,} characters saved")
+    print(f"   {_rate(pages, wall_seconds):.1f} pages/s, {_rate(chunks, wall_seconds):.2f} chunks/s, "
+          f"{_rate(audio_seconds, wall_seconds):.1f} audio minutes per wall minute")
+
+def main():
+    """Convert every PDF given on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("inputs", nargs="+",
+                        help="PDF files, directories of PDFs, or manifests listing PDF paths")
+    parser.add_argument("-o", "--output-dir", default="audiobooks",
+                        help="Directory where audiobooks are written")
+    parser.add_argument("--voice", default=os.getenv("DEFAULT_VOICE", "en-US-William"),
+                        help="Murf AI voice ID")
+    parser.add_argument("--chunk-size", type=int, default=int(os.getenv("DEFAULT_CHUNK_SIZE", "3000")),
+                        help="Maximum characters per text chunk")
+    parser.add_argument("--books", type=int, default=2,
+                        help="Number of books converted at the same time")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Maximum number of Murf AI requests in flight across all books")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Convert books whose audiobook already exists")
+    parser.add_argument("--repair", action="store_true",
+                        help="Check the audiobooks that already exist and re-synthesize only their missing "
+                             "or damaged chunks, instead of converting books")
+    parser.add_argument("--deep", action="store_true",
+                        help="With --repair, also decode every chunk to find damage inside it")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on this port while converting")
+    args = parser.parse_args()
+
+    if not os.getenv("MURF_API_KEY"):
+        print("❌ Murf API key not found! Please add MURF_API_KEY to your .env file.")
+        return 1
+
+    pdfs = find_pdfs(args.inputs)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.repair:
+        repairs = []
+        for pdf_path in pdfs:
+            name = os.path.splitext(os.path.basename(pdf_path))[0]
+            output_path = os.path.join(args.output_dir, f"audiobook_{name}.mp3")
+            if os.path.exists(output_path):
+                repairs.append((pdf_path, output_path))
+            else:
+                print(f"⏭️  Skipping {name}: {output_path} does not exist")
+        with ThreadPoolExecutor(max_workers=args.books) as book_pool:
+            futures = [
+                book_pool.submit(repair_book, pdf_path, output_path, args.voice, args.chunk_size, args.deep)
+                for pdf_path, output_path in repairs
+            ]
+            results = [future.result() for future in futures]
+        return 0 if all(results) else 1
+
+    jobs = []
+    for pdf_path in pdfs:
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        output_path = os.path.join(args.output_dir, f"audiobook_{name}.mp3")
+        if os.path.exists(output_path) and not args.overwrite:
+            print(f"⏭️  Skipping {name}: {output_path} already exists")
+            continue
+        jobs.append((pdf_path, output_path))
+
+    if not jobs:
+        print("Nothing to convert")
+        return 0
+
+    print(f"🎙️ Converting {len(jobs)} books, {args.books} at a time, "
+          f"with at most {args.max_concurrency} API requests in flight")
+
+    if args.metrics_port:
+        metrics.serve_metrics(args.metrics_port)
+    
+    start = time.perf_counter()
+    # Every book submits its chunks to the same pool, which is the global API limit
+    get_murf_api().reserve_connections(args.max_concurrency)
+    with ThreadPoolExecutor(max_workers=args.max_concurrency) as api_pool, \
+            ThreadPoolExecutor(max_workers=args.books) as book_pool:
+        futures = [
+            book_pool.submit(convert_book, pdf_path, output_path, api_pool, args.voice, args.chunk_size)
+            for pdf_path, output_path in jobs
+        ]
+        results = [future.result() for future in futures]
+
+    print_summary(results, time.perf_counter() - start)
+    return 0 if all(stats["ok"] for stats in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
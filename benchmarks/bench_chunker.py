@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark for text chunking
+Compares the offset-tracking chunker against the original split_text on
+multi-megabyte inputs to show that it scales linearly
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text_chunker import iter_chunks
+
+def legacy_split_text(text, chunk_size=3000):
+    """The original audio_utils.split_text, which rebuilds strings to measure them."""
+    if len(text) <= chunk_size:
+        return [text]
+
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    chunks = []
+    current_chunk = ""
+
+    for sentence in sentences:
+        if len(current_chunk + sentence) > chunk_size and current_chunk:
+            chunks.append(current_chunk.strip())
+            current_chunk = sentence
+        else:
+            current_chunk += " " + sentence if current_chunk else sentence
+
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    final_chunks = []
+    for chunk in chunks:
+        if len(chunk) > chunk_size:
+            words = chunk.split()
+            temp_chunk = ""
+            for word in words:
+                if len(temp_chunk + " " + word) <= chunk_size:
+                    temp_chunk += " " + word if temp_chunk else word
+                else:
+                    if temp_chunk:
+                        final_chunks.append(temp_chunk.strip())
+                    temp_chunk = word
+            if temp_chunk:
+                final_chunks.append(temp_chunk.strip())
+        else:
+            final_chunks.append(chunk)
+
+    return final_chunks
+
+WORDS = ["the", "river", "ran", "quietly", "past", "Anna", "whispered", "light", "of", "morning"]
+
+def make_text(size_bytes, seed=0):
+    """Build cleaned, single-spaced text made of short and occasional very long sentences."""
+    rng = random.Random(seed)
+    sentences = []
+    total = 0
+    while total < size_bytes:
+        length = rng.randint(3, 30) if rng.random() < 0.99 else rng.randint(500, 2000)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + rng.choice(".!?")
+        sentences.append(sentence)
+        total += len(sentence) + 1
+    return " ".join(sentences)
+
+def check_chunks(text, max_length):
+    """Verify offsets, sizes and that no text is lost."""
+    previous_end = 0
+    for chunk in iter_chunks(text, max_length):
+        assert text[chunk.start:chunk.end] == chunk.text
+        assert chunk.start >= previous_end
+        assert len(chunk.text) <= max_length or " " not in chunk.text
+        assert not text[previous_end:chunk.start].strip()
+        previous_end = chunk.end
+    assert not text[previous_end:].strip()
+
+def time_it(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def main():
+    """Benchmark both chunkers for several input and chunk sizes."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 2, 4, 8],
+                        help="Input sizes in megabytes")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000, 3000, 5000],
+                        help="Maximum chunk lengths")
+    args = parser.parse_args()
+
+    check_chunks(make_text(200_000, seed=1), 3000)
+    print("✅ Chunk offsets and sizes verified")
+
+    print()
+    print(f"{'size MB':>8} {'chunk':>6} {'legacy s':>10} {'chunker s':>10} {'chunker s/MB':>13}")
+    for size_mb in args.sizes_mb:
+        text = make_text(int(size_mb * 1024 * 1024))
+        for chunk_size in args.chunk_sizes:
+            legacy = time_it(lambda: legacy_split_text(text, chunk_size))
+            chunker = time_it(lambda: sum(1 for _ in iter_chunks(text, chunk_size)))
+            print(f"{size_mb:>8.0f} {chunk_size:>6} {legacy:>10.3f} {chunker:>10.3f} {chunker / size_mb:>13.3f}")
+
+if __name__ == "__main__":
+    main()
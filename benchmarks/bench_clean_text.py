@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark and equivalence check for pdf_reader.clean_text
+Compares the compiled cleaner against the original multi-pass rules
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pdf_reader import clean_text
+
+def legacy_clean_text(text):
+    """The original clean_text rules, applied as separate passes."""
+    text = re.sub(r'\n+', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\b\d+\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\d+\s*', '', text, flags=re.MULTILINE)
+    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}\"\']', '', text)
+    text = text.replace('|', 'I')
+    text = text.replace('0', 'O')
+    text = re.sub(r'\.([A-Z])', r'. \1', text)
+    text = re.sub(r'\?([A-Z])', r'? \1', text)
+    text = re.sub(r'\!([A-Z])', r'! \1', text)
+    text = text.strip()
+    return text
+
+WORDS = [
+    "the", "book", "chapter", "river", "Anna", "whispered", "light", "café", "naïve",
+    "2024", "0", "10", "I|l", "don't", "(see", "note)", "[1]", "{x}", "\"quoted\"",
+    "€5", "50%", "e-mail", "co-op", "well—known", "x²", "٣", "naïveté", "über",
+]
+PUNCTUATION = [".", ".", "?", "!", ",", ";", ":", "...", ".”"]
+SEPARATORS = [" ", " ", " ", "  ", "\n", "\n\n", "\t", " ", " \r\n"]
+
+ASCII_WORDS = [word for word in WORDS if word.isascii()]
+
+def make_page(rng, page_number, words_per_page, words):
+    """Build one page of book-like text with a header, artifacts and a page number."""
+    parts = [f"{page_number}\n", "RUNNING HEADER | Title\n"]
+    for _ in range(words_per_page):
+        word = rng.choice(words)
+        if rng.random() < 0.08:
+            word = word.capitalize() + rng.choice(PUNCTUATION)
+        parts.append(word)
+        parts.append(rng.choice(SEPARATORS))
+    parts.append(f"\n{page_number}\n")
+    return "".join(parts)
+
+def make_corpus(size_bytes, seed=0, ascii_only=False):
+    """Build a synthetic corpus of roughly size_bytes characters."""
+    rng = random.Random(seed)
+    words = ASCII_WORDS if ascii_only else WORDS
+    pages = []
+    total = 0
+    page_number = 1
+    while total < size_bytes:
+        page = make_page(rng, page_number, 350, words)
+        pages.append(page)
+        total += len(page)
+        page_number += 1
+    return "".join(pages)
+
+def check_equivalence(samples=20000, seed=1):
+    """Compare both cleaners on many small random fragments and on whole pages."""
+    rng = random.Random(seed)
+    alphabet = list("ab XYZ 019_0|.?!,;:-()[]{}\"'@#$%&*\n\t\r é٣²ß€") + ["12", ".A", "  "]
+    for _ in range(samples):
+        fragment = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        if clean_text(fragment) != legacy_clean_text(fragment):
+            raise AssertionError(f"Output differs for {fragment!r}")
+
+    for ascii_only in (True, False):
+        corpus = make_corpus(200_000, seed, ascii_only)
+        if clean_text(corpus) != legacy_clean_text(corpus):
+            raise AssertionError("Output differs on the synthetic corpus")
+
+def measure(function, text, repeat):
+    """Return the best wall time and the peak traced memory of function(text)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    function(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    """Check equivalence, then benchmark both cleaners on corpora of several sizes."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 20],
+                        help="Corpus sizes in megabytes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    check_equivalence()
+    print("✅ clean_text matches the original rules")
+
+    print()
+    print(f"{'corpus':>8} {'size MB':>8} {'cleaner':>8} {'seconds':>10} {'MB/s':>8} {'peak MB':>10}")
+    for ascii_only in (True, False):
+        kind = "ascii" if ascii_only else "unicode"
+        for size_mb in args.sizes_mb:
+            corpus = make_corpus(int(size_mb * 1024 * 1024), ascii_only=ascii_only)
+            for name, function in (("legacy", legacy_clean_text), ("compiled", clean_text)):
+                elapsed, peak = measure(function, corpus, args.repeat)
+                print(f"{kind:>8} {size_mb:>8.0f} {name:>8} {elapsed:>10.3f} "
+                      f"{size_mb / elapsed:>8.1f} {peak / 1024 / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
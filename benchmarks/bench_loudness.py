@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark for loudness normalization of a book's chunks
+Compares the pydub per-segment paths against the vectorized NumPy loudness stage
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from pydub import AudioSegment
+from utils.audio_utils import normalize_audio
+from utils.loudness import DEFAULT_TARGET_LUFS, measure_loudness, target_gains, apply_gains
+
+def make_chunks(total_seconds, chunk_seconds, sample_rate, seed=7):
+    """Create speech-like chunks: noise with syllable-rate bursts, recorded at uneven levels."""
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for _ in range(int(total_seconds // chunk_seconds)):
+        frames = int(chunk_seconds * sample_rate)
+        envelope = np.repeat(rng.uniform(0.05, 1.0, frames // (sample_rate // 5) + 1), sample_rate // 5)[:frames]
+        level = 10 ** (rng.uniform(-30, -8) / 20)
+        samples = rng.standard_normal(frames) * envelope * level
+        samples = np.clip(samples * 32768, -32768, 32767).astype(np.int16)
+        chunks.append(AudioSegment(samples.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1))
+    return chunks
+
+def to_arrays(chunks):
+    """Read AudioSegments as float sample arrays of shape (frames, channels)."""
+    return [np.frombuffer(chunk.raw_data, dtype=np.int16).reshape(-1, chunk.channels).astype(np.float32) / 32768.0
+            for chunk in chunks]
+
+def loudness_range(chunks, sample_rate):
+    """Spread between the loudest and the quietest chunk, in LU."""
+    loudness = measure_loudness(to_arrays(chunks), sample_rate)
+    return float(loudness.max() - loudness.min())
+
+def pydub_peak(chunks, target_lufs):
+    """The current path: peak normalization of each segment."""
+    return [normalize_audio(chunk) for chunk in chunks]
+
+def pydub_rms(chunks, target_lufs):
+    """Per-segment RMS matching with pydub."""
+    return [chunk.apply_gain(target_lufs - chunk.dBFS) for chunk in chunks]
+
+def numpy_lufs(chunks, target_lufs):
+    """The loudness stage: batched LUFS measurement and one vectorized gain pass."""
+    arrays = to_arrays(chunks)
+    sample_rate = chunks[0].frame_rate
+    loudness = measure_loudness(arrays, sample_rate)
+    peaks = np.array([np.abs(samples).max() for samples in arrays])
+    scaled = apply_gains(arrays, target_gains(loudness, peaks, target_lufs))
+    return [AudioSegment(samples.tobytes(), frame_rate=sample_rate, sample_width=2, channels=samples.shape[1])
+            for samples in scaled]
+
+METHODS = {
+    "pydub peak": pydub_peak,
+    "pydub rms": pydub_rms,
+    "numpy lufs": numpy_lufs,
+}
+
+def main():
+    """Run every method on the same synthetic book and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=60.0,
+                        help="Total length of the synthetic book")
+    parser.add_argument("--chunk-seconds", type=float, default=30.0,
+                        help="Length of each chunk")
+    parser.add_argument("--sample-rate", type=int, default=24000,
+                        help="Sample rate of the chunks")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET_LUFS,
+                        help="Target loudness in LUFS")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.minutes * 60, args.chunk_seconds, args.sample_rate)
+    print(f"{len(chunks)} chunks, {args.minutes:.0f} minutes at {args.sample_rate} Hz, "
+          f"loudness range {loudness_range(chunks, args.sample_rate):.1f} LU")
+
+    results = []
+    for name, method in METHODS.items():
+        start = time.perf_counter()
+        processed = method(chunks, args.target)
+        elapsed = time.perf_counter() - start
+        results.append((name, elapsed, loudness_range(processed, args.sample_rate)))
+
+    print()
+    print(f"{'method':>12} {'seconds':>10} {'range LU':>10}")
+    for name, elapsed, spread in results:
+        print(f"{name:>12} {elapsed:>10.2f} {spread:>10.2f}")
+
+if __name__ == "__main__":
+    main()
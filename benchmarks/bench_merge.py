@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark for merging audio chunks into a single audiobook
+Compares the in-memory, streaming and frame passthrough merges of download_and_merge
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub.generators import Sine
+from utils.audio_utils import download_and_merge
+
+def make_chunk_file(directory, seconds):
+    """Create one synthetic speech-length MP3 chunk to merge repeatedly."""
+    path = os.path.join(directory, "chunk.mp3")
+    tone = Sine(220).to_audio_segment(duration=int(seconds * 1000), volume=-20)
+    tone.export(path, format="mp3", bitrate="64k")
+    return path
+
+MODES = {
+    "memory": {"stream": False, "passthrough": False},
+    "stream": {"stream": True, "passthrough": False},
+    "copy": {"passthrough": True},
+}
+
+def run_merge(sources, output_path, mode):
+    """Run one merge and return its wall time and peak traced memory."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    ok = download_and_merge(sources, output_path, **MODES[mode])
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    if not ok:
+        raise RuntimeError(f"Merge failed for {len(sources)} chunks (mode={mode})")
+    return elapsed, peak
+
+def main():
+    """Run the benchmark for each chunk count and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Numbers of chunks to merge")
+    parser.add_argument("--chunk-seconds", type=float, default=2.0,
+                        help="Duration of each synthetic chunk")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        chunk_path = make_chunk_file(tmp_dir, args.chunk_seconds)
+        output_path = os.path.join(tmp_dir, "merged.mp3")
+
+        for count in args.counts:
+            sources = [chunk_path] * count
+            for mode in MODES:
+                elapsed, peak = run_merge(sources, output_path, mode)
+                results.append((count, mode, elapsed, peak))
+
+    print()
+    print(f"{'chunks':>8} {'mode':>8} {'seconds':>10} {'peak MB':>10}")
+    for count, mode, elapsed, peak in results:
+        print(f"{count:>8} {mode:>8} {elapsed:>10.2f} {peak / 1024 / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
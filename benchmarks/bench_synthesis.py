@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for speech synthesis
+Runs the real synthesis pipeline against the local Murf stand-in at several
+concurrency levels and chunk sizes, and reports chunks/s, p50/p95/p99
+request latency and peak memory. Options not listed here are passed on to
+mock_murf_server.py (e.g. --rate-limit-rate 0.05 --latency uniform).
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_chunker import make_text
+
+class TimedAPI:
+    """Wraps MurfAPI to record the latency of every synthesis request."""
+
+    def __init__(self, api):
+        self.api = api
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def text_to_speech(self, text, voice_id="en-US-William", format="mp3", quality="high"):
+        start = time.perf_counter()
+        try:
+            return self.api.text_to_speech(text, voice_id, format, quality)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies.append(elapsed)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_mock_server(server_args):
+    """Start mock_murf_server.py in its own process so its memory is not measured."""
+    port = free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_murf_server.py")
+    process = subprocess.Popen(
+        [sys.executable, script, "--port", str(port)] + server_args,
+        stdout=subprocess.DEVNULL
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The mock server exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+
+    process.kill()
+    raise RuntimeError("The mock server did not start in time")
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def run_once(api, chunks, concurrency):
+    """Run the pipeline once and return its wall time, failures and peak traced memory."""
+    from utils.pipeline import run_synthesis_pipeline
+
+    timed = TimedAPI(api)
+    api.http.configure_host(api.base_url, concurrency)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        tracemalloc.start()
+        start = time.perf_counter()
+        # The client prints a few lines per request, which would drown the table
+        with contextlib.redirect_stdout(io.StringIO()):
+            paths = run_synthesis_pipeline(
+                chunks, "en-US-William", work_dir,
+                synth_workers=concurrency, download_workers=concurrency, api=timed
+            )
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    failed = sum(1 for path in paths if path is None)
+    return elapsed, failed, peak, timed.latencies
+
+def main():
+    """Benchmark the pipeline for every combination of concurrency and chunk size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16],
+                        help="Numbers of concurrent synthesis requests")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000, 3000, 5000],
+                        help="Maximum chunk lengths")
+    parser.add_argument("--text-kb", type=int, default=150,
+                        help="Size of the synthetic book in kilobytes")
+    args, server_args = parser.parse_known_args()
+
+    process, base_url = start_mock_server(server_args)
+    os.environ["MURF_API_BASE_URL"] = base_url
+    os.environ.setdefault("MURF_API_KEY", "benchmark")
+
+    from utils.audio_utils import split_text
+    from utils.murf_api import MurfAPI
+
+    text = make_text(args.text_kb * 1024)
+    results = []
+    try:
+        for chunk_size in args.chunk_sizes:
+            chunks = split_text(text, chunk_size)
+            for concurrency in args.concurrency:
+                elapsed, failed, peak, latencies = run_once(MurfAPI(), chunks, concurrency)
+                results.append((chunk_size, concurrency, len(chunks), failed, elapsed, peak, latencies))
+                print(f"✅ chunk size {chunk_size}, concurrency {concurrency}: {elapsed:.2f}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+    print()
+    print(f"{'chunk':>6} {'workers':>8} {'chunks':>7} {'failed':>7} {'chunks/s':>9} "
+          f"{'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'peak MB':>8}")
+    for chunk_size, concurrency, count, failed, elapsed, peak, latencies in results:
+        print(f"{chunk_size:>6} {concurrency:>8} {count:>7} {failed:>7} {count / elapsed:>9.2f} "
+              f"{percentile(latencies, 0.50):>7.2f} {percentile(latencies, 0.95):>7.2f} "
+              f"{percentile(latencies, 0.99):>7.2f} {peak / 1024 / 1024:>8.1f}")
+
+if __name__ == "__main__":
+    main()
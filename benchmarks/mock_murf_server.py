@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Murf AI API
+Serves /api/v1/speech/generate, /voices and the audio download
+URLs with configurable latency, injected 429/5xx errors and MP3 payloads
+sized like real speech, so MurfAPI can be benchmarked without spending quota
+"""
+
+import argparse
+import io
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from pydub.generators import Sine
+
+VOICES = [
+    {"voiceId": "en-US-William", "displayName": "William", "gender": "Male"},
+    {"voiceId": "en-US-Sarah", "displayName": "Sarah", "gender": "Female"},
+    {"voiceId": "en-US-David", "displayName": "David", "gender": "Male"},
+    {"voiceId": "en-US-Emma", "displayName": "Emma", "gender": "Female"},
+]
+
+class LatencyModel:
+    """Request latency that grows with text length, with random spread around it."""
+
+    def __init__(self, distribution="lognormal", base_ms=300.0, per_char_ms=0.1, jitter=0.3, seed=None):
+        self.distribution = distribution
+        self.base_ms = base_ms
+        self.per_char_ms = per_char_ms
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, chars):
+        """
+        Draw the latency of one request.
+
+        Args:
+            chars (int): Number of characters being synthesized
+
+        Returns:
+            float: Latency in seconds
+        """
+        median_ms = self.base_ms + self.per_char_ms * chars
+        with self._lock:
+            if self.distribution == "fixed":
+                factor = 1.0
+            elif self.distribution == "uniform":
+                factor = self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+            else:
+                # Heavy right tail, like real synthesis under load
+                factor = self._rng.lognormvariate(0, self.jitter)
+        return max(0.0, median_ms * factor) / 1000
+
+class FaultInjector:
+    """Randomly fails requests with throttling or server errors."""
+
+    def __init__(self, rate_limit_rate=0.0, error_rate=0.0, retry_after=1, seed=None):
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """
+        Decide whether a request fails.
+
+        Returns:
+            int: HTTP status code to fail with, or None to serve the request
+        """
+        with self._lock:
+            roll = self._rng.random()
+            status = self._rng.choice((500, 502, 503))
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return status
+        return None
+
+class AudioPayloads:
+    """MP3 payloads of a given speech duration, built by repeating encoded frames."""
+
+    def __init__(self, bitrate="64k", frame_rate=24000, chars_per_second=15.0):
+        self.chars_per_second = chars_per_second
+
+        # One second of audio without Xing or ID3 headers is a plain run of
+        # frames, so repeating it gives a stream that decodes like real speech
+        buffer = io.BytesIO()
+        tone = Sine(220).to_audio_segment(duration=1000, volume=-30)
+        tone = tone.set_frame_rate(frame_rate).set_channels(1)
+        tone.export(buffer, format="mp3", bitrate=bitrate, parameters=["-write_xing", "0"])
+        self.second = buffer.getvalue()
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def for_chars(self, chars):
+        """
+        Get the payload for the speech of a text of the given length.
+
+        Args:
+            chars (int): Number of characters that were synthesized
+
+        Returns:
+            bytes: Encoded MP3 data
+        """
+        seconds = max(1, math.ceil(chars / self.chars_per_second))
+        with self._lock:
+            if seconds not in self._cache:
+                self._cache[seconds] = self.second * seconds
+            return self._cache[seconds]
+
+class MockMurfHandler(BaseHTTPRequestHandler):
+    """Request handler; configuration lives on the server instance."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _fail(self, status):
+        headers = {"Retry-After": str(self.server.faults.retry_after)} if status in (429, 503) else None
+        self.server.count("errors")
+        self._send_json(status, {"errorMessage": f"Injected error {status}"}, headers)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if urlparse(self.path).path != "/api/v1/speech/generate":
+            self._send_json(404, {"errorMessage": "Not found"})
+            return
+
+        try:
+            payload = json.loads(body)
+            text = payload["text"]
+        except (ValueError, KeyError):
+            self._send_json(400, {"errorMessage": "Invalid request"})
+            return
+
+        self.server.count("generate")
+        time.sleep(self.server.latency.sample(len(text)))
+
+        status = self.server.faults.draw()
+        if status is not None:
+            self._fail(status)
+            return
+
+        host = self.headers.get("Host", f"127.0.0.1:{self.server.server_port}")
+        audio_url = f"http://{host}/audio/{uuid.uuid4().hex}.mp3?chars={len(text)}"
+        self._send_json(200, {
+            "audioUrl": audio_url,
+            "audioLengthInSeconds": math.ceil(len(text) / self.server.payloads.chars_per_second),
+            "encodedAudio": None
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        # The path and shape MurfAPI.get_available_voices and check_api_status read
+        if url.path == "/voices":
+            self._send_json(200, {"voices": VOICES})
+            return
+
+        if not url.path.startswith("/audio/"):
+            self._send_json(404, {"errorMessage": "Not found"})
+            return
+
+        self.server.count("downloads")
+        time.sleep(self.server.download_latency)
+        chars = int(parse_qs(url.query).get("chars", ["100"])[0])
+        data = self.server.payloads.for_chars(chars)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class MockMurfServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the mock's configuration and request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=None, faults=None, payloads=None, download_latency=0.0, verbose=False):
+        super().__init__(address, MockMurfHandler)
+        self.latency = latency or LatencyModel()
+        self.faults = faults or FaultInjector()
+        self.payloads = payloads or AudioPayloads()
+        self.download_latency = download_latency
+        self.verbose = verbose
+        self.counters = {"generate": 0, "downloads": 0, "errors": 0}
+        self._counter_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+def start_server(host="127.0.0.1", port=0, **kwargs):
+    """
+    Start the mock server on a background thread.
+
+    Args:
+        host (str): Address to bind
+        port (int): Port to bind, 0 picks a free one
+        **kwargs: Passed to MockMurfServer
+
+    Returns:
+        MockMurfServer: Running server; call shutdown() to stop it
+    """
+    server = MockMurfServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8765, help="Port to bind")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="lognormal",
+                        help="Distribution of synthesis latency")
+    parser.add_argument("--base-ms", type=float, default=300.0,
+                        help="Median latency of a request, excluding text length")
+    parser.add_argument("--per-char-ms", type=float, default=0.1,
+                        help="Extra median latency per synthesized character")
+    parser.add_argument("--jitter", type=float, default=0.3,
+                        help="Spread of the latency distribution")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 500/502/503")
+    parser.add_argument("--retry-after", type=int, default=1,
+                        help="Retry-After seconds sent with 429 and 503")
+    parser.add_argument("--download-ms", type=float, default=20.0,
+                        help="Latency of each audio download")
+    parser.add_argument("--bitrate", default="64k", help="Bitrate of the generated audio")
+    parser.add_argument("--chars-per-second", type=float, default=15.0,
+                        help="Speaking rate used to size the audio payloads")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args()
+
+    server = MockMurfServer(
+        (args.host, args.port),
+        latency=LatencyModel(args.latency, args.base_ms, args.per_char_ms, args.jitter, args.seed),
+        faults=FaultInjector(args.rate_limit_rate, args.error_rate, args.retry_after, args.seed),
+        payloads=AudioPayloads(args.bitrate, chars_per_second=args.chars_per_second),
+        download_latency=args.download_ms / 1000,
+        verbose=args.verbose
+    )
+    print(f"🎙️ Mock Murf API listening on {server.base_url}")
+    print(f"   Point the app at it with MURF_API_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📊 {server.counters}")
+
+if __name__ == "__main__":
+    main()
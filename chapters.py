@@ -0,0 +1,102 @@
+import os
+import re
+from collections import namedtuple
+import fitz  # PyMuPDF
+
+# A chapter of a book as a range of pages: start_page is inclusive and
+# end_page exclusive, both counted from 0
+Chapter = namedtuple("Chapter", ["index", "title", "start_page", "end_page"])
+
+# A line that opens a chapter, e.g. "Chapter 3", "CHAPTER IV" or "Part One"
+CHAPTER_HEADING = re.compile(
+    r'^\s*(chapter|part|book)\s+([0-9]+|[ivxlcdm]+|one|two|three|four|five|six|seven|eight|nine|ten|'
+    r'eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty)\b.*$',
+    re.IGNORECASE
+)
+
+# Only the first lines of a page are searched for a heading
+HEADING_LINES = 5
+
+def _outline_starts(doc):
+    """
+    Get (title, start page) pairs from the PDF outline.
+
+    Uses the shallowest outline level with at least two entries, so a single
+    top-level entry holding the book title does not hide its chapters.
+    """
+    toc = [(level, title.strip(), page - 1) for level, title, page in doc.get_toc(simple=True)
+           if 0 < page <= len(doc)]
+    for level in sorted({level for level, _, _ in toc}):
+        entries = [(title, page) for entry_level, title, page in toc if entry_level == level]
+        if len(entries) >= 2:
+            return entries
+    return []
+
+def _heading_starts(doc):
+    """Get (title, start page) pairs from pages that open with a chapter heading."""
+    starts = []
+    for page_num in range(len(doc)):
+        # type: ignore[attr-defined]
+        lines = [line.strip() for line in doc.load_page(page_num).get_text("text").splitlines() if line.strip()]
+        for line in lines[:HEADING_LINES]:
+            if CHAPTER_HEADING.match(line):
+                starts.append((line, page_num))
+                break
+    return starts
+
+def get_chapters(pdf_path):
+    """
+    Split a PDF into chapters using its outline, or headings as a fallback.
+
+    The outline (table of contents) is used when it has at least two
+    entries at one level. Otherwise pages starting with a heading such as
+    "Chapter 3" open a new chapter. Pages before the first chapter are
+    included in it, and a book with neither becomes a single chapter.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+
+    Returns:
+        list: Chapter tuples covering every page, in reading order
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        page_count = len(doc)
+        starts = _outline_starts(doc)
+        if len(starts) < 2:
+            starts = _heading_starts(doc)
+    finally:
+        doc.close()
+
+    # Keep the first title of each page, in page order
+    seen = set()
+    unique = []
+    for title, page in sorted(starts, key=lambda start: start[1]):
+        if page not in seen:
+            seen.add(page)
+            unique.append((title, page))
+
+    if len(unique) < 2:
+        title = os.path.splitext(os.path.basename(pdf_path))[0]
+        return [Chapter(0, title, 0, page_count)]
+
+    chapters = []
+    for i, (title, page) in enumerate(unique):
+        start = 0 if i == 0 else page
+        end = unique[i + 1][1] if i + 1 < len(unique) else page_count
+        chapters.append(Chapter(i, title or f"Chapter {i + 1}", start, end))
+    return chapters
+
+def chapter_filename(chapter, extension="mp3"):
+    """
+    Build a file name for a chapter that sorts in reading order.
+
+    Args:
+        chapter (Chapter): Chapter to name
+        extension (str): File extension
+
+    Returns:
+        str: File name such as "03 - The Storm.mp3"
+    """
+    title = re.sub(r'[^\w\s.,\'()-]', '', chapter.title).strip()[:60].strip() or "Chapter"
+    return f"{chapter.index + 1:02d} - {title}.{extension}"
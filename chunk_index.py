@@ -0,0 +1,158 @@
+import bisect
+import json
+import os
+from utils.job_manifest import hash_text
+
+# The index of a merged audiobook is written next to it with this suffix
+INDEX_SUFFIX = ".index.json"
+
+# Columns of each entry of "chunks"
+FIELDS = ["char_start", "char_end", "start_ms", "end_ms", "start_byte", "end_byte"]
+
+def index_path(output_path):
+    """Path of the chunk index of the audiobook written to output_path."""
+    return output_path + INDEX_SUFFIX
+
+def describe_text(text):
+    """
+    Summarize a chunk's text for the index without keeping the text.
+
+    Args:
+        text (str): Text of the chunk
+
+    Returns:
+        tuple: (length in characters, SHA-256 of the text)
+    """
+    return len(text), hash_text(text)
+
+def build_index(output_path, writer, texts, spans):
+    """
+    Build the index of a merged audiobook.
+
+    Character offsets are positions in the chunk texts joined by single
+    spaces. Milliseconds count from the start of the audio, and bytes are
+    offsets in the output file, so a chunk can be read or replaced with a
+    single seek. A chunk that could not be merged has an empty range
+    where it belongs and is listed in "missing".
+
+    Args:
+        output_path (str): Path of the merged audiobook
+        writer (Mp3PassthroughWriter): Writer that produced it, after close()
+        texts (list): describe_text() of every chunk, in order
+        spans (list): Entry of writer.spans for every chunk, None for chunks
+            that were not written
+
+    Returns:
+        dict: JSON-serializable index
+    """
+    sample_rate = writer.params[2]
+    rows = []
+    missing = []
+    char_offset = 0
+    byte_offset = audio_start = writer.spans[0][0] if writer.spans else 0
+    sample_offset = 0
+
+    for i, ((chars, _), span) in enumerate(zip(texts, spans)):
+        if span is None:
+            missing.append(i)
+            span = (byte_offset, byte_offset, sample_offset, sample_offset)
+        start_byte, end_byte, start_sample, end_sample = span
+        rows.append([
+            char_offset, char_offset + chars,
+            round(start_sample * 1000 / sample_rate), round(end_sample * 1000 / sample_rate),
+            start_byte, end_byte
+        ])
+        char_offset += chars + 1
+        byte_offset, sample_offset = end_byte, end_sample
+
+    return {
+        "version": 1,
+        "audio": os.path.basename(output_path),
+        "sample_rate": sample_rate,
+        "channels": writer.params[3],
+        "bitrate": writer.bitrate,
+        "pause_ms": writer.pause_ms,
+        "duration_ms": round(writer.samples * 1000 / sample_rate),
+        "audio_start_byte": audio_start,
+        "bytes": os.path.getsize(output_path),
+        "fields": FIELDS,
+        "chunks": rows,
+        "text_sha256": [text_hash for _, text_hash in texts],
+        "missing": missing
+    }
+
+def write_index(output_path, index):
+    """
+    Write the index next to the audiobook, without the lookup tables
+    cached on it.
+
+    Args:
+        output_path (str): Path of the merged audiobook
+        index (dict): Index from build_index()
+    """
+    path = index_path(output_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({key: value for key, value in index.items() if not key.startswith("_")}, f,
+                  separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+def read_index(output_path, check_size=True):
+    """
+    Read the index of an audiobook.
+
+    Args:
+        output_path (str): Path of the merged audiobook
+        check_size (bool): Only accept the index if the file still has the
+            size it records; repair reads it regardless
+
+    Returns:
+        dict: Index, or None if there is none or it no longer matches the file
+    """
+    try:
+        with open(index_path(output_path), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not check_size:
+        return index
+    if not os.path.exists(output_path) or os.path.getsize(output_path) != index.get("bytes"):
+        return None
+    return index
+
+def get_chunk(index, number):
+    """
+    Get one entry of the index as a dict.
+
+    Args:
+        index (dict): Index from read_index()
+        number (int): Chunk index
+
+    Returns:
+        dict: char_start, char_end, start_ms, end_ms, start_byte, end_byte,
+            text_sha256 and missing
+    """
+    entry = dict(zip(index["fields"], index["chunks"][number]))
+    entry["text_sha256"] = index["text_sha256"][number]
+    entry["missing"] = number in index["missing"]
+    return entry
+
+def _lookup(index):
+    """Character starts and millisecond ends of the chunks, built once and cached on the index."""
+    lookup = index.get("_lookup")
+    if lookup is None or lookup[0] is not index["chunks"]:
+        rows = index["chunks"]
+        lookup = (rows, [row[0] for row in rows], [row[3] for row in rows])
+        index["_lookup"] = lookup
+    return lookup
+
+def chunk_at_char(index, char_offset):
+    """Get the number of the chunk holding a character offset."""
+    _, starts, _ = _lookup(index)
+    return max(bisect.bisect_right(starts, char_offset) - 1, 0)
+
+def chunk_at_ms(index, ms):
+    """Get the number of the chunk playing at a time, or the one after the pause at that time."""
+    _, _, ends = _lookup(index)
+    return min(bisect.bisect_right(ends, ms), len(ends) - 1)
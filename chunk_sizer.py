@@ -0,0 +1,181 @@
+import math
+import threading
+import time
+from collections import deque
+from utils.murf_api import MAX_TEXT_LENGTH, DEFAULT_MAX_CONCURRENCY
+
+def _solve(matrix, vector):
+    """Solve a small linear system by Gaussian elimination; returns None if it is singular."""
+    size = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(size):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][size] / rows[i][i] for i in range(size)]
+
+def fit_latency(samples):
+    """
+    Fit request latency against text length.
+
+    Tries ``a + b*chars + q*chars**2`` first so that latency growing faster
+    than linearly is noticed, and falls back to a straight line when the
+    curve does not fit or bends the wrong way. Lengths are scaled to
+    thousands of characters to keep the system well conditioned.
+
+    Args:
+        samples (iterable): (chars, seconds) pairs
+
+    Returns:
+        tuple: (a, b, q) with latency in seconds for a length in characters,
+            or None if there are not enough distinct lengths
+    """
+    points = [(chars / 1000.0, seconds) for chars, seconds in samples]
+    if len({x for x, _ in points}) < 2:
+        return None
+
+    for degree in (2, 1):
+        powers = range(degree + 1)
+        matrix = [[sum(x ** (i + j) for x, _ in points) for j in powers] for i in powers]
+        vector = [sum(y * x ** i for x, y in points) for i in powers]
+        coefficients = _solve(matrix, vector)
+        if coefficients is None:
+            continue
+
+        coefficients += [0.0] * (3 - len(coefficients))
+        a, b, q = coefficients
+        if degree == 2 and (q < 0 or len(points) < 8):
+            continue
+        return max(a, 0.0), max(b, 0.0) / 1000, max(q, 0.0) / 1e6
+
+    return None
+
+class AdaptiveChunkSizer:
+    """
+    Chooses the size of upcoming chunks from the latency measured so far.
+
+    Instances are callables, so one can be passed as ``max_length`` to
+    text_chunker.iter_chunks. The first chunks are sized around the
+    initial size to sample latency at several lengths. After that every
+    new chunk gets the size that minimizes the estimated wall time for the
+    remaining text: the number of waves of parallel requests still needed
+    times the fitted latency of one request. Measured latency includes
+    retries after rate limiting, so throttling pushes towards fewer,
+    larger requests.
+    """
+
+    # Sizes tried while there are too few measurements, relative to initial_size
+    EXPLORE_FACTORS = (1.0, 0.5, 1.5, 0.75, 1.25, 1.0)
+
+    def __init__(self, initial_size=3000, min_size=500, max_size=MAX_TEXT_LENGTH,
+                 workers=DEFAULT_MAX_CONCURRENCY, total_chars=None, window=64, step=250):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.initial_size = self._clamp(initial_size)
+        self.workers = max(1, workers)
+        self.total_chars = total_chars
+        self.step = step
+        self.size = self.initial_size
+        self.model = None
+
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._chunks_sized = 0
+        self._requests = 0
+        self._chars_done = 0
+        self._started = None
+        self._last_done = None
+        self._history = []
+
+    def _clamp(self, size):
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    def __call__(self):
+        """
+        Get the maximum length of the next chunk.
+
+        Returns:
+            int: Chunk size in characters
+        """
+        with self._lock:
+            if self._started is None:
+                self._started = time.perf_counter()
+
+            if self._chunks_sized < len(self.EXPLORE_FACTORS):
+                size = self._clamp(self.initial_size * self.EXPLORE_FACTORS[self._chunks_sized])
+            else:
+                size = self.size
+
+            if not self._history or self._history[-1][1] != size:
+                self._history.append((self._requests, size))
+            self._chunks_sized += 1
+            return size
+
+    def record(self, chars, seconds):
+        """
+        Record the latency of one synthesis request and update the target size.
+
+        Args:
+            chars (int): Length of the synthesized text
+            seconds (float): Wall time of the request, including retries
+        """
+        with self._lock:
+            self._samples.append((chars, seconds))
+            self._requests += 1
+            self._chars_done += chars
+            self._last_done = time.perf_counter()
+
+            model = fit_latency(self._samples)
+            if model is not None:
+                self.model = model
+                self.size = self._best_size()
+
+    def _estimated_seconds(self, size, remaining):
+        a, b, q = self.model
+        latency = a + b * size + q * size * size
+        if remaining is None:
+            # Length unknown: maximize throughput of a full pool
+            return latency / size
+        waves = math.ceil(remaining / (size * self.workers))
+        return waves * latency
+
+    def _best_size(self):
+        remaining = None
+        if self.total_chars is not None:
+            remaining = max(self.total_chars - self._chars_done, 1)
+
+        candidates = range(self.min_size, self.max_size + 1, self.step)
+        return min(candidates, key=lambda size: (self._estimated_seconds(size, remaining), -size))
+
+    def summary(self):
+        """
+        Describe the sizes chosen and the throughput reached.
+
+        Returns:
+            dict: JSON-serializable summary for the job report
+        """
+        with self._lock:
+            elapsed = (self._last_done - self._started) if self._last_done and self._started else 0.0
+            model = None
+            if self.model is not None:
+                a, b, q = self.model
+                model = {"overhead_seconds": a, "seconds_per_char": b, "seconds_per_char_squared": q}
+            return {
+                "initial_size": self.initial_size,
+                "final_size": self._history[-1][1] if self._history else self.initial_size,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "workers": self.workers,
+                "size_changes": [{"after_requests": requests, "size": size} for requests, size in self._history],
+                "latency_model": model,
+                "requests": self._requests,
+                "chars": self._chars_done,
+                "seconds": elapsed,
+                "chars_per_second": self._chars_done / elapsed if elapsed > 0 else 0.0,
+                "chunks_per_second": self._requests / elapsed if elapsed > 0 else 0.0
+            }
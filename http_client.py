@@ -0,0 +1,160 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from utils import metrics
+
+# Load environment variables
+load_dotenv()
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Responses whose Retry-After header is honored
+RETRY_AFTER_STATUS_CODES = (429, 503)
+
+# Methods that are safe to send twice. Any other request is only retried when
+# it cannot have been acted on: it never reached the server, or the server
+# asked for it to be sent again later.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+DEFAULT_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+DEFAULT_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+
+class HTTPClient:
+    """Shared HTTP transport with connection pooling, keep-alive and retries."""
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, backoff_base=0.5, backoff_max=30.0,
+                 retry_after_max=120.0, pool_maxsize=DEFAULT_POOL_MAXSIZE, host_pool_sizes=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=pool_maxsize))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=pool_maxsize))
+
+        self._host_pool_sizes = {}
+        for prefix, size in (host_pool_sizes or {}).items():
+            self.configure_host(prefix, size)
+
+    def configure_host(self, prefix, pool_maxsize):
+        """
+        Give a host its own connection pool of the requested size.
+
+        Args:
+            prefix (str): URL prefix of the host, e.g. "https://api.murf.ai"
+            pool_maxsize (int): Maximum number of kept-alive connections
+        """
+        with self._lock:
+            if self._host_pool_sizes.get(prefix, 0) >= pool_maxsize:
+                return
+            self._host_pool_sizes[prefix] = pool_maxsize
+            self.session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize))
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after_delay(self, response):
+        """Parse a Retry-After header given either in seconds or as an HTTP date."""
+        if response.status_code not in RETRY_AFTER_STATUS_CODES:
+            return None
+
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+
+        return min(max(delay, 0.0), self.retry_after_max)
+
+    def request(self, method, url, retries=None, **kwargs):
+        """
+        Send a request, retrying connection errors and retryable responses.
+
+        A request that is not idempotent, such as a POST that starts a
+        billed synthesis, is not retried after a read timeout or a
+        transient server error, since the server may already have done
+        the work; only failures to connect and responses with a
+        Retry-After status are retried.
+
+        Args:
+            method (str): HTTP method
+            url (str): Request URL
+            retries (int): Override for the number of retries
+            **kwargs: Passed on to requests.Session.request
+
+        Returns:
+            requests.Response: The final response, which may still be an
+                error response once the retries are used up
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt failed
+                to get a response at all
+        """
+        max_retries = self.max_retries if retries is None else retries
+        if method.upper() in IDEMPOTENT_METHODS:
+            retry_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+            retry_statuses = RETRY_STATUS_CODES
+        else:
+            # ConnectTimeout is a ConnectionError, a ReadTimeout is not
+            retry_errors = (requests.exceptions.ConnectionError,)
+            retry_statuses = RETRY_AFTER_STATUS_CODES
+
+        for attempt in range(max_retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except retry_errors as e:
+                if attempt >= max_retries:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"Request to {url} failed ({str(e)}), retrying in {delay:.1f}s...")
+                metrics.observe("http.retry", delay, errors=1)
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in retry_statuses or attempt >= max_retries:
+                return response
+
+            delay = self._retry_after_delay(response)
+            if delay is None:
+                delay = self._backoff_delay(attempt)
+
+            print(f"Request to {url} returned {response.status_code}, retrying in {delay:.1f}s...")
+            metrics.observe("http.retry", delay, errors=1)
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        """Send a GET request. See request()."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request. See request()."""
+        return self.request("POST", url, **kwargs)
+
+# Global instance for easy access
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client():
+    """Get or create the shared HTTPClient instance."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HTTPClient()
+    return _http_client
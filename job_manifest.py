@@ -0,0 +1,337 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_JOBS_DIR = os.getenv(
+    "AUDIOBOOK_JOBS_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "audiobook-ai-agent", "jobs")
+)
+
+# Chunk states recorded in the manifest
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Minimum number of seconds between two manifest writes while a job runs
+SAVE_INTERVAL = 2.0
+
+def hash_file(path, block_size=1 << 20):
+    """
+    Compute the SHA-256 digest of a file without reading it into memory at once.
+
+    Args:
+        path (str): Path to the file
+        block_size (int): Number of bytes read at a time
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_text(text):
+    """Hash a chunk of text so the manifest can tell whether it changed."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class JobManifest:
+    """Per-chunk checkpoint of an audiobook job, stored as JSON on disk."""
+
+    def __init__(self, job_dir, data):
+        self.job_dir = job_dir
+        self.path = os.path.join(job_dir, "manifest.json")
+        self.chunks_dir = os.path.join(job_dir, "chunks")
+        self.data = data
+        self._last_save = 0.0
+        self._previous_audio = {}
+        self._reused = set()
+
+        os.makedirs(self.chunks_dir, exist_ok=True)
+
+    @staticmethod
+    def make_job_id(pdf_hash, settings):
+        """
+        Build the job ID for a PDF and the settings that affect its audio.
+
+        Args:
+            pdf_hash (str): Content hash of the PDF from hash_file()
+            settings (dict): Synthesis settings such as voice and chunk size
+
+        Returns:
+            str: Job ID
+        """
+        payload = json.dumps([pdf_hash, settings], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+    @classmethod
+    def open(cls, pdf_path, settings, jobs_dir=DEFAULT_JOBS_DIR, book=None, keep_audio=False):
+        """
+        Load the manifest of an earlier run of the same job, or start a new one.
+
+        Args:
+            pdf_path (str): Path to the PDF being converted
+            settings (dict): Synthesis settings such as voice and chunk size
+            jobs_dir (str): Directory holding every job
+            book (str): Name of the book, shared by every edition of it so a
+                revised PDF can find the job of the previous one
+            keep_audio (bool): Keep the chunk audio after the job finishes,
+                so a later revision of the book can reuse it
+
+        Returns:
+            JobManifest: Manifest of the job
+        """
+        pdf_hash = hash_file(pdf_path)
+        job_id = cls.make_job_id(pdf_hash, settings)
+        job_dir = os.path.join(os.path.expanduser(jobs_dir), job_id)
+        manifest_path = os.path.join(job_dir, "manifest.json")
+
+        data = None
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable job manifest {manifest_path}: {str(e)}")
+
+        if data is None:
+            data = {
+                "job_id": job_id,
+                "pdf_sha256": pdf_hash,
+                "pdf_name": os.path.basename(pdf_path),
+                "settings": settings,
+                "book": book,
+                "keep_audio": keep_audio,
+                "status": PENDING,
+                "created": time.time(),
+                "updated": time.time(),
+                "chunks": []
+            }
+
+        if book is not None:
+            data["book"] = book
+        data["keep_audio"] = data.get("keep_audio") or keep_audio
+        return cls(job_dir, data)
+
+    @classmethod
+    def load(cls, job_dir):
+        """
+        Load the manifest saved in a job directory.
+
+        Args:
+            job_dir (str): Directory of the job
+
+        Returns:
+            JobManifest: Manifest of the job, or None if it cannot be read
+        """
+        try:
+            with open(os.path.join(job_dir, "manifest.json"), "r", encoding="utf-8") as f:
+                return cls(job_dir, json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def find_previous(self, jobs_dir=DEFAULT_JOBS_DIR):
+        """
+        Find the most recent other job of the same book and voice whose chunk audio was kept.
+
+        Args:
+            jobs_dir (str): Directory holding every job
+
+        Returns:
+            JobManifest: Manifest of the previous job, or None if there is none
+        """
+        book = self.data.get("book")
+        if not book:
+            return None
+
+        jobs_dir = os.path.expanduser(jobs_dir)
+        candidates = []
+        for job_id in os.listdir(jobs_dir):
+            if job_id == self.job_id or not os.path.exists(os.path.join(jobs_dir, job_id, "manifest.json")):
+                continue
+            manifest = JobManifest.load(os.path.join(jobs_dir, job_id))
+            if manifest is None or manifest.data.get("book") != book or not manifest.data.get("keep_audio"):
+                continue
+            if manifest.data["settings"].get("voice_id") != self.data["settings"].get("voice_id"):
+                continue
+            candidates.append(manifest)
+
+        return max(candidates, key=lambda manifest: manifest.data["updated"], default=None)
+
+    def use_previous(self, previous):
+        """
+        Diff against the chunks of a previous job so that unchanged ones are reused.
+
+        Args:
+            previous (JobManifest): Manifest of the previous job, e.g. from find_previous()
+        """
+        self._previous_audio = {
+            entry["text_sha256"]: entry["path"] for entry in previous.chunks
+            if entry["status"] == DONE and entry["path"]
+        }
+        self.data["previous_job"] = previous.job_id
+
+    def reuse_previous(self, index, text):
+        """
+        Take over the audio of a chunk with the same text from the previous job.
+
+        The file is linked, or copied, into this job's chunk directory, so
+        it stays available when the previous job is deleted.
+
+        Args:
+            index (int): Chunk index
+            text (str): Text of the chunk in this run
+
+        Returns:
+            str: Path to the chunk's audio, or None if it has to be synthesized
+        """
+        source = self._previous_audio.get(hash_text(text))
+        if source is None or not os.path.exists(source):
+            return None
+
+        path = os.path.join(self.chunks_dir, f"chunk_{index+1:05d}.mp3")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error reusing audio of chunk {index+1}: {str(e)}")
+            return None
+
+        self._reused.add(index)
+        return path
+
+    @property
+    def job_id(self):
+        return self.data["job_id"]
+
+    @property
+    def chunks(self):
+        return self.data["chunks"]
+
+    def _entry(self, index):
+        while len(self.chunks) <= index:
+            self.chunks.append({"status": PENDING, "path": None, "chars": 0, "text_sha256": None})
+        return self.chunks[index]
+
+    def completed_path(self, index, text):
+        """
+        Look up the audio of a chunk finished by an earlier run.
+
+        Args:
+            index (int): Chunk index
+            text (str): Text of the chunk in this run
+
+        Returns:
+            str: Path to the audio file, or None if the chunk has to be synthesized
+        """
+        if index >= len(self.chunks):
+            return None
+
+        entry = self.chunks[index]
+        if entry["status"] != DONE or entry["text_sha256"] != hash_text(text):
+            return None
+        if not entry["path"] or not os.path.exists(entry["path"]):
+            return None
+        return entry["path"]
+
+    def record(self, index, text, path):
+        """
+        Record the outcome of a chunk and save the manifest now and then.
+
+        Args:
+            index (int): Chunk index
+            text (str): Text of the chunk
+            path (str): Path to the chunk's audio, or None if it failed
+        """
+        entry = self._entry(index)
+        text_hash = hash_text(text)
+        # A resumed chunk keeps the flag it got when it was first taken over
+        reused = index in self._reused or (
+            entry.get("reused", False) and entry["path"] == path and entry["text_sha256"] == text_hash
+        )
+        entry["status"] = DONE if path else FAILED
+        entry["path"] = path
+        entry["chars"] = len(text)
+        entry["text_sha256"] = text_hash
+        entry["reused"] = bool(path) and reused
+
+        if path is None or time.time() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+
+    def completed_count(self):
+        """
+        Count the chunks whose audio an earlier run already produced.
+
+        Returns:
+            int: Number of finished chunks that can be reused
+        """
+        return sum(
+            1 for entry in self.chunks
+            if entry["status"] == DONE and entry["path"] and os.path.exists(entry["path"])
+        )
+
+    def save(self):
+        """Write the manifest atomically so a crash never leaves it half written."""
+        self.data["updated"] = time.time()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+        self._last_save = time.time()
+
+    def revision_summary(self):
+        """
+        Describe how much of the previous job was reused.
+
+        Returns:
+            dict: Reused and re-synthesized chunks and characters, or None
+                if the job was not diffed against a previous one
+        """
+        if "previous_job" not in self.data:
+            return None
+
+        reused = [entry for entry in self.chunks if entry.get("reused")]
+        changed = [entry for entry in self.chunks if not entry.get("reused")]
+        return {
+            "previous_job": self.data["previous_job"],
+            "reused_chunks": len(reused),
+            "reused_chars": sum(entry["chars"] for entry in reused),
+            "changed_chunks": len(changed),
+            "changed_chars": sum(entry["chars"] for entry in changed)
+        }
+
+    def finish(self, total_chunks):
+        """
+        Mark the job complete and drop the chunk audio kept for resuming.
+
+        When the manifest keeps audio for later revisions, only the files of
+        chunks that are no longer part of the job are removed.
+
+        Args:
+            total_chunks (int): Number of chunks in the finished job
+        """
+        del self.chunks[total_chunks:]
+        self.data["status"] = DONE
+        if self.data.get("keep_audio"):
+            kept = {os.path.abspath(entry["path"]) for entry in self.chunks if entry["path"]}
+            for name in os.listdir(self.chunks_dir):
+                path = os.path.join(self.chunks_dir, name)
+                if os.path.abspath(path) not in kept:
+                    os.remove(path)
+        else:
+            shutil.rmtree(self.chunks_dir, ignore_errors=True)
+        for entry in self.chunks:
+            if entry["path"] and not os.path.exists(entry["path"]):
+                entry["path"] = None
+        self.save()
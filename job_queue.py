@@ -0,0 +1,291 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from utils.job_manifest import DEFAULT_JOBS_DIR
+from utils.audio_cache import get_audio_cache
+from utils.pipeline import convert_pdf_to_audiobook, repair_audiobook
+
+# Load environment variables
+load_dotenv()
+
+# Number of books converted at the same time by one server process
+DEFAULT_MAX_JOBS = int(os.getenv("AUDIOBOOK_MAX_JOBS", "2"))
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Minimum number of seconds between two writes of a running job's progress
+PROGRESS_SAVE_INTERVAL = 1.0
+
+class JobQueue:
+    """Runs audiobook jobs on background threads and keeps their state on disk."""
+
+    def __init__(self, jobs_dir=DEFAULT_JOBS_DIR, max_workers=DEFAULT_MAX_JOBS):
+        self.queue_dir = os.path.join(os.path.expanduser(jobs_dir), "queue")
+        self._jobs = {}
+        self._last_save = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="audiobook-job")
+
+        os.makedirs(self.queue_dir, exist_ok=True)
+        self._load()
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.queue_dir, job_id)
+
+    def _load(self):
+        """Load saved jobs and restart the ones a previous process did not finish."""
+        for job_id in sorted(os.listdir(self.queue_dir)):
+            state_path = os.path.join(self._job_dir(job_id), "job.json")
+            try:
+                with open(state_path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            self._jobs[job_id] = job
+            if job["status"] in (QUEUED, RUNNING):
+                # The job manifest lets the restarted job skip chunks it already converted
+                job["status"] = QUEUED
+                job["message"] = "⏳ Restarted after a server restart"
+                self._save(job)
+                if job.get("repair") is not None:
+                    self._executor.submit(self._run_repair, job_id, job["repair"]["deep"])
+                else:
+                    self._executor.submit(self._run, job_id)
+
+    def _save(self, job):
+        """Write a job's state atomically."""
+        state_path = os.path.join(self._job_dir(job["id"]), "job.json")
+        tmp_path = f"{state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, state_path)
+        self._last_save[job["id"]] = time.time()
+
+    def _update(self, job_id, force_save=True, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            if force_save or time.time() - self._last_save.get(job_id, 0) >= PROGRESS_SAVE_INTERVAL:
+                self._save(job)
+
+    def submit(self, pdf_path, settings, name=None):
+        """
+        Queue a PDF for conversion.
+
+        The PDF is copied into the job's directory, so the caller can delete
+        its own copy as soon as this returns.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            settings (dict): Conversion settings: voice_id, chunk_size,
+                synth_workers, use_cache, streaming, adaptive, incremental,
+                book, chapters, progressive, polish and loudness
+            name (str): Display name of the book, defaults to the file name
+
+        Returns:
+            str: ID of the new job
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+
+        name = name or os.path.basename(pdf_path)
+        stored_pdf = os.path.join(job_dir, "input.pdf")
+        shutil.copyfile(pdf_path, stored_pdf)
+
+        job = {
+            "id": job_id,
+            "name": name,
+            "pdf_path": stored_pdf,
+            "output_path": os.path.join(job_dir, f"audiobook_{os.path.splitext(name)[0]}.mp3"),
+            "settings": settings,
+            "status": QUEUED,
+            "progress": 0,
+            "message": "⏳ Waiting for a free worker...",
+            "error": None,
+            "chapters": [],
+            "created": time.time(),
+            "started": None,
+            "finished": None
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save(job)
+
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id):
+        settings = self._jobs[job_id]["settings"]
+        self._update(job_id, status=RUNNING, started=time.time(), error=None,
+                     message="📖 Starting conversion...")
+
+        def on_progress(percent, message):
+            self._update(job_id, force_save=False, progress=percent, message=message)
+        
+        def on_chapter_ready(chapter):
+            # Finished chapters can be played while the rest of the book is converted
+            with self._lock:
+                job = self._jobs[job_id]
+                chapters = [entry for entry in job.get("chapters", []) if entry["index"] != chapter["index"]]
+                chapters.append({"index": chapter["index"], "title": chapter["title"], "path": chapter["path"]})
+                job["chapters"] = sorted(chapters, key=lambda entry: entry["index"])
+                self._save(job)
+
+        try:
+            convert_pdf_to_audiobook(
+                self._jobs[job_id]["pdf_path"],
+                self._jobs[job_id]["output_path"],
+                settings.get("voice_id", "en-US-William"),
+                chunk_size=settings.get("chunk_size", 3000),
+                synth_workers=settings.get("synth_workers", 4),
+                cache=get_audio_cache() if settings.get("use_cache", True) else None,
+                streaming=settings.get("streaming", False),
+                adaptive=settings.get("adaptive", False),
+                incremental=settings.get("incremental", False),
+                book=settings.get("book") or os.path.splitext(self._jobs[job_id]["name"])[0],
+                chapters=settings.get("chapters", False),
+                on_chapter_ready=on_chapter_ready,
+                progressive=settings.get("progressive", False),
+                polish=settings.get("polish", False),
+                loudness=settings.get("loudness", False),
+                progress_callback=on_progress
+            )
+        except Exception as e:
+            print(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, status=FAILED, error=str(e), finished=time.time(),
+                         message="❌ Conversion failed")
+            return
+
+        self._update(job_id, status=DONE, progress=100, finished=time.time(),
+                     message="✅ Audiobook generation complete!")
+
+    def retry(self, job_id):
+        """
+        Queue a failed job again; chunks it already converted are reused.
+
+        Args:
+            job_id (str): ID of the failed job
+
+        Returns:
+            bool: True if the job was queued again
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != FAILED:
+                return False
+            job.update(status=QUEUED, progress=0, message="⏳ Waiting for a free worker...")
+            self._save(job)
+
+        self._executor.submit(self._run, job_id)
+        return True
+
+    def repair(self, job_id, deep=False):
+        """
+        Queue a check of a finished job's audiobook that re-synthesizes only
+        its missing or damaged chunks.
+
+        Args:
+            job_id (str): ID of the finished job
+            deep (bool): Also decode every chunk to find damage inside it
+
+        Returns:
+            bool: True if the repair was queued
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            # Chunks cut to adaptive sizes cannot be found in the PDF again
+            if job is None or job["status"] != DONE or job["settings"].get("chapters") \
+                    or job["settings"].get("adaptive"):
+                return False
+            job.update(status=QUEUED, progress=0, repair={"deep": deep},
+                       message="⏳ Waiting for a free worker...")
+            self._save(job)
+
+        self._executor.submit(self._run_repair, job_id, deep)
+        return True
+
+    def _run_repair(self, job_id, deep):
+        settings = self._jobs[job_id]["settings"]
+        self._update(job_id, status=RUNNING, error=None, message="🩺 Checking the audiobook...")
+
+        def on_progress(percent, message):
+            self._update(job_id, force_save=False, progress=percent, message=message)
+
+        try:
+            summary = repair_audiobook(
+                self._jobs[job_id]["pdf_path"],
+                self._jobs[job_id]["output_path"],
+                settings.get("voice_id", "en-US-William"),
+                chunk_size=settings.get("chunk_size", 3000),
+                synth_workers=settings.get("synth_workers", 4),
+                deep=deep,
+                adaptive=settings.get("adaptive", False),
+                incremental=settings.get("incremental", False),
+                polish=settings.get("polish", False),
+                loudness=settings.get("loudness", False),
+                progress_callback=on_progress
+            )
+        except Exception as e:
+            print(f"Repair of job {job_id} failed: {str(e)}")
+            # The audiobook is only replaced once a repair succeeds, so the job stays usable
+            self._update(job_id, status=DONE, progress=100, error=str(e), repair=None,
+                         message="❌ Repair failed")
+            return
+
+        if summary["unrepaired"]:
+            message = (f"⚠️ {len(summary['unrepaired'])} damaged chunks could not be repaired; "
+                       f"the audiobook was left unchanged")
+        elif summary["repaired"]:
+            message = f"✅ Repaired {len(summary['repaired'])} damaged chunks"
+        else:
+            message = f"✅ All {summary['checked']} chunks are intact"
+        self._update(job_id, status=DONE, progress=100, finished=time.time(), repair=None, message=message)
+
+    def get(self, job_id):
+        """
+        Get a snapshot of a job's state.
+
+        Args:
+            job_id (str): ID of the job
+
+        Returns:
+            dict: Copy of the job's state, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list_jobs(self):
+        """
+        Get snapshots of every job, newest first.
+
+        Returns:
+            list: Job state dictionaries
+        """
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()]
+        return sorted(jobs, key=lambda job: job["created"], reverse=True)
+
+# Global instance for easy access
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Get or create the shared JobQueue instance."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
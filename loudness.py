@@ -0,0 +1,322 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from pydub import AudioSegment
+from utils import metrics
+from utils.mp3_utils import iter_frames, info_tag
+
+# Loudness every chunk is brought to, in LUFS
+DEFAULT_TARGET_LUFS = float(os.getenv("AUDIOBOOK_TARGET_LUFS", "-18"))
+
+# Gain is limited so that sample peaks stay below this level, in dBFS
+PEAK_CEILING_DB = -1.0
+
+# Chunks whose gain is smaller than this are kept as they are, in dB
+MIN_GAIN_DB = 0.5
+
+# Decoded audio held in memory at once, in seconds
+BATCH_SECONDS = 600
+
+# BS.1770 gating: 400 ms blocks with 75% overlap, measured as 100 ms sub-blocks
+_SUB_BLOCKS_PER_BLOCK = 4
+_ABSOLUTE_GATE = -70.0
+_RELATIVE_GATE = -10.0
+
+def _biquad_power(b, a, frequencies, sample_rate):
+    """Squared magnitude response of a biquad filter at the given frequencies."""
+    z = np.exp(-2j * np.pi * frequencies / sample_rate)
+    numerator = b[0] + b[1] * z + b[2] * z * z
+    denominator = a[0] + a[1] * z + a[2] * z * z
+    return np.abs(numerator / denominator) ** 2
+
+def k_weighting(frequencies, sample_rate):
+    """
+    Get the power response of the BS.1770 K-weighting filter.
+
+    The filter is a high shelf modelling the head followed by a high pass,
+    designed for any sample rate with the parameters of the standard.
+
+    Args:
+        frequencies (ndarray): Frequencies in Hz
+        sample_rate (int): Sample rate in Hz
+
+    Returns:
+        ndarray: Power gain at each frequency
+    """
+    gain_db, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    k = np.tan(np.pi * fc / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = _biquad_power(
+        ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        frequencies, sample_rate
+    )
+
+    q, fc = 0.5003270373238773, 38.13547087602444
+    k = np.tan(np.pi * fc / sample_rate)
+    a0 = 1 + k / q + k * k
+    high_pass = _biquad_power(
+        (1.0, -2.0, 1.0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        frequencies, sample_rate
+    )
+    return shelf * high_pass
+
+def read_samples(path):
+    """
+    Decode an audio file into an array of samples.
+
+    Args:
+        path (str): Path of the audio file
+
+    Returns:
+        tuple: (samples, sample_rate, bitrate) with samples as float32 in
+            [-1, 1] shaped (frames, channels), and the MP3 bitrate in kbit/s
+            or None for other formats
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    bitrate = next((header.bitrate for offset, header in iter_frames(data)
+                    if info_tag(data, offset, header) is None), None)
+
+    audio_segment = AudioSegment.from_file(path).set_sample_width(2)
+    samples = np.frombuffer(audio_segment.raw_data, dtype=np.int16).reshape(-1, audio_segment.channels)
+    return samples.astype(np.float32) / 32768.0, audio_segment.frame_rate, bitrate
+
+def measure_loudness(chunks, sample_rate):
+    """
+    Measure the integrated loudness of a batch of chunks.
+
+    Every chunk is cut into 100 ms sub-blocks, and the sub-blocks of the
+    whole batch are K-weighted together in the frequency domain with a
+    single FFT. Gated 400 ms blocks are then formed from sub-block
+    energies and averaged per chunk, following BS.1770.
+
+    Args:
+        chunks (list): Sample arrays of shape (frames, channels), all with the
+            same number of channels and at sample_rate
+        sample_rate (int): Sample rate of the chunks
+
+    Returns:
+        ndarray: Loudness of each chunk in LUFS, -inf for silent chunks
+    """
+    size = sample_rate // 10
+    counts = np.array([max(1, len(samples) // size) for samples in chunks])
+
+    # One row per sub-block and channel, in double precision, which pocketfft
+    # transforms faster than single; a chunk shorter than a sub-block is zero-padded
+    channels = chunks[0].shape[1]
+    rows = np.zeros((int(counts.sum()), channels, size))
+    offset = 0
+    for samples, count in zip(chunks, counts):
+        if len(samples) >= count * size:
+            rows[offset:offset + count] = samples[:count * size].reshape(count, size, channels).transpose(0, 2, 1)
+        else:
+            rows[offset, :, :len(samples)] = samples.T
+        offset += count
+
+    spectrum = np.fft.rfft(rows.reshape(-1, size), axis=1)
+    weights = k_weighting(np.fft.rfftfreq(size, 1.0 / sample_rate), sample_rate)
+    # Parseval: bins other than DC and Nyquist stand for two
+    weights[1:(size + 1) // 2] *= 2
+    energy = (np.abs(spectrum) ** 2) @ weights / (size * size)
+    energy = energy.reshape(-1, channels).sum(axis=1)
+
+    # 400 ms blocks from four consecutive sub-blocks of the same chunk
+    cumulative = np.concatenate(([0.0], np.cumsum(energy)))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    span = np.minimum(counts, _SUB_BLOCKS_PER_BLOCK)
+    blocks_per_chunk = counts - span + 1
+    chunk_ids = np.repeat(np.arange(len(chunks)), blocks_per_chunk)
+    block_offsets = np.cumsum(blocks_per_chunk) - blocks_per_chunk
+    starts = offsets[chunk_ids] + np.arange(len(chunk_ids)) - block_offsets[chunk_ids]
+    block_energy = (cumulative[starts + span[chunk_ids]] - cumulative[starts]) / span[chunk_ids]
+
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10 * np.log10(block_energy)
+
+    def gated_mean(mask):
+        totals = np.bincount(chunk_ids, weights=block_energy * mask, minlength=len(chunks))
+        numbers = np.bincount(chunk_ids, weights=mask.astype(float), minlength=len(chunks))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return totals / numbers
+
+    above_absolute = block_loudness > _ABSOLUTE_GATE
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative_gate = -0.691 + 10 * np.log10(gated_mean(above_absolute)) + _RELATIVE_GATE
+    gated = above_absolute & (block_loudness > relative_gate[chunk_ids])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        loudness = -0.691 + 10 * np.log10(gated_mean(gated))
+    return np.nan_to_num(loudness, nan=-np.inf)
+
+def target_gains(loudness, peaks, target_lufs=DEFAULT_TARGET_LUFS, ceiling_db=PEAK_CEILING_DB):
+    """
+    Get the gain that brings each chunk to the target loudness.
+
+    Args:
+        loudness (ndarray): Loudness of each chunk in LUFS
+        peaks (ndarray): Sample peak of each chunk, as a fraction of full scale
+        target_lufs (float): Loudness to reach
+        ceiling_db (float): Highest sample peak allowed after the gain, in dBFS
+
+    Returns:
+        ndarray: Gain of each chunk in dB; 0 for silent chunks
+    """
+    with np.errstate(divide="ignore"):
+        headroom = ceiling_db - 20 * np.log10(peaks)
+    gains = np.minimum(target_lufs - loudness, headroom)
+    return np.where(np.isfinite(loudness) & np.isfinite(gains), gains, 0.0)
+
+def apply_gains(chunks, gains_db):
+    """
+    Apply one gain per chunk to a batch of chunks in a single pass.
+
+    Args:
+        chunks (list): Sample arrays of shape (frames, channels)
+        gains_db (ndarray): Gain of each chunk in dB
+
+    Returns:
+        list: Scaled chunks as 16-bit sample arrays
+    """
+    lengths = [len(samples) for samples in chunks]
+    factors = np.repeat((32768.0 * 10 ** (np.asarray(gains_db) / 20)).astype(np.float32), lengths)
+    scaled = np.concatenate(chunks)
+    scaled *= factors[:, np.newaxis]
+    np.clip(scaled, -32768, 32767, out=scaled)
+    return np.split(np.rint(scaled, out=scaled).astype(np.int16), np.cumsum(lengths)[:-1])
+
+class LoudnessNormalizer:
+    """
+    Bring every chunk of a book to the same integrated loudness.
+
+    Chunks are decoded into NumPy arrays in batches of about
+    batch_seconds. Their loudness is measured for the whole batch at once,
+    and one gain per chunk, towards the same target for the whole book, is
+    applied to the batch in a single vectorized pass. Only chunks that
+    need more than MIN_GAIN_DB of gain are re-encoded, at their original
+    bitrate, so they can still be joined without re-encoding.
+    """
+
+    def __init__(self, target_lufs=DEFAULT_TARGET_LUFS, batch_seconds=BATCH_SECONDS, encode_workers=None):
+        self.work_dir = tempfile.mkdtemp(prefix="audiobook_loudness_")
+        self.target_lufs = target_lufs
+        self.batch_seconds = batch_seconds
+        self.encode_workers = encode_workers or os.cpu_count() or 1
+        self.loudness = []
+        self.gains = []
+        self.seconds = 0.0
+        self._written = 0
+        # Chapters share one normalizer across threads
+        self._lock = threading.Lock()
+
+    def process(self, paths):
+        """
+        Normalize the loudness of chunks.
+
+        Args:
+            paths (list): Paths of the chunks' audio files, in order
+
+        Returns:
+            list: Paths to merge instead, the original path for chunks left unchanged
+        """
+        start = time.perf_counter()
+        results = list(paths)
+        batch = []
+        batch_frames = 0
+
+        for i, path in enumerate(paths):
+            samples, sample_rate, bitrate = read_samples(path)
+            if batch and (sample_rate != batch[0][2] or samples.shape[1] != batch[0][1].shape[1]
+                          or batch_frames + len(samples) > self.batch_seconds * sample_rate):
+                self._process_batch(batch, results)
+                batch, batch_frames = [], 0
+            batch.append((i, samples, sample_rate, bitrate))
+            batch_frames += len(samples)
+
+        if batch:
+            self._process_batch(batch, results)
+        with self._lock:
+            self.seconds += time.perf_counter() - start
+        return results
+
+    def _process_batch(self, batch, results):
+        indexes = [i for i, _, _, _ in batch]
+        chunks = [samples for _, samples, _, _ in batch]
+        sample_rate = batch[0][2]
+        frames = sum(len(samples) for samples in chunks)
+
+        with metrics.timer("loudness.measure", items=len(chunks), bytes=frames * chunks[0].shape[1] * 4):
+            loudness = measure_loudness(chunks, sample_rate)
+            peaks = np.array([np.abs(samples).max() if len(samples) else 0.0 for samples in chunks])
+            gains = target_gains(loudness, peaks, self.target_lufs)
+
+        changed = [k for k, gain in enumerate(gains) if abs(gain) >= MIN_GAIN_DB]
+        if changed:
+            with metrics.timer("loudness.apply", items=len(changed)):
+                scaled = apply_gains([chunks[k] for k in changed], gains[changed])
+
+            with metrics.timer("loudness.encode", items=len(changed)), \
+                    ThreadPoolExecutor(max_workers=self.encode_workers) as pool:
+                jobs = []
+                for k, samples in zip(changed, scaled):
+                    with self._lock:
+                        self._written += 1
+                        written = self._written
+                    output_path = os.path.join(self.work_dir, f"loudness_{written:05d}.mp3")
+                    jobs.append((k, output_path, pool.submit(self._encode, samples, sample_rate,
+                                                             batch[k][3], output_path)))
+                for k, output_path, job in jobs:
+                    job.result()
+                    results[indexes[k]] = output_path
+
+        with self._lock:
+            self.loudness.extend(loudness.tolist())
+            self.gains.extend(gains.tolist())
+
+    @staticmethod
+    def _encode(samples, sample_rate, bitrate, output_path):
+        audio_segment = AudioSegment(samples.tobytes(), frame_rate=sample_rate, sample_width=2,
+                                     channels=samples.shape[1])
+        audio_segment.export(output_path, format="mp3", bitrate=f"{bitrate or 192}k")
+
+    def discard(self, path):
+        """Delete a normalized file once it has been merged."""
+        if path and os.path.dirname(path) == self.work_dir and os.path.exists(path):
+            os.remove(path)
+
+    def close(self):
+        """Delete the normalized files."""
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def summary(self):
+        """
+        Describe the loudness before and after normalization.
+
+        Returns:
+            dict: JSON-serializable summary for the job report
+        """
+        with self._lock:
+            loudness = np.array(self.loudness)
+            chunk_gains = np.array(self.gains)
+            seconds = self.seconds
+        gains = np.where(np.abs(chunk_gains) >= MIN_GAIN_DB, chunk_gains, 0.0)
+        measured = np.isfinite(loudness)
+        before = loudness[measured]
+        after = (loudness + gains)[measured]
+        return {
+            "target_lufs": self.target_lufs,
+            "chunks": len(loudness),
+            "adjusted": int(np.count_nonzero(gains)),
+            "seconds": seconds,
+            "loudness_range_before": float(before.max() - before.min()) if len(before) else 0.0,
+            "loudness_range_after": float(after.max() - after.min()) if len(after) else 0.0,
+            "chunk_lufs": [round(float(value), 2) if np.isfinite(value) else None for value in loudness],
+            "chunk_gain_db": [round(float(value), 2) for value in chunk_gains]
+        }
@@ -1,9 +1,45 @@
 import streamlit as st
-from utils.pdf_reader import extract_text_from_pdf
-from utils.audio_utils import split_text, download_and_merge
-from utils.murf_api import text_to_speech_murf
+import streamlit.components.v1 as components
+from utils.murf_api import DEFAULT_MAX_CONCURRENCY
+from utils.job_queue import get_job_queue, QUEUED, RUNNING, DONE, FAILED
+from utils.playlist import segments_dir, read_playlist, serve_playlists, PLAYLIST_NAME
+from utils.audio_utils import format_duration
+from utils.chunk_index import index_path
+from utils import metrics
+import json
 import os
 import tempfile
+import time
+
+# Optional Prometheus endpoint with the totals of every job in this server process
+if os.getenv("AUDIOBOOK_METRICS_PORT"):
+    metrics.serve_metrics(int(os.getenv("AUDIOBOOK_METRICS_PORT")))
+
+# Progressive playlists are served to the browser from this port; 0 turns it off
+PLAYLIST_PORT = int(os.getenv("AUDIOBOOK_PLAYLIST_PORT", "8602"))
+if PLAYLIST_PORT:
+    try:
+        serve_playlists(get_job_queue().queue_dir, PLAYLIST_PORT)
+    except OSError as e:
+        print(f"Could not serve playlists on port {PLAYLIST_PORT}: {str(e)}")
+        PLAYLIST_PORT = 0
+
+def playlist_player(url):
+    """Embed an audio player for a growing HLS playlist."""
+    components.html(f"""
+        <audio id="player" controls style="width: 100%"></audio>
+        <script src="https://cdn.jsdelivr.net/npm/hls.js@1"></script>
+        <script>
+            const audio = document.getElementById("player");
+            if (audio.canPlayType("application/vnd.apple.mpegurl")) {{
+                audio.src = "{url}";
+            }} else if (window.Hls && Hls.isSupported()) {{
+                const hls = new Hls();
+                hls.loadSource("{url}");
+                hls.attachMedia(audio);
+            }}
+        </script>
+    """, height=60)
 
 # Page configuration
 st.set_page_config(
@@ -73,6 +109,36 @@ with st.sidebar:
     
     chunk_size = st.slider("Text Chunk Size", min_value=1000, max_value=5000, value=3000, step=500)
     st.caption("Larger chunks = faster processing, smaller chunks = better quality")
+    
+    max_concurrency = st.slider("Parallel Requests", min_value=1, max_value=8, value=DEFAULT_MAX_CONCURRENCY)
+    st.caption("Number of chunks sent to Murf AI at the same time")
+    
+    use_cache = st.checkbox("Reuse previously generated audio", value=True)
+    st.caption("Chunks already converted with the same voice are loaded from the local cache")
+    
+    streaming_mode = st.checkbox("Streaming mode", value=False)
+    st.caption("Read, convert and encode the book page by page to keep memory use flat for very long PDFs")
+    
+    adaptive_chunks = st.checkbox("Adaptive chunk size", value=False)
+    st.caption("Start at the chunk size above and adjust it to the response times measured while converting")
+    
+    incremental = st.checkbox("Revised edition mode", value=False)
+    st.caption("Keep chunk audio and only re-synthesize the parts of a book that changed since its previous edition")
+    book_title = st.text_input("Book title", value="", disabled=not incremental,
+                               help="Editions with the same title share audio; defaults to the file name")
+    
+    chapter_mode = st.checkbox("Chapter mode", value=False)
+    st.caption("Split the book at its table of contents or chapter headings, convert chapters in parallel "
+               "and get a file per chapter plus a chapter-marked audiobook")
+    
+    progressive = st.checkbox("Listen while generating", value=False)
+    st.caption("Publish the audiobook as a growing playlist, so playback can start as soon as the first chunks are ready")
+    
+    polish = st.checkbox("Normalize and fade chunks", value=False)
+    st.caption("Even out the volume of each chunk and fade it in and out, in parallel while the book is converted")
+    
+    match_loudness = st.checkbox("Match loudness across the book", value=False)
+    st.caption("Measure the perceived loudness of every chunk and bring them all to the same level")
 
 # Main content area
 col1, col2 = st.columns([2, 1])
@@ -100,95 +166,152 @@ with col1:
             st.write(f"• {key}: {value}")
         st.markdown('</div>', unsafe_allow_html=True)
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            temp_pdf_path = tmp_file.name
-        
-        st.success("✅ PDF uploaded successfully!")
-        
         # Generate audiobook button
         if st.button("🎙️ Generate Audiobook", type="primary", use_container_width=True):
             if not os.getenv("MURF_API_KEY"):
                 st.error("❌ Murf API key not found! Please add MURF_API_KEY to your .env file.")
             else:
-                # Progress tracking
-                progress_bar = st.progress(0)
-                status_text = st.empty()
+                # Save uploaded file temporarily; the job queue keeps its own copy
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+                    tmp_file.write(uploaded_file.getvalue())
+                    temp_pdf_path = tmp_file.name
                 
                 try:
-                    # Step 1: Extract text
-                    status_text.text("📖 Extracting text from PDF...")
-                    progress_bar.progress(10)
-                    
-                    text = extract_text_from_pdf(temp_pdf_path)
-                    if not text.strip():
-                        st.error("❌ No text could be extracted from the PDF. Please check if the PDF contains readable text.")
-                        st.stop()
-                    
-                    # Step 2: Split text into chunks
-                    status_text.text("✂️ Splitting text into manageable chunks...")
-                    progress_bar.progress(20)
-                    
-                    chunks = split_text(text, chunk_size)
-                    st.info(f"📊 Text split into {len(chunks)} chunks for processing")
-                    
-                    # Step 3: Convert chunks to speech
-                    audio_urls = []
-                    for i, chunk in enumerate(chunks):
-                        status_text.text(f"🎙️ Converting chunk {i+1}/{len(chunks)} to speech...")
-                        progress = 20 + (i / len(chunks)) * 60
-                        progress_bar.progress(int(progress))
-                        
-                        # Add debug info
-                        st.write(f"Debug: Processing chunk {i+1} (length: {len(chunk)} characters)")
-                        
-                        audio_url = text_to_speech_murf(chunk, voice_options[selected_voice])
-                        if audio_url:
-                            audio_urls.append(audio_url)
-                            st.write(f"✅ Chunk {i+1} converted successfully")
-                        else:
-                            st.error(f"❌ Failed to convert chunk {i+1}")
-                            st.write(f"Debug: Chunk content preview: {chunk[:100]}...")
-                            st.stop()
-                    
-                    # Step 4: Merge audio files
-                    status_text.text("🔗 Merging audio chunks...")
-                    progress_bar.progress(80)
-                    
-                    output_filename = f"audiobook_{uploaded_file.name.replace('.pdf', '')}.mp3"
-                    download_and_merge(audio_urls, output_filename)
-                    
-                    # Step 5: Complete
-                    progress_bar.progress(100)
-                    status_text.text("✅ Audiobook generation complete!")
-                    
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.success("🎉 Your audiobook is ready!")
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # Display audio player
-                    st.header("🎧 Listen to Your Audiobook")
-                    st.audio(output_filename)
-                    
-                    # Download button
-                    with open(output_filename, "rb") as f:
-                        st.download_button(
-                            label="⬇️ Download Audiobook",
-                            data=f.read(),
-                            file_name=output_filename,
-                            mime="audio/mp3",
-                            use_container_width=True
-                        )
-                    
-                    # Clean up temporary files
-                    os.unlink(temp_pdf_path)
-                    
+                    # The job runs in the background, so reruns of this script do not interrupt it
+                    st.session_state["job_id"] = get_job_queue().submit(temp_pdf_path, {
+                        "voice_id": voice_options[selected_voice],
+                        "chunk_size": chunk_size,
+                        "synth_workers": max_concurrency,
+                        "use_cache": use_cache,
+                        "streaming": streaming_mode,
+                        "adaptive": adaptive_chunks,
+                        "incremental": incremental,
+                        "book": book_title.strip() or None,
+                        "chapters": chapter_mode,
+                        "progressive": progressive,
+                        "polish": polish,
+                        "loudness": match_loudness
+                    }, name=uploaded_file.name)
+                    st.success("✅ PDF uploaded successfully!")
                 except Exception as e:
                     st.error(f"❌ An error occurred: {str(e)}")
-                    # Clean up on error
-                    if os.path.exists(temp_pdf_path):
-                        os.unlink(temp_pdf_path)
+                finally:
+                    os.unlink(temp_pdf_path)
+    
+    job = get_job_queue().get(st.session_state["job_id"]) if "job_id" in st.session_state else None
+    if job is not None:
+        st.subheader(f"📚 {job['name']}")
+        
+        if job["status"] in (QUEUED, RUNNING):
+            # Progress tracking
+            st.progress(job["progress"])
+            st.text(job["message"])
+            
+            # The start of the book can be played while the rest is converted
+            playlist_path = os.path.join(segments_dir(job["output_path"]), PLAYLIST_NAME)
+            playlist = read_playlist(playlist_path) if job["settings"].get("progressive") else None
+            if playlist and playlist["segments"]:
+                st.caption(f"🎧 {format_duration(playlist['seconds'])} of audio ready so far")
+                if PLAYLIST_PORT:
+                    relative = os.path.relpath(playlist_path, get_job_queue().queue_dir).replace(os.sep, "/")
+                    playlist_player(f"http://localhost:{PLAYLIST_PORT}/{relative}")
+                else:
+                    st.caption(f"Open {playlist_path} in a media player to listen")
+            
+            # Chapters that are already converted can be played right away
+            for chapter in job.get("chapters", []):
+                st.caption(f"📖 {chapter['title']}")
+                st.audio(chapter["path"])
+        
+        elif job["status"] == FAILED:
+            st.error(f"❌ An error occurred: {job['error']}")
+            st.info("Converted chunks were saved, so a retry resumes where the job stopped.")
+            for chapter in job.get("chapters", []):
+                st.caption(f"📖 {chapter['title']}")
+                st.audio(chapter["path"])
+            if st.button("🔁 Retry", use_container_width=True):
+                get_job_queue().retry(job["id"])
+                st.rerun()
+        
+        elif job["status"] == DONE:
+            output_filename = os.path.basename(job["output_path"])
+            
+            st.markdown('<div class="success-box">', unsafe_allow_html=True)
+            st.success("🎉 Your audiobook is ready!")
+            st.markdown('</div>', unsafe_allow_html=True)
+            
+            # Display audio player
+            st.header("🎧 Listen to Your Audiobook")
+            st.audio(job["output_path"])
+            
+            # Download button
+            with open(job["output_path"], "rb") as f:
+                st.download_button(
+                    label="⬇️ Download Audiobook",
+                    data=f.read(),
+                    file_name=output_filename,
+                    mime="audio/mp3",
+                    use_container_width=True
+                )
+            
+            # Missing or damaged chunks are re-synthesized and spliced in, the rest is kept;
+            # chunks cut to adaptive sizes cannot be found in the PDF again
+            if os.path.exists(index_path(job["output_path"])) and not job["settings"].get("chapters") \
+                    and not job["settings"].get("adaptive"):
+                if job.get("error"):
+                    st.error(f"❌ Repair failed: {job['error']}")
+                elif job["message"].startswith(("⚠️", "✅ All", "✅ Repaired")):
+                    st.caption(job["message"])
+                deep = st.checkbox("Decode every chunk", value=False,
+                                   help="Also find damage inside the audio, which takes longer")
+                if st.button("🩺 Verify and repair", use_container_width=True):
+                    get_job_queue().repair(job["id"], deep=deep)
+                    st.rerun()
+            
+            if job.get("chapters"):
+                with st.expander(f"📖 Chapters ({len(job['chapters'])})"):
+                    for chapter in job["chapters"]:
+                        st.caption(chapter["title"])
+                        st.audio(chapter["path"])
+            
+            # Time spent in each stage of the job
+            report_path = metrics.report_path(job["output_path"])
+            if os.path.exists(report_path):
+                with open(report_path, "r", encoding="utf-8") as f:
+                    job_report = json.load(f)
+                
+                if job_report.get("time_to_first_audio_seconds") is not None:
+                    st.metric("⏱️ Time to first audio", f"{job_report['time_to_first_audio_seconds']:.1f}s")
+                
+                audio_info = job_report.get("audio")
+                if audio_info:
+                    st.caption(f"🎧 {format_duration(audio_info['duration'])} of audio, "
+                               f"{audio_info['bitrate']:.0f} kbps, {audio_info['sample_rate']} Hz")
+                
+                revision = job_report.get("revision")
+                if revision:
+                    st.info(f"♻️ Reused {revision['reused_chunks']} unchanged chunks from the previous edition, "
+                            f"re-synthesized {revision['changed_chunks']} ({revision['changed_chars']:,} characters)")
+                
+                deduplication = job_report.get("deduplication")
+                if deduplication and deduplication["requests_saved"]:
+                    st.caption(f"♻️ Repeated text was synthesized once, saving {deduplication['requests_saved']} "
+                               f"requests ({deduplication['chars_saved']:,} characters)")
+                
+                post_processing = job_report.get("post_processing")
+                if post_processing and post_processing["chunks"]:
+                    st.caption(f"🎚️ Normalized and faded {post_processing['chunks']} chunks on "
+                               f"{post_processing['workers']} processes, "
+                               f"{post_processing['seconds_per_chunk']:.2f}s per chunk")
+                
+                loudness = job_report.get("loudness")
+                if loudness and loudness["chunks"]:
+                    st.caption(f"🔊 Adjusted {loudness['adjusted']} of {loudness['chunks']} chunks to "
+                               f"{loudness['target_lufs']:.0f} LUFS; loudness range between chunks "
+                               f"{loudness['loudness_range_before']:.1f} LU → {loudness['loudness_range_after']:.1f} LU")
+                
+                with st.expander("📊 Job report"):
+                    st.json(job_report["stages"])
 
 with col2:
     st.header("📋 Instructions")
@@ -219,4 +342,9 @@ st.markdown(
     "Built with ❤️ using Streamlit and Murf AI"
     "</div>",
     unsafe_allow_html=True
-) 
\ No newline at end of file
+) 
+
+# Poll the background job until it finishes
+if job is not None and job["status"] in (QUEUED, RUNNING):
+    time.sleep(1)
+    st.rerun()
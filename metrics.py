@@ -0,0 +1,361 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Set AUDIOBOOK_METRICS=0 to turn instrumentation into no-ops
+ENABLED = os.getenv("AUDIOBOOK_METRICS", "1") != "0"
+
+# Job reports are written next to the audiobook with this suffix
+REPORT_SUFFIX = ".report.json"
+
+class StageStats:
+    """Running totals for one pipeline stage."""
+
+    __slots__ = ("calls", "seconds", "max_seconds", "items", "bytes", "chars", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.items = 0
+        self.bytes = 0
+        self.chars = 0
+        self.errors = 0
+
+    def add(self, seconds, items, bytes, chars, errors):
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.items += items
+        self.bytes += bytes
+        self.chars += chars
+        self.errors += errors
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class MetricsRecorder:
+    """Collects per-stage and per-chunk measurements for a job or the whole process."""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.started = time.time()
+        self.stages = {}
+        self.chunks = {}
+        self.extra = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds=0.0, items=1, bytes=0, chars=0, errors=0, chunk=None):
+        """
+        Record one measurement.
+
+        Args:
+            stage (str): Stage name, e.g. "api.synthesize"
+            seconds (float): Wall time spent
+            items (int): Number of items handled, such as pages or chunks
+            bytes (int): Number of bytes handled
+            chars (int): Number of characters handled
+            errors (int): Number of failures
+            chunk (int): Chunk index, to also record the measurement per chunk
+        """
+        with self._lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.add(seconds, items, bytes, chars, errors)
+
+            if chunk is not None:
+                entry = self.chunks.setdefault(chunk, {})
+                entry[f"{stage}.seconds"] = entry.get(f"{stage}.seconds", 0.0) + seconds
+                if bytes:
+                    entry[f"{stage}.bytes"] = entry.get(f"{stage}.bytes", 0) + bytes
+                if chars:
+                    entry[f"{stage}.chars"] = entry.get(f"{stage}.chars", 0) + chars
+                if errors:
+                    entry[f"{stage}.errors"] = entry.get(f"{stage}.errors", 0) + errors
+
+    def totals(self, stage):
+        """
+        Get the running totals of one stage.
+
+        Args:
+            stage (str): Stage name
+
+        Returns:
+            dict: calls, seconds, max_seconds, items, bytes, chars and
+                errors, all zero if the stage was never measured
+        """
+        with self._lock:
+            stats = self.stages.get(stage)
+            return (stats or StageStats()).to_dict()
+
+    def report(self):
+        """
+        Build a JSON-serializable summary.
+
+        Returns:
+            dict: Stage totals, per-chunk measurements and extra fields
+        """
+        with self._lock:
+            report = {
+                "name": self.name,
+                "started": self.started,
+                "wall_seconds": time.time() - self.started,
+                "time_to_first_audio_seconds": self.extra.get("time_to_first_audio_seconds"),
+                "stages": {stage: stats.to_dict() for stage, stats in sorted(self.stages.items())},
+                "chunks": [dict(entry, index=index) for index, entry in sorted(self.chunks.items())]
+            }
+            report.update(self.extra)
+        return report
+
+    def write_report(self, path):
+        """
+        Write the report as JSON.
+
+        Args:
+            path (str): Path of the report file
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def prometheus_text(self, prefix="audiobook"):
+        """
+        Render the stage totals in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        fields = [
+            ("calls", "Number of times the stage ran"),
+            ("seconds", "Wall time spent in the stage"),
+            ("items", "Items handled by the stage"),
+            ("bytes", "Bytes handled by the stage"),
+            ("chars", "Characters handled by the stage"),
+            ("errors", "Failures in the stage"),
+        ]
+        with self._lock:
+            stages = sorted(self.stages.items())
+            lines = []
+            for field, description in fields:
+                metric = f"{prefix}_stage_{field}_total"
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} counter")
+                for stage, stats in stages:
+                    lines.append(f'{metric}{{stage="{stage}"}} {getattr(stats, field)}')
+        return "\n".join(lines) + "\n"
+
+# Process-wide totals, served by the Prometheus endpoint
+_global_recorder = MetricsRecorder("global")
+
+# Recorder of the job running in the current context, if any
+_job_recorder = contextvars.ContextVar("audiobook_job_recorder", default=None)
+
+# Index of the chunk being processed in the current context, if any
+_chunk_index = contextvars.ContextVar("audiobook_chunk_index", default=None)
+
+def report_path(output_path):
+    """Path of the JSON report of the job that produces output_path."""
+    return output_path + REPORT_SUFFIX
+
+def get_global_recorder():
+    """Get the recorder holding the totals of every job in this process."""
+    return _global_recorder
+
+def current_recorder():
+    """Get the recorder of the job running in the current context, or None."""
+    return _job_recorder.get()
+
+def observe(stage, seconds=0.0, items=1, bytes=0, chars=0, errors=0, chunk=None):
+    """Record a measurement in the global totals and in the current job, if any."""
+    if not ENABLED:
+        return
+    _global_recorder.observe(stage, seconds, items, bytes, chars, errors)
+    recorder = _job_recorder.get()
+    if recorder is not None:
+        if chunk is None:
+            chunk = _chunk_index.get()
+        recorder.observe(stage, seconds, items, bytes, chars, errors, chunk)
+
+def mark_first_audio():
+    """
+    Record the time from the start of the current job to its first playable audio.
+
+    Call it when audio first becomes available to the listener: a published
+    playlist segment, a finished chapter or the finished audiobook. Only
+    the first call of each job counts. The value is the headline
+    ``time_to_first_audio_seconds`` of the job report.
+    """
+    if not ENABLED:
+        return
+    recorder = _job_recorder.get()
+    if recorder is None:
+        return
+
+    with recorder._lock:
+        if "time_to_first_audio_seconds" in recorder.extra:
+            return
+        seconds = time.time() - recorder.started
+        recorder.extra["time_to_first_audio_seconds"] = seconds
+    _global_recorder.observe("audio.first_audio", seconds)
+    print(f"First audio of {recorder.name} playable after {seconds:.2f}s")
+
+class _Timer:
+    """Times a block of code and records it as one observation of a stage."""
+
+    __slots__ = ("stage", "chunk", "fields", "start")
+
+    def __init__(self, stage, chunk, fields):
+        self.stage = stage
+        self.chunk = chunk
+        self.fields = fields
+
+    def add(self, **fields):
+        """Add counts, such as bytes=..., to the observation."""
+        for name, value in fields.items():
+            self.fields[name] = self.fields.get(name, 0) + value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.add(errors=1)
+        observe(self.stage, time.perf_counter() - self.start, chunk=self.chunk, **self.fields)
+        return False
+
+class _NullTimer:
+    """Stand-in returned while metrics are switched off."""
+
+    def add(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def timer(stage, chunk=None, **fields):
+    """
+    Time a block of code as one observation of a stage.
+
+    Args:
+        stage (str): Stage name
+        chunk (int): Optional chunk index
+        **fields: Initial counts such as chars=... or items=...
+
+    Returns:
+        context manager: Yields an object whose add() adds counts
+    """
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(stage, chunk, fields)
+
+@contextmanager
+def job_scope(name):
+    """
+    Collect the measurements of one job in its own recorder.
+
+    Code running in worker threads only reports to the job when it was
+    submitted through in_context(), since thread pools do not inherit
+    context variables.
+
+    Args:
+        name (str): Name of the job, stored in its report
+
+    Yields:
+        MetricsRecorder: Recorder of the job
+    """
+    recorder = MetricsRecorder(name)
+    token = _job_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _job_recorder.reset(token)
+
+@contextmanager
+def chunk_scope(index):
+    """
+    Attribute every measurement made inside the block to a chunk.
+
+    Args:
+        index (int): Chunk index
+    """
+    token = _chunk_index.set(index)
+    try:
+        yield
+    finally:
+        _chunk_index.reset(token)
+
+def in_context(function, chunk=None):
+    """
+    Bind a function to the current job so it reports there from another thread.
+
+    Args:
+        function (callable): Function to submit to a thread pool
+        chunk (int): Optional chunk index to attribute its measurements to
+
+    Returns:
+        callable: Function that runs in a copy of the current context
+    """
+    if not ENABLED:
+        return function
+    context = contextvars.copy_context()
+    if chunk is not None:
+        context.run(_chunk_index.set, chunk)
+    return functools.partial(context.run, function)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        data = _global_recorder.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+def serve_metrics(port, host="127.0.0.1"):
+    """
+    Serve the global totals at /metrics in the Prometheus text format.
+
+    Only one endpoint is started per process; later calls return it.
+
+    Args:
+        port (int): Port to listen on
+        host (str): Address to bind
+
+    Returns:
+        ThreadingHTTPServer: Running server
+    """
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+            print(f"Serving metrics at http://{host}:{port}/metrics")
+        return _metrics_server
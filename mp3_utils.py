@@ -0,0 +1,527 @@
+import itertools
+import mmap
+import os
+import struct
+import subprocess
+import threading
+from collections import namedtuple
+from pydub import AudioSegment
+from utils import metrics
+
+# Fields of one MPEG audio frame header. version is 1, 2 or 2.5, bitrate is
+# in kbit/s, length is the size of the whole frame in bytes and samples the
+# number of samples per channel it decodes to.
+FrameHeader = namedtuple("FrameHeader", [
+    "version", "layer", "bitrate", "sample_rate", "channels", "padding", "length", "samples",
+    "version_bits", "layer_bits", "bitrate_index", "sample_rate_index", "mode_bits"
+])
+
+# Stream information read from the headers of an MP3 file. duration is in
+# seconds and bitrate the average in kbit/s; frames counts audio frames.
+Mp3Info = namedtuple("Mp3Info", ["duration", "bitrate", "sample_rate", "channels", "frames", "vbr"])
+
+_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+_LAYERS = {1: 3, 2: 2, 3: 1}
+
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+_SAMPLE_RATES = {
+    1: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    2.5: (11025, 12000, 8000),
+}
+
+def parse_frame_header(data, offset=0):
+    """
+    Parse the MPEG audio frame header at an offset.
+
+    Args:
+        data (bytes): Encoded audio
+        offset (int): Position of the header
+
+    Returns:
+        FrameHeader: Parsed header, or None if there is no valid header there
+    """
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    version_bits = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version_bits not in _VERSIONS or layer_bits not in _LAYERS:
+        return None
+    # Free-format (0) and invalid (15) bitrates cannot be framed without decoding
+    if bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    version = _VERSIONS[version_bits]
+    layer = _LAYERS[layer_bits]
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    mode_bits = b3 >> 6
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples = 1152
+        length = 144 * bitrate * 1000 // sample_rate + padding
+    else:
+        samples = 576
+        length = 72 * bitrate * 1000 // sample_rate + padding
+
+    return FrameHeader(version, layer, bitrate, sample_rate, 1 if mode_bits == 3 else 2, padding,
+                       length, samples, version_bits, layer_bits, bitrate_index, sample_rate_index, mode_bits)
+
+def skip_id3v2(data):
+    """
+    Find where the audio starts after an ID3v2 tag, if there is one.
+
+    Args:
+        data (bytes): Encoded audio
+
+    Returns:
+        int: Offset of the first byte after the tag, 0 if there is none
+    """
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _side_info_size(header):
+    if header.version == 1:
+        return 17 if header.channels == 1 else 32
+    return 9 if header.channels == 1 else 17
+
+def info_tag(data, offset, header):
+    """
+    Get the kind of VBR info tag stored in a frame, if any.
+
+    Encoders put a Xing, Info (the CBR variant of Xing) or VBRI tag in
+    the first frame, which decodes to silence and describes the stream.
+
+    Args:
+        data (bytes): Encoded audio
+        offset (int): Position of the frame
+        header (FrameHeader): Parsed header of the frame
+
+    Returns:
+        bytes: b"Xing", b"Info" or b"VBRI", or None for an audio frame
+    """
+    if header.layer != 3:
+        return None
+    xing = offset + 4 + _side_info_size(header)
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        return data[xing:xing + 4]
+    if data[offset + 36:offset + 40] == b"VBRI":
+        return b"VBRI"
+    return None
+
+def iter_frames(data, start=None, end=None):
+    """
+    Iterate over the MPEG audio frames of a file.
+
+    Tags are skipped, and after a corrupt frame the scan resynchronizes
+    on the next header that is followed by another valid header.
+
+    Args:
+        data (bytes): Encoded audio
+        start (int): Offset to start at, after any ID3v2 tag by default
+        end (int): Offset to stop at, the end of the audio by default
+
+    Yields:
+        tuple: (offset, FrameHeader) of each frame
+    """
+    offset = skip_id3v2(data) if start is None else start
+    if end is None:
+        end = len(data)
+        if end >= 128 and data[end - 128:end - 125] == b"TAG":
+            end -= 128
+
+    header = None
+    while offset + 4 <= end:
+        if header is None:
+            header = parse_frame_header(data, offset)
+        if header is not None and offset + header.length <= end:
+            following = offset + header.length
+            # A frame is only trusted if the next one lines up, or if it is the last
+            next_header = parse_frame_header(data, following) if following + 4 <= end else None
+            if next_header is not None or following + 4 > end:
+                yield offset, header
+                offset = following
+                header = next_header
+                continue
+
+        header = None
+        offset = data.find(b"\xff", offset + 1, end)
+        if offset < 0:
+            return
+
+def _info_counts(data, offset, header, tag):
+    """
+    Read the frame and byte counts of a Xing/Info or VBRI frame.
+
+    Returns:
+        tuple: (frames, bytes, skipped samples), with None for counts
+            that are not stored; skipped samples are the encoder delay and
+            padding from a LAME tag, if there is one
+    """
+    if tag == b"VBRI":
+        total_bytes, frames = struct.unpack(">II", data[offset + 46:offset + 54])
+        return frames, total_bytes, 0
+
+    position = offset + 4 + _side_info_size(header) + 8
+    flags = struct.unpack(">I", data[position - 4:position])[0]
+    frames = total_bytes = None
+    if flags & 0x01:
+        frames = struct.unpack(">I", data[position:position + 4])[0]
+        position += 4
+    if flags & 0x02:
+        total_bytes = struct.unpack(">I", data[position:position + 4])[0]
+        position += 4
+    if flags & 0x04:
+        position += 100
+    if flags & 0x08:
+        position += 4
+
+    # The LAME extension stores encoder delay and padding as two 12-bit values
+    skipped = 0
+    if data[position:position + 4] in (b"LAME", b"Lavc", b"Lavf") and position + 24 <= offset + header.length:
+        b0, b1, b2 = data[position + 21], data[position + 22], data[position + 23]
+        skipped = (b0 << 4 | b1 >> 4) + ((b1 & 0x0F) << 8 | b2)
+    return frames, total_bytes, skipped
+
+def probe_mp3(source):
+    """
+    Get the duration and stream information of an MP3 without decoding it.
+
+    The counts of a Xing/Info or VBRI frame are used when the file has
+    one, so only its first frames are read. Otherwise every frame header
+    is scanned; the file is memory-mapped rather than read, so even a
+    multi-hour audiobook is never loaded whole.
+
+    Args:
+        source (str or bytes): Path of the file, or its content
+
+    Returns:
+        Mp3Info: Stream information, or None if it is not MPEG audio
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return _probe(source)
+
+    try:
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _probe(data)
+    except (OSError, ValueError) as e:
+        print(f"Error probing audio {source}: {str(e)}")
+        return None
+
+def _probe(data):
+    frames_iter = iter_frames(data)
+    first = next(frames_iter, None)
+    if first is None:
+        return None
+    offset, header = first
+
+    tag = info_tag(data, offset, header)
+    if tag is not None:
+        frames, total_bytes, skipped = _info_counts(data, offset, header, tag)
+        if frames:
+            samples = max(frames * header.samples - skipped, 0)
+            duration = samples / header.sample_rate
+            if total_bytes is None:
+                total_bytes = len(data) - offset
+            bitrate = total_bytes * 8 * header.sample_rate / (frames * header.samples) / 1000
+            return Mp3Info(duration, bitrate, header.sample_rate, header.channels, frames, tag != b"Info")
+    else:
+        frames_iter = itertools.chain([first], frames_iter)
+
+    frames = samples = total_bytes = 0
+    bitrates = set()
+    for offset, header in frames_iter:
+        frames += 1
+        samples += header.samples
+        total_bytes += header.length
+        bitrates.add(header.bitrate)
+    if not frames:
+        return None
+
+    duration = samples / header.sample_rate
+    return Mp3Info(duration, total_bytes * 8 / duration / 1000, header.sample_rate, header.channels,
+                   frames, len(bitrates) > 1)
+
+def stream_params(header):
+    """Parameters that have to match for frames to be joined without re-encoding."""
+    return header.version, header.layer, header.sample_rate, header.channels
+
+def build_info_frame(header, frames, total_bytes, vbr=False):
+    """
+    Build a Xing (or Info, for constant bitrate) frame describing a stream.
+
+    Args:
+        header (FrameHeader): Header of an audio frame of the stream
+        frames (int): Number of audio frames in the stream
+        total_bytes (int): Size of the stream including this frame
+        vbr (bool): Whether the bitrate varies between frames
+
+    Returns:
+        bytes: Encoded frame, which players decode as silence
+    """
+    needed = 4 + _side_info_size(header) + 16
+    bitrates = _BITRATES[(1 if header.version == 1 else 2, header.layer)]
+    bitrate_index = header.bitrate_index
+    while _frame_length(header, bitrates[bitrate_index]) < needed:
+        bitrate_index += 1
+    length = _frame_length(header, bitrates[bitrate_index])
+
+    frame = bytearray(length)
+    frame[0] = 0xFF
+    frame[1] = 0xE0 | header.version_bits << 3 | header.layer_bits << 1 | 0x01
+    frame[2] = bitrate_index << 4 | header.sample_rate_index << 2
+    frame[3] = header.mode_bits << 6
+    tag = 4 + _side_info_size(header)
+    frame[tag:tag + 16] = (b"Xing" if vbr else b"Info") + struct.pack(">III", 0x03, frames, total_bytes)
+    return bytes(frame)
+
+def _frame_length(header, bitrate):
+    if header.layer == 3 and header.version != 1:
+        return 72 * bitrate * 1000 // header.sample_rate
+    return 144 * bitrate * 1000 // header.sample_rate
+
+def transcode(data, sample_rate, channels, bitrate):
+    """
+    Re-encode audio to MP3 with the given stream parameters, without an info frame.
+
+    Args:
+        data (bytes): Encoded audio in any format ffmpeg reads
+        sample_rate (int): Sample rate of the output
+        channels (int): Number of channels of the output
+        bitrate (int): Bitrate of the output in kbit/s
+
+    Returns:
+        bytes: MP3 data, or None if ffmpeg failed
+    """
+    command = [
+        AudioSegment.converter, "-loglevel", "error", "-i", "pipe:0",
+        "-ar", str(sample_rate), "-ac", str(channels), "-b:a", f"{bitrate}k",
+        "-write_xing", "0", "-id3v2_version", "0", "-f", "mp3", "pipe:1"
+    ]
+    with metrics.timer("audio.transcode", bytes=len(data)) as timer:
+        result = subprocess.run(command, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            timer.add(errors=1)
+            print(f"Error transcoding audio: {result.stderr.decode('utf-8', errors='replace').strip()}")
+            return None
+    return result.stdout
+
+def _audio_frames(data):
+    """Get the audio frames of a chunk and their parameters, leaving out info frames."""
+    frames = []
+    params = None
+    for offset, header in iter_frames(data):
+        if info_tag(data, offset, header) is not None:
+            continue
+        if params is None:
+            params = stream_params(header)
+        elif stream_params(header) != params:
+            return None, None
+        frames.append((offset, header))
+    return (frames, params) if frames else (None, None)
+
+def conform_chunk(data, params=None, bitrate=192):
+    """
+    Get the audio frames of a chunk, re-encoding it only if it does not fit a stream.
+
+    Args:
+        data (bytes): Encoded audio of the chunk, MP3 or any format ffmpeg reads
+        params (tuple): stream_params() the frames must have, or None to
+            accept any MP3 stream
+        bitrate (int): Bitrate in kbit/s to re-encode at
+
+    Returns:
+        tuple: (data, frames, params, transcoded) with frames as (offset,
+            FrameHeader) pairs into data, or None if the chunk cannot be read
+    """
+    frames, chunk_params = _audio_frames(data)
+    if frames is not None and (params is None or chunk_params == params):
+        return data, frames, chunk_params, False
+
+    sample_rate, channels = (params[2], params[3]) if params is not None else (44100, 2)
+    data = transcode(data, sample_rate, channels, bitrate)
+    frames, chunk_params = _audio_frames(data) if data else (None, None)
+    if frames is None or (params is not None and chunk_params != params):
+        return None
+    return data, frames, chunk_params, True
+
+_silence_cache = {}
+_silence_lock = threading.Lock()
+
+def silence_frames(sample_rate, channels, bitrate, duration_ms):
+    """
+    Get pre-encoded MP3 frames of silence for a stream, encoding them once per process.
+
+    Args:
+        sample_rate (int): Sample rate of the stream
+        channels (int): Number of channels of the stream
+        bitrate (int): Bitrate in kbit/s
+        duration_ms (int): Length of the silence
+
+    Returns:
+        bytes: Concatenated frames
+    """
+    key = (sample_rate, channels, bitrate, duration_ms)
+    with _silence_lock:
+        if key not in _silence_cache:
+            silence = AudioSegment.silent(duration=duration_ms, frame_rate=sample_rate).set_channels(channels)
+            encoded = transcode(silence.export(format="wav").read(), sample_rate, channels, bitrate)
+            frames = [(offset, header) for offset, header in iter_frames(encoded)
+                      if info_tag(encoded, offset, header) is None]
+            # Encoder delay and padding add frames; silence can be cut to length anywhere
+            count = max(1, round(duration_ms * sample_rate / 1000 / frames[0][1].samples))
+            _silence_cache[key] = b"".join(encoded[offset:offset + header.length] for offset, header in frames[:count])
+        return _silence_cache[key]
+
+class Mp3PassthroughWriter:
+    """
+    Join MP3 chunks into one file by copying their frames, without re-encoding.
+
+    The first chunk fixes the stream parameters (MPEG version, layer,
+    sample rate and channels). Later chunks with the same parameters are
+    copied frame by frame, separated by pre-encoded silence frames. Only a
+    chunk whose parameters differ is decoded and re-encoded to match. A
+    Xing/Info frame with the frame count is written at the start, so
+    players show the right duration and can seek.
+
+    spans holds one (start_byte, end_byte, start_sample, end_sample) tuple
+    per chunk written, locating its frames in the output without the pause
+    before it. Samples are counted per channel from the first audio frame.
+    """
+
+    def __init__(self, output_path, pause_ms=500):
+        self.output_path = output_path
+        self.pause_ms = pause_ms
+        self.params = None
+        self.segments_written = 0
+        self.passthrough_chunks = 0
+        self.transcoded_chunks = 0
+        self.frames = 0
+        self.samples = 0
+        self.spans = []
+        self._first_header = None
+        self._bitrates = set()
+        self._file = None
+
+    @property
+    def duration_ms(self):
+        if self.params is None:
+            return 0
+        return int(self.samples * 1000 / self.params[2])
+
+    @property
+    def bitrate(self):
+        """Bitrate in kbps of the first chunk, used for silence and re-encoded chunks; None before it."""
+        if self._first_header is None:
+            return None
+        return self._first_header.bitrate
+
+    def append(self, data):
+        """
+        Append one chunk of encoded audio, preceded by the pause if needed.
+
+        Args:
+            data (bytes): Encoded audio of the chunk, MP3 or any format ffmpeg reads
+
+        Returns:
+            bool: True if the chunk was written, False otherwise
+        """
+        # A chunk whose parameters differ from the stream is re-encoded on its own
+        conformed = conform_chunk(data, self.params, self.bitrate if self.params else 192)
+        if conformed is None:
+            return False
+        data, frames, params, transcoded = conformed
+        if transcoded:
+            self.transcoded_chunks += 1
+        else:
+            self.passthrough_chunks += 1
+
+        with metrics.timer("audio.passthrough") as timer:
+            if self._file is None:
+                self.params = params
+                self._first_header = frames[0][1]
+                self._file = open(self.output_path, "w+b")
+                # Placeholder for the info frame, filled in by close()
+                self._file.write(build_info_frame(self._first_header, 0, 0))
+
+            if self.segments_written and self.pause_ms > 0:
+                silence = silence_frames(self.params[2], self.params[3], self._first_header.bitrate, self.pause_ms)
+                self._write_frames(silence, list(iter_frames(silence)))
+
+            start_byte, start_sample = self._file.tell(), self.samples
+            written = self._write_frames(data, frames)
+            timer.add(bytes=written)
+            self.spans.append((start_byte, start_byte + written, start_sample, self.samples))
+
+        self.segments_written += 1
+        return True
+
+    def _write_frames(self, data, frames):
+        written = 0
+        for offset, header in frames:
+            self._file.write(data[offset:offset + header.length])
+            self._bitrates.add(header.bitrate)
+            self.frames += 1
+            self.samples += header.samples
+            written += header.length
+        return written
+
+    def close(self):
+        """
+        Write the info frame and close the file.
+
+        Returns:
+            bool: True if at least one chunk was written, False otherwise
+        """
+        if self._file is None:
+            return False
+
+        try:
+            total_bytes = self._file.tell()
+            self._file.seek(0)
+            self._file.write(build_info_frame(self._first_header, self.frames, total_bytes,
+                                              vbr=len(self._bitrates) > 1))
+        finally:
+            self._file.close()
+            self._file = None
+        return True
+
+    def abort(self):
+        """Stop writing and delete the unfinished file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+        return False
@@ -0,0 +1,1125 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.murf_api import MurfAPI, get_murf_api, DEFAULT_MAX_CONCURRENCY
+from utils.audio_utils import download_audio_bytes, load_audio_bytes, load_audio_segment, split_text, download_and_merge, merge_with_chapters, ChunkPolisher
+from utils.pdf_reader import iter_pdf_pages, clean_text, extract_text_from_pdf, extract_pages_parallel
+from utils.text_chunker import iter_chunks, iter_chunks_from_stream, iter_anchored_chunks, fingerprint_chunk
+from utils.job_manifest import JobManifest, PENDING, DONE, FAILED, hash_text
+from utils.chapters import get_chapters, chapter_filename
+from utils.playlist import PlaylistWriter, segments_dir
+from utils.mp3_utils import Mp3PassthroughWriter, probe_mp3
+from utils.chunk_sizer import AdaptiveChunkSizer
+from utils.loudness import LoudnessNormalizer
+from utils.chunk_index import build_index, write_index, read_index, describe_text
+from utils.repair import verify_audiobook, splice_chunks
+from utils import metrics
+
+# Default number of audio downloads kept in flight at once
+DEFAULT_DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_MAX_CONCURRENCY", "4"))
+
+# Default number of chapters converted at the same time in chapter mode
+DEFAULT_CHAPTER_WORKERS = int(os.getenv("AUDIOBOOK_CHAPTER_WORKERS", "2"))
+
+# Worker processes of the optional post-processing stage; 0 uses every CPU
+DEFAULT_POLISH_WORKERS = int(os.getenv("AUDIOBOOK_POLISH_WORKERS", "0"))
+
+# State of a chapter without any text to read, which is left out of the audiobook
+EMPTY = "empty"
+
+class OrderedBuffer:
+    """Reassembles results that finish out of order back into chunk order."""
+
+    def __init__(self, start=0):
+        self.next_index = start
+        self._items = {}
+
+    def put(self, index, item):
+        """Store the result for a chunk."""
+        self._items[index] = item
+
+    def pop_ready(self):
+        """
+        Release every result that is next in line.
+
+        Yields:
+            tuple: (index, item) pairs in chunk order, stopping at the first gap
+        """
+        while self.next_index in self._items:
+            index = self.next_index
+            self.next_index += 1
+            yield index, self._items.pop(index)
+
+    def __len__(self):
+        return len(self._items)
+
+def _synthesize(api, text, voice_id, cache, sizer=None, pinned=None):
+    """Synthesize one chunk; returns ("path", path) for cache hits and ("url", url) otherwise."""
+    if cache is not None:
+        path = cache.get_path(cache.make_key(text, voice_id), pin=pinned is not None)
+        if path is not None:
+            if pinned is not None:
+                pinned.append(path)
+            metrics.observe("cache.hit", chars=len(text))
+            return "path", path
+        metrics.observe("cache.miss", chars=len(text))
+
+    start = time.perf_counter()
+    url = api.text_to_speech(text, voice_id)
+    if sizer is not None and url is not None:
+        sizer.record(len(text), time.perf_counter() - start)
+    return "url", url
+
+def _download(url, output_path, cache, cache_key, pinned=None):
+    """Download synthesized audio to disk, storing it in the cache when one is used."""
+    content = download_audio_bytes(url)
+    if content is None:
+        return None
+    
+    # A truncated download or an error page has no MPEG frames
+    if probe_mp3(content) is None:
+        print(f"Downloaded audio from {url} is not valid MP3")
+        return None
+
+    if cache is not None:
+        path = cache.put(cache_key, content, pin=pinned is not None)
+        if pinned is not None:
+            pinned.append(path)
+        return path
+
+    with open(output_path, "wb") as f:
+        f.write(content)
+    return output_path
+
+def _share_audio(path, work_dir, index):
+    """Copy the audio of a repeated chunk to the file of another chunk with the same text."""
+    if not path:
+        return None
+    shared_path = os.path.join(work_dir, f"chunk_{index+1:05d}.mp3")
+    try:
+        shutil.copyfile(path, shared_path)
+    except OSError as e:
+        print(f"Error copying audio of a repeated chunk: {str(e)}")
+        return None
+    return shared_path
+
+def run_synthesis_pipeline(chunks, voice_id, work_dir, synth_workers=DEFAULT_MAX_CONCURRENCY,
+                           download_workers=DEFAULT_DOWNLOAD_CONCURRENCY, max_pending=None,
+                           cache=None, progress_callback=None, on_ready=None,
+                           stop_on_failure=False, api=None, manifest=None, sizer=None, dedup=True,
+                           pinned=None, should_stop=None):
+    """
+    Synthesize chunks and download their audio in overlapping stages.
+
+    Every ``audioUrl`` is handed to the download pool the moment the API
+    returns it, while later chunks are still being synthesized, so download
+    latency hides behind synthesis latency and no URL has time to expire.
+    Downloaded audio goes into an ordered reassembly buffer and is released
+    in chunk order.
+
+    Args:
+        chunks (iterable): Text chunks to convert; generators are consumed lazily
+        voice_id (str): Voice ID to use for synthesis
+        work_dir (str): Directory where downloaded chunk audio is written
+        synth_workers (int): Maximum number of concurrent API requests
+        download_workers (int): Maximum number of concurrent downloads
+        max_pending (int): Maximum number of chunks read but not yet released
+            in order. Defaults to four times synth_workers.
+        cache (AudioCache): Optional cache of synthesized audio. Cached chunks
+            skip the API, and new downloads are stored in the cache instead
+            of work_dir.
+        progress_callback (callable): Optional function called as
+            ``progress_callback(completed, total, index, path)`` each time a
+            chunk finishes, where total counts the chunks read so far
+        on_ready (callable): Optional function called as
+            ``on_ready(index, path)`` in chunk order as soon as a chunk and
+            every chunk before it have finished
+        stop_on_failure (bool): Stop reading new chunks and cancel requests
+            that have not started yet once a chunk fails
+        should_stop (callable): Optional function checked as chunks are read
+            and finish; once it returns True the pipeline stops as it does
+            for stop_on_failure, such as when on_ready gave up on the output
+        api (MurfAPI): API client to use instead of the shared instance
+        manifest (JobManifest): Optional job checkpoint. Chunks it records
+            as done are reused without calling the API, and every finished
+            chunk is recorded in it so a later run can resume. Chunks
+            whose text is unchanged from the previous job it was diffed
+            against (see JobManifest.use_previous) reuse that job's audio.
+        sizer (AdaptiveChunkSizer): Optional sizer to report the latency of
+            every synthesis request to, when it also sizes the chunks
+        dedup (bool): Synthesize repeated text once. A chunk whose
+            fingerprint_chunk() matches an earlier chunk of this run waits
+            for that chunk's audio and gets a copy of it, as long as the
+            audio is still on disk, instead of a request of its own. Each
+            repeat that got audio this way is recorded as a "synth.dedup"
+            measurement; repeats of a chunk that failed fail with it.
+        pinned (list): Optional list that the cache file of every chunk is
+            added to as it is pinned (see AudioCache.pin), so the cache
+            cannot evict it before the caller has read it. The caller must
+            unpin them, also when the pipeline fails.
+
+    Returns:
+        list: Local audio file paths in chunk order, with None for chunks
+            that failed
+    """
+    api = api or get_murf_api()
+    if isinstance(api, MurfAPI):
+        api.reserve_connections(synth_workers)
+    max_pending = max_pending or synth_workers * 4
+    os.makedirs(work_dir, exist_ok=True)
+
+    chunk_iter = enumerate(chunks)
+    known_total = len(chunks) if hasattr(chunks, "__len__") else None
+    results = []
+    buffer = OrderedBuffer()
+    pending = {}
+    state = {"completed": 0, "exhausted": False, "failed": False, "stopped": False, "resumed": 0, "reused": 0,
+             "deduplicated": 0}
+    chunk_texts = {}
+    # First chunk of each distinct text, and the repeats waiting for its audio while it is converted
+    leaders = {}
+    followers = {}
+
+    def pin(path):
+        # Cache hits and downloads are pinned as the cache hands them out
+        if pinned is not None and cache is not None and cache.pin(path):
+            pinned.append(path)
+
+    def finish(index, path):
+        results[index] = path
+        if manifest is not None:
+            manifest.record(index, chunk_texts.pop(index), path)
+        state["completed"] += 1
+        if path is None:
+            state["failed"] = True
+
+        if progress_callback:
+            progress_callback(state["completed"], known_total or len(results), index, path)
+
+        buffer.put(index, path)
+        for ready_index, ready_path in buffer.pop_ready():
+            if on_ready:
+                on_ready(ready_index, ready_path)
+
+    def share(index, chars, path):
+        # A repeat only saved a request if it actually got audio
+        shared_path = _share_audio(path, work_dir, index)
+        if shared_path is not None:
+            state["deduplicated"] += 1
+            metrics.observe("synth.dedup", chars=chars, chunk=index)
+        finish(index, shared_path)
+
+    def settle(index, path):
+        # Repeats get their copies before the chunk is released, since on_ready may delete its file
+        for follower, chars in followers.pop(index, []):
+            share(follower, chars, path)
+        finish(index, path)
+
+    def check_stop():
+        # Requests already sent cannot be taken back, but no new ones are made
+        if state["stopped"]:
+            return
+        if (state["failed"] and stop_on_failure) or (should_stop is not None and should_stop()):
+            state["stopped"] = state["exhausted"] = True
+            for future, (stage, _, _) in pending.items():
+                if stage == "synth":
+                    future.cancel()
+
+    with ThreadPoolExecutor(max_workers=synth_workers) as synth_pool, \
+            ThreadPoolExecutor(max_workers=download_workers) as download_pool:
+        while True:
+            # Keep the synthesis pool fed without reading too far ahead
+            while not state["exhausted"] and len(results) - buffer.next_index < max_pending:
+                check_stop()
+                if state["stopped"]:
+                    break
+                try:
+                    index, chunk = next(chunk_iter)
+                except StopIteration:
+                    state["exhausted"] = True
+                    break
+
+                results.append(None)
+                if manifest is not None:
+                    chunk_texts[index] = chunk
+                    resumed_path = manifest.completed_path(index, chunk)
+                    if resumed_path is not None:
+                        pin(resumed_path)
+                        state["resumed"] += 1
+                        metrics.observe("manifest.resumed", chars=len(chunk), chunk=index)
+                        finish(index, resumed_path)
+                        continue
+                    
+                    reused_path = manifest.reuse_previous(index, chunk)
+                    if reused_path is not None:
+                        pin(reused_path)
+                        state["reused"] += 1
+                        metrics.observe("manifest.reused", chars=len(chunk), chunk=index)
+                        finish(index, reused_path)
+                        continue
+
+                if dedup:
+                    fingerprint = fingerprint_chunk(chunk)
+                    leader = leaders.get(fingerprint)
+                    if leader in followers:
+                        followers[leader].append((index, len(chunk)))
+                        continue
+                    if leader is not None and results[leader] and os.path.exists(results[leader]):
+                        share(index, len(chunk), results[leader])
+                        continue
+                    leaders[fingerprint] = index
+                    followers[index] = []
+
+                # Worker threads report to the current job and attribute measurements to the chunk
+                future = synth_pool.submit(metrics.in_context(_synthesize, index), api, chunk, voice_id, cache, sizer,
+                                           pinned)
+                pending[future] = ("synth", index, chunk)
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, index, chunk = pending.pop(future)
+
+                if future.cancelled():
+                    settle(index, None)
+                    continue
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error processing chunk {index+1}: {str(e)}")
+                    settle(index, None)
+                    continue
+
+                if stage == "download":
+                    settle(index, result)
+                    continue
+
+                kind, value = result
+                if value is None:
+                    settle(index, None)
+                elif kind == "path":
+                    settle(index, value)
+                else:
+                    output_path = os.path.join(work_dir, f"chunk_{index+1:05d}.mp3")
+                    cache_key = cache.make_key(chunk, voice_id) if cache is not None else None
+                    download = download_pool.submit(metrics.in_context(_download, index), value, output_path, cache, cache_key,
+                                                    pinned)
+                    pending[download] = ("download", index, chunk)
+
+            check_stop()
+
+    if manifest is not None:
+        manifest.save()
+        if state["resumed"]:
+            print(f"Resumed job {manifest.job_id}: reused {state['resumed']} finished chunks")
+        if state["reused"]:
+            print(f"Reused {state['reused']} unchanged chunks from job {manifest.data['previous_job']}")
+    if state["deduplicated"]:
+        print(f"Synthesized repeated text once, saving {state['deduplicated']} requests")
+
+    return results
+
+def iter_anchored_page_chunks(pages, chunk_size=3000):
+    """
+    Chunk cleaned pages so that an edit only changes the chunks around it.
+    
+    Chunks never cross a page boundary, and within a page they end at
+    content-defined anchors (see text_chunker.iter_anchored_chunks), so a
+    revised edition of a book produces the same chunks wherever its text
+    did not change.
+    
+    Args:
+        pages (iterable): Cleaned text of each page, in order
+        chunk_size (int or callable): Maximum length of each chunk, or an
+            AdaptiveChunkSizer
+        
+    Yields:
+        str: Text chunks in reading order
+    """
+    for page in pages:
+        for chunk in iter_anchored_chunks(page, chunk_size):
+            yield chunk.text
+
+def iter_pdf_chunks(pdf_path, chunk_size=3000, anchored=False, start_page=0, end_page=None):
+    """
+    Read, clean and chunk a PDF incrementally, one page at a time.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        chunk_size (int or callable): Maximum length of each chunk, or an
+            AdaptiveChunkSizer
+        anchored (bool): Chunk with iter_anchored_page_chunks instead of
+            packing sentences across pages
+        start_page (int): First page to read (inclusive)
+        end_page (int): Last page to read (exclusive), or None for the last page
+        
+    Yields:
+        str: Text chunks in reading order
+    """
+    pages = (clean_text(page) for page in iter_pdf_pages(pdf_path, start_page, end_page))
+    if anchored:
+        yield from iter_anchored_page_chunks(pages, chunk_size)
+        return
+    
+    for chunk in iter_chunks_from_stream((page for page in pages if page), chunk_size):
+        yield chunk.text
+
+def stream_pdf_to_audiobook(pdf_path, output_path, voice_id="en-US-William", chunk_size=3000,
+                            synth_workers=DEFAULT_MAX_CONCURRENCY, cache=None,
+                            progress_callback=None, api=None, manifest=None, sizer=None, anchored=False,
+                            start_page=0, end_page=None, playlist=None, polisher=None, normalizer=None,
+                            raise_errors=False):
+    """
+    Convert a PDF to an audiobook without holding the book in memory.
+    
+    Pages are extracted lazily, cleaned and chunked as they are read, and
+    only enough chunks to keep the API busy are read ahead. Each chunk's
+    audio is appended to the output as soon as it and every chunk before
+    it are ready, by copying its MP3 frames without re-encoding, then its
+    temporary file is deleted, so memory and disk use stay flat however
+    long the book is and the start of the audiobook is written while later
+    pages are still unread. A chunk index (see chunk_index) is written
+    next to the finished audiobook.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        output_path (str): Path of the audiobook to write
+        voice_id (str): Voice ID to use for synthesis
+        chunk_size (int): Maximum length of each text chunk
+        synth_workers (int): Maximum number of concurrent API requests
+        cache (AudioCache): Optional cache of synthesized audio
+        progress_callback (callable): Optional function called as
+            ``progress_callback(completed, total, index, path)`` each time a
+            chunk finishes, where total counts the chunks read so far
+        api (MurfAPI): API client to use instead of the shared instance
+        manifest (JobManifest): Optional job checkpoint. Chunk audio is then
+            kept in the job directory instead of being deleted, so a failed
+            run can be resumed.
+        sizer (AdaptiveChunkSizer): Optional sizer that picks the size of
+            each chunk from measured latency, instead of chunk_size
+        anchored (bool): Use page- and content-anchored chunks, which stay
+            the same across revisions of the book
+        start_page (int): First page to convert (inclusive)
+        end_page (int): Last page to convert (exclusive), or None for the last page
+        playlist (PlaylistWriter): Optional playlist that every chunk is
+            also published to as soon as it is appended. It is closed
+            when the audiobook is complete.
+        polisher (ChunkPolisher): Optional pool that normalizes and fades
+            each chunk as soon as it is synthesized, before it is appended
+        normalizer (LoudnessNormalizer): Optional stage that brings each
+            chunk to the book's target loudness before it is appended
+        raise_errors (bool): Raise an exception describing why the
+            conversion failed, instead of returning False
+        
+    Returns:
+        bool: True if every chunk was converted and the audiobook was written
+    """
+    if manifest is not None:
+        work_dir = manifest.chunks_dir
+    else:
+        work_dir = tempfile.mkdtemp(prefix="audiobook_stream_")
+    writer = Mp3PassthroughWriter(output_path)
+    state = {"failed": False, "first_audio": None, "playlist_failed": False, "error": None}
+    start = time.perf_counter()
+    # Only the length and hash of each chunk are kept, for the chunk index
+    texts = []
+    
+    def remember_texts(chunks):
+        for chunk in chunks:
+            texts.append(describe_text(chunk))
+            yield chunk
+    
+    def on_chunk_done(completed, total, index, path):
+        if polisher is not None:
+            polisher.submit(path)
+        if progress_callback:
+            progress_callback(completed, total, index, path)
+    
+    def append_ready(index, path):
+        if state["failed"]:
+            return
+        
+        with metrics.chunk_scope(index):
+            polished = polisher.result(path, index) if polisher is not None else path
+            source = normalizer.process([polished])[0] if normalizer is not None and polished else polished
+            data = load_audio_bytes(source) if source else None
+            if data is None or not writer.append(data):
+                print(f"Chunk {index+1} failed, stopping the audiobook")
+                state["failed"] = True
+                state["error"] = Exception(f"Failed to convert chunk {index+1}" if data is None
+                                           else f"Failed to append chunk {index+1} to the audiobook")
+                return
+            
+            # A playlist with a gap would skip audio, so publishing stops at the first error
+            if playlist is not None and not state["playlist_failed"]:
+                audio_segment = load_audio_segment(source)
+                state["playlist_failed"] = audio_segment is None or not playlist.append(audio_segment)
+            if polisher is not None:
+                polisher.discard(polished)
+            if normalizer is not None:
+                normalizer.discard(source)
+        if state["first_audio"] is None:
+            state["first_audio"] = time.perf_counter() - start
+            print(f"First audio written after {state['first_audio']:.2f}s")
+        
+        # Cached and checkpointed files are kept, other downloads are not needed any more
+        if manifest is None and os.path.dirname(path) == work_dir:
+            os.remove(path)
+    
+    try:
+        run_synthesis_pipeline(
+            remember_texts(iter_pdf_chunks(pdf_path, sizer or chunk_size, anchored, start_page, end_page)),
+            voice_id,
+            work_dir,
+            synth_workers=synth_workers,
+            cache=cache,
+            progress_callback=on_chunk_done,
+            on_ready=append_ready,
+            stop_on_failure=True,
+            api=api,
+            manifest=manifest,
+            sizer=sizer,
+            should_stop=lambda: state["failed"]
+        )
+    except Exception as e:
+        print(f"Error streaming audiobook: {str(e)}")
+        state["failed"] = True
+        state["error"] = state["error"] or e
+    finally:
+        if manifest is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    if state["failed"] or writer.segments_written == 0:
+        writer.abort()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        if raise_errors:
+            # Without an error, no chunk was read at all
+            raise state["error"] or Exception(
+                "No text could be extracted from the PDF. Please check if the PDF contains readable text.")
+        return False
+    
+    if not writer.close():
+        if raise_errors:
+            raise Exception("Failed to write the audiobook")
+        return False
+    write_index(output_path, build_index(output_path, writer, texts, writer.spans))
+    
+    if playlist is not None and not state["playlist_failed"]:
+        playlist.close()
+    if manifest is not None:
+        manifest.finish(writer.segments_written)
+    
+    elapsed = time.perf_counter() - start
+    print(f"Streamed {writer.segments_written} chunks ({writer.duration_ms / 1000:.1f}s of audio) in {elapsed:.2f}s")
+    return True
+
+def _find_chunk_texts(pdf_path, chunk_size, wanted, incremental=False):
+    """
+    Recover the text of chunks from their hashes by chunking the PDF again.
+
+    Every way the regular and streaming modes chunk a book at a fixed size
+    is tried, starting with the one the job used; chunks cut to adaptive
+    sizes cannot be recovered.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        chunk_size (int): Maximum length of each text chunk
+        wanted (dict): Chunk numbers by the SHA-256 of their text
+        incremental (bool): Whether the job anchored its chunks to pages
+
+    Returns:
+        dict: Text of every chunk that was found, by chunk number
+    """
+    found = {}
+    candidates = [
+        lambda: split_text(extract_text_from_pdf(pdf_path, parallel=True), chunk_size),
+        lambda: iter_pdf_chunks(pdf_path, chunk_size),
+        lambda: iter_pdf_chunks(pdf_path, chunk_size, anchored=True)
+    ]
+    if incremental:
+        candidates.reverse()
+    for candidate in candidates:
+        for chunk in candidate():
+            for number in wanted.pop(hash_text(chunk), []):
+                found[number] = chunk
+            if not wanted:
+                return found
+    return found
+
+def repair_audiobook(pdf_path, output_path, voice_id="en-US-William", chunk_size=3000,
+                     synth_workers=DEFAULT_MAX_CONCURRENCY, texts=None, deep=False,
+                     adaptive=False, incremental=False, polish=False, loudness=False,
+                     progress_callback=None, api=None):
+    """
+    Re-synthesize only the missing or damaged chunks of a finished audiobook.
+
+    The chunk index next to the audiobook locates every chunk, so the bad
+    ones are found with verify_audiobook() and their new audio is spliced in
+    with splice_chunks(); the rest of the book is copied, not re-encoded.
+    The text of a bad chunk is recovered by matching the hashes in the
+    index against the PDF chunked again, unless texts is given. The
+    audiobook is only rewritten once every bad chunk has new audio, so a
+    chunk that cannot be repaired never shortens the book.
+
+    Args:
+        pdf_path (str): Path to the PDF file the audiobook was made from
+        output_path (str): Path of the audiobook
+        voice_id (str): Voice ID to use for synthesis
+        chunk_size (int): Maximum length of each text chunk of the job
+        synth_workers (int): Maximum number of concurrent API requests
+        texts (list): Optional text of every chunk, in order
+        deep (bool): Also decode every chunk to find damage inside its frames
+        adaptive (bool): Whether the job sized its chunks adaptively; their
+            text cannot be recovered without texts
+        incremental (bool): Whether the job anchored its chunks to pages
+        polish (bool): Normalize and fade the new chunks, like the job did
+        loudness (bool): Bring the new chunks to the loudness target
+        progress_callback (callable): Optional function called as
+            ``progress_callback(percent, message)`` as the repair advances
+        api (MurfAPI): API client to use instead of the shared instance
+
+    Returns:
+        dict: checked, bad (chunk number and reason of each), repaired and
+            unrepaired chunk numbers
+
+    Raises:
+        Exception: If the audiobook has no chunk index or cannot be rewritten
+    """
+    def report(percent, message):
+        if progress_callback:
+            progress_callback(percent, message)
+
+    report(5, "🩺 Checking every chunk of the audiobook...")
+    bad = verify_audiobook(output_path, deep=deep)
+    index = read_index(output_path, check_size=False)
+    summary = {"checked": len(index["chunks"]), "bad": bad, "repaired": [], "unrepaired": []}
+    if not bad:
+        report(100, "✅ Every chunk of the audiobook is intact")
+        return summary
+
+    numbers = [number for number, _ in bad]
+    if texts is not None:
+        found = {number: texts[number] for number in numbers}
+    elif adaptive:
+        found = {}
+    else:
+        report(15, f"📖 Finding the text of {len(numbers)} damaged chunks...")
+        wanted = {}
+        for number in numbers:
+            wanted.setdefault(index["text_sha256"][number], []).append(number)
+        found = _find_chunk_texts(pdf_path, chunk_size, wanted, incremental)
+
+    summary["unrepaired"] = [number for number in numbers if number not in found]
+    if summary["unrepaired"]:
+        report(100, f"⚠️ The text of {len(summary['unrepaired'])} damaged chunks could not be found; "
+                    f"the audiobook was left unchanged")
+        return summary
+
+    replacements = {}
+    if found:
+        report(30, f"🎙️ Converting {len(found)} chunks to speech again...")
+        order = sorted(found)
+        polisher = ChunkPolisher() if polish else None
+        normalizer = LoudnessNormalizer() if loudness else None
+        work_dir = tempfile.mkdtemp(prefix="audiobook_repair_")
+        try:
+            # The cache is skipped, since it may hold the damaged audio
+            audio_paths = run_synthesis_pipeline([found[number] for number in order], voice_id, work_dir,
+                                                 synth_workers=synth_workers, api=api)
+            done = [(number, path) for number, path in zip(order, audio_paths) if path]
+            if polisher is not None:
+                for number, path in done:
+                    polisher.submit(path)
+                done = [(number, polisher.result(path, number)) for number, path in done]
+            if normalizer is not None and done:
+                done = list(zip([number for number, _ in done],
+                                normalizer.process([path for _, path in done])))
+            for number, path in done:
+                audio = load_audio_bytes(path) if path else None
+                if audio is not None:
+                    replacements[number] = audio
+        finally:
+            if polisher is not None:
+                polisher.close()
+            if normalizer is not None:
+                normalizer.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary["unrepaired"] = [number for number in numbers if number not in replacements]
+    if summary["unrepaired"]:
+        report(100, f"⚠️ {len(summary['unrepaired'])} damaged chunks could not be converted again; "
+                    f"the audiobook was left unchanged")
+        return summary
+
+    report(80, f"🧵 Splicing {len(replacements)} chunks into the audiobook...")
+    if splice_chunks(output_path, replacements) is None:
+        raise Exception("Failed to splice the repaired chunks into the audiobook")
+    summary["repaired"] = sorted(replacements)
+    report(100, f"✅ Repaired {len(replacements)} damaged chunks")
+    return summary
+
+def chapters_dir(output_path):
+    """Directory holding the per-chapter files of the audiobook written to output_path."""
+    return os.path.splitext(output_path)[0] + "_chapters"
+
+def convert_pdf_chapters(pdf_path, output_path, voice_id="en-US-William", chunk_size=3000,
+                         synth_workers=DEFAULT_MAX_CONCURRENCY, cache=None,
+                         chapter_workers=DEFAULT_CHAPTER_WORKERS, progress_callback=None,
+                         on_chapter_ready=None, api=None, manifest=None, sizer=None, polisher=None,
+                         normalizer=None):
+    """
+    Convert a PDF chapter by chapter, with several chapters in flight at once.
+    
+    The book is split with chapters.get_chapters, and every chapter is
+    extracted, synthesized and encoded to its own file by
+    stream_pdf_to_audiobook on its own thread. The API requests are
+    shared out between the chapters running at the same time. A failed
+    chapter does not stop the others. Once every chapter has its file,
+    they are joined into a chapter-marked audiobook at output_path.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        output_path (str): Path of the audiobook to write; chapter files go
+            to the directory given by chapters_dir(output_path)
+        voice_id (str): Voice ID to use for synthesis
+        chunk_size (int): Maximum length of each text chunk
+        synth_workers (int): Maximum number of concurrent API requests in total
+        cache (AudioCache): Optional cache of synthesized audio
+        chapter_workers (int): Number of chapters converted at the same time
+        progress_callback (callable): Optional function called as
+            ``progress_callback(completed, total, chapter)`` each time a
+            chapter finishes
+        on_chapter_ready (callable): Optional function called with the
+            chapter's state as soon as its file is written, so it can be
+            played while later chapters are still being converted
+        api (MurfAPI): API client to use instead of the shared instance
+        manifest (JobManifest): Optional job checkpoint. Finished chapters
+            are recorded in it and skipped when the job runs again.
+        sizer (AdaptiveChunkSizer): Optional sizer shared by every chapter
+        polisher (ChunkPolisher): Optional post-processing pool shared by
+            every chapter
+        normalizer (LoudnessNormalizer): Optional loudness stage shared by
+            every chapter
+        
+    Returns:
+        list: State of each chapter, a dict with its index, title, pages,
+            path, status and seconds; the audiobook is only written if no
+            chapter failed
+    """
+    chapters = get_chapters(pdf_path)
+    output_dir = chapters_dir(output_path)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    chapter_workers = max(1, min(chapter_workers, len(chapters)))
+    workers_per_chapter = max(1, synth_workers // chapter_workers)
+    # The chapters share one connection pool
+    (api or get_murf_api()).reserve_connections(max(synth_workers, workers_per_chapter * chapter_workers))
+    print(f"Converting {len(chapters)} chapters, {chapter_workers} at a time")
+    
+    finished = {}
+    if manifest is not None:
+        for entry in manifest.data.get("chapters", []):
+            if entry["status"] == EMPTY or (entry["status"] == DONE and os.path.dirname(entry["path"]) == output_dir
+                                            and os.path.exists(entry["path"])):
+                finished[(entry["title"], entry["start_page"], entry["end_page"])] = entry
+    
+    states = []
+    for chapter in chapters:
+        key = (chapter.title, chapter.start_page, chapter.end_page)
+        states.append(dict(finished.get(key) or {
+            "index": chapter.index,
+            "title": chapter.title,
+            "start_page": chapter.start_page,
+            "end_page": chapter.end_page,
+            "path": os.path.join(output_dir, chapter_filename(chapter)),
+            "status": PENDING,
+            "seconds": 0.0
+        }, index=chapter.index))
+    
+    lock = threading.Lock()
+    progress = {"completed": 0}
+    start = time.perf_counter()
+    
+    def chapter_done(state):
+        with lock:
+            progress["completed"] += 1
+            if manifest is not None:
+                manifest.data["chapters"] = states
+                manifest.save()
+        if state["status"] == DONE and on_chapter_ready:
+            on_chapter_ready(dict(state))
+        if progress_callback:
+            progress_callback(progress["completed"], len(states), dict(state))
+    
+    def convert(chapter, state):
+        chapter_start = time.perf_counter()
+        with metrics.timer("chapter.convert") as timer:
+            has_text = any(clean_text(page) for page in iter_pdf_pages(pdf_path, chapter.start_page, chapter.end_page))
+            if not has_text:
+                state["status"] = EMPTY
+            elif stream_pdf_to_audiobook(pdf_path, state["path"], voice_id, chunk_size=chunk_size,
+                                         synth_workers=workers_per_chapter, cache=cache, api=api,
+                                         sizer=sizer, start_page=chapter.start_page, end_page=chapter.end_page,
+                                         polisher=polisher, normalizer=normalizer):
+                state["status"] = DONE
+            else:
+                state["status"] = FAILED
+                timer.add(errors=1)
+        state["seconds"] = time.perf_counter() - chapter_start
+        
+        if state["status"] == DONE and "first_chapter" not in progress:
+            progress["first_chapter"] = time.perf_counter() - start
+            print(f"First chapter ready after {progress['first_chapter']:.2f}s: {chapter.title}")
+            metrics.mark_first_audio()
+        chapter_done(state)
+    
+    with ThreadPoolExecutor(max_workers=chapter_workers, thread_name_prefix="audiobook-chapter") as pool:
+        futures = []
+        for chapter, state in zip(chapters, states):
+            if state["status"] in (DONE, EMPTY):
+                chapter_done(state)
+                continue
+            futures.append(pool.submit(metrics.in_context(convert), chapter, state))
+        
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error converting chapter: {str(e)}")
+    
+    for state in states:
+        if state["status"] == PENDING:
+            state["status"] = FAILED
+    
+    if all(state["status"] != FAILED for state in states):
+        ready = [state for state in states if state["status"] == DONE]
+        if not ready or not merge_with_chapters([state["path"] for state in ready],
+                                                [state["title"] for state in ready], output_path):
+            raise Exception("Failed to join the chapters into an audiobook")
+    
+    return states
+
+def convert_pdf_to_audiobook(pdf_path, output_path, voice_id="en-US-William", chunk_size=3000,
+                             synth_workers=DEFAULT_MAX_CONCURRENCY, cache=None, streaming=False,
+                             adaptive=False, incremental=False, book=None, chapters=False,
+                             on_chapter_ready=None, progressive=False, polish=False,
+                             polish_workers=DEFAULT_POLISH_WORKERS, loudness=False,
+                             progress_callback=None, api=None):
+    """
+    Run a whole conversion job: extract, chunk, synthesize and merge.
+    
+    Finished chunks are checkpointed in the job's manifest, so running the
+    same job again after a failure resumes it instead of starting over.
+    Unless metrics are switched off, a report of the time, bytes and
+    characters spent in each stage and on each chunk is written next to the
+    audiobook as ``<output_path>.report.json``, whether the job succeeds or not.
+    Its headline ``time_to_first_audio_seconds`` is the time from the start
+    of the job until the first audio could be played.
+    Repeated chunks, such as running headers and notices, are synthesized
+    once (see run_synthesis_pipeline), and the requests and characters this
+    saved are added to the report as ``deduplication``.
+    
+    Args:
+        pdf_path (str): Path to the PDF file
+        output_path (str): Path of the audiobook to write
+        voice_id (str): Voice ID to use for synthesis
+        chunk_size (int): Maximum length of each text chunk
+        synth_workers (int): Maximum number of concurrent API requests
+        cache (AudioCache): Optional cache of synthesized audio
+        streaming (bool): Convert page by page with stream_pdf_to_audiobook
+        adaptive (bool): Size chunks from the latency measured during the
+            run, starting at chunk_size. The sizes chosen and the resulting
+            throughput are added to the report.
+        incremental (bool): Treat the PDF as a revision of an earlier
+            incremental job for the same book and voice. Chunks are anchored
+            to pages and content so an edit only changes the chunks around
+            it, unchanged chunks reuse the audio of the previous job, and
+            the chunk audio is kept for the next revision.
+        book (str): Name identifying the book across editions, defaults to
+            the PDF's file name without extension
+        chapters (bool): Split the book into chapters with
+            convert_pdf_chapters and convert them in parallel, writing a
+            file per chapter and a chapter-marked audiobook. streaming and
+            incremental do not apply in this mode.
+        on_chapter_ready (callable): Optional function called with each
+            chapter's state as soon as its file is written, in chapter mode
+        progressive (bool): Also publish the audio as a growing HLS playlist
+            in segments_dir(output_path) while the book is converted, so
+            playback can start with the first chunks. Chapter mode already
+            publishes each chapter as it finishes and ignores this.
+        polish (bool): Normalize and fade every chunk before it is merged,
+            on a pool of processes that works while later chunks are still
+            being synthesized. The time spent on each chunk is added to
+            the report.
+        polish_workers (int): Number of post-processing processes, 0 for
+            one per CPU
+        loudness (bool): Measure the integrated loudness of every chunk and
+            bring each one to the same target (loudness.DEFAULT_TARGET_LUFS)
+            before it is merged. The loudness and gain of each chunk are
+            added to the report.
+        progress_callback (callable): Optional function called as
+            ``progress_callback(percent, message)`` as the job advances
+        api (MurfAPI): API client to use instead of the shared instance
+        
+    Returns:
+        str: Path of the finished audiobook
+        
+    Raises:
+        Exception: If the job fails; converted chunks are kept for a rerun
+    """
+    with metrics.job_scope(os.path.basename(pdf_path)) as recorder:
+        recorder.extra.update({
+            "output_path": output_path,
+            "settings": {"voice_id": voice_id, "chunk_size": chunk_size,
+                         "synth_workers": synth_workers, "streaming": streaming, "adaptive": adaptive,
+                         "incremental": incremental, "chapters": chapters, "progressive": progressive,
+                         "polish": polish, "loudness": loudness},
+            "ok": False
+        })
+        sizer = AdaptiveChunkSizer(chunk_size, workers=synth_workers) if adaptive else None
+        book = book or os.path.splitext(os.path.basename(pdf_path))[0]
+        polisher = ChunkPolisher(polish_workers) if polish else None
+        normalizer = LoudnessNormalizer() if loudness else None
+        try:
+            result = _convert_pdf_to_audiobook(pdf_path, output_path, voice_id, chunk_size, synth_workers,
+                                               cache, streaming, sizer, incremental, book, chapters,
+                                               on_chapter_ready, progressive, polisher, normalizer,
+                                               progress_callback, api)
+            recorder.extra["ok"] = True
+            info = probe_mp3(output_path)
+            if info is not None:
+                recorder.extra["audio"] = info._asdict()
+            return result
+        except Exception as e:
+            recorder.extra["error"] = str(e)
+            raise
+        finally:
+            if sizer is not None:
+                recorder.extra["adaptive_chunking"] = sizer.summary()
+            if polisher is not None:
+                polisher.close()
+                recorder.extra["post_processing"] = polisher.summary()
+            if normalizer is not None:
+                normalizer.close()
+                recorder.extra["loudness"] = normalizer.summary()
+            dedup = recorder.totals("synth.dedup")
+            recorder.extra["deduplication"] = {"requests_saved": dedup["items"], "chars_saved": dedup["chars"]}
+            if metrics.ENABLED:
+                try:
+                    recorder.write_report(metrics.report_path(output_path))
+                except OSError as e:
+                    print(f"Error writing job report: {str(e)}")
+
+def _convert_pdf_to_audiobook(pdf_path, output_path, voice_id, chunk_size, synth_workers,
+                              cache, streaming, sizer, incremental, book, chapters,
+                              on_chapter_ready, progressive, polisher, normalizer, progress_callback, api):
+    def report(percent, message):
+        if progress_callback:
+            progress_callback(percent, message)
+    
+    manifest = JobManifest.open(pdf_path, {
+        "voice_id": voice_id,
+        "chunk_size": chunk_size,
+        "streaming": streaming,
+        "adaptive": sizer is not None,
+        "incremental": incremental,
+        "chapters": chapters
+    }, book=book, keep_audio=incremental)
+    resumable = manifest.completed_count()
+    if resumable:
+        report(5, f"♻️ Resuming an earlier run: {resumable} chunks are already converted")
+    
+    if incremental:
+        previous = manifest.find_previous()
+        if previous is not None:
+            manifest.use_previous(previous)
+            report(5, f"🔍 Reusing unchanged chunks from the previous edition of {book}")
+    
+    def note_revision():
+        recorder = metrics.current_recorder()
+        revision = manifest.revision_summary()
+        if recorder is not None and revision is not None:
+            recorder.extra["revision"] = revision
+    
+    if chapters:
+        report(10, "📚 Converting the book chapter by chapter...")
+        
+        def on_chapter_done(completed, total, chapter):
+            report(int(10 + (completed / total) * 85), f"📚 Finished {completed}/{total} chapters...")
+        
+        states = convert_pdf_chapters(pdf_path, output_path, voice_id, chunk_size=chunk_size,
+                                      synth_workers=synth_workers, cache=cache,
+                                      progress_callback=on_chapter_done, on_chapter_ready=on_chapter_ready,
+                                      api=api, manifest=manifest, sizer=sizer, polisher=polisher,
+                                      normalizer=normalizer)
+        recorder = metrics.current_recorder()
+        if recorder is not None:
+            recorder.extra["chapters"] = states
+        
+        failed = [state["title"] for state in states if state["status"] == FAILED]
+        if failed:
+            raise Exception(f"{len(failed)} of {len(states)} chapters failed to convert: {', '.join(failed)}")
+        
+        manifest.finish(0)
+        report(100, "✅ Audiobook generation complete!")
+        return output_path
+    
+    playlist = None
+    if progressive:
+        # Segments of an earlier attempt are published again from the start
+        shutil.rmtree(segments_dir(output_path), ignore_errors=True)
+        playlist = PlaylistWriter(segments_dir(output_path))
+    
+    if streaming:
+        # Pages are converted and appended to the audiobook as they are read
+        report(10, "🎙️ Streaming PDF pages to speech...")
+        
+        def on_stream_chunk(completed, total, index, audio_path):
+            report(int(10 + (completed / total) * 85), f"🎙️ Converted {completed}/{total} chunks read so far...")
+        
+        stream_pdf_to_audiobook(pdf_path, output_path, voice_id, chunk_size=chunk_size,
+                                synth_workers=synth_workers, cache=cache,
+                                progress_callback=on_stream_chunk, api=api, manifest=manifest,
+                                sizer=sizer, anchored=incremental, playlist=playlist,
+                                polisher=polisher, normalizer=normalizer, raise_errors=True)
+        
+        metrics.mark_first_audio()
+        note_revision()
+        report(100, "✅ Audiobook generation complete!")
+        return output_path
+    
+    # Step 1: Extract text
+    report(10, "📖 Extracting text from PDF...")
+    if incremental:
+        # Pages are kept apart, since chunks are anchored to them
+        with metrics.timer("pdf.extract") as timer:
+            pages = [clean_text(page) for page in extract_pages_parallel(pdf_path)]
+            timer.add(items=len(pages))
+        text = " ".join(page for page in pages if page)
+    else:
+        text = extract_text_from_pdf(pdf_path, parallel=True)
+    if not text.strip():
+        raise Exception("No text could be extracted from the PDF. Please check if the PDF contains readable text.")
+    
+    # Step 2: Split text into chunks
+    report(20, "✂️ Splitting text into manageable chunks...")
+    if incremental:
+        chunk_iter = iter_anchored_page_chunks(pages, sizer or chunk_size)
+    elif sizer is not None:
+        chunk_iter = (chunk.text for chunk in iter_chunks(text, sizer))
+    else:
+        chunk_iter = None
+    
+    if chunk_iter is None:
+        chunks = split_text(text, chunk_size)
+        chunk_source = chunks
+    else:
+        # Chunks are cut lazily, so adaptive sizes use the latency measured so far
+        if sizer is not None:
+            sizer.total_chars = len(text)
+        chunks = []
+        
+        def chunk_source_iter():
+            for chunk in chunk_iter:
+                chunks.append(chunk)
+                yield chunk
+        
+        chunk_source = chunk_source_iter()
+    
+    # Step 3: Convert chunks to speech, downloading audio while later chunks are still being synthesized
+    report(20, "🎙️ Converting chunks to speech...")
+    state = {"chars": 0}
+    
+    polished = {}
+    
+    def on_chunk_done(completed, total, index, audio_path):
+        if polisher is not None:
+            polisher.submit(audio_path)
+        state["chars"] += len(chunks[index])
+        report(int(20 + (state["chars"] / len(text)) * 60), f"🎙️ Converted {completed}/{total} chunks to speech...")
+    
+    def publish_ready(index, audio_path):
+        # Chunks reach the playlist in order; nothing is published after a gap
+        if state.get("gap") or not audio_path:
+            state["gap"] = True
+            return
+        with metrics.chunk_scope(index):
+            if polisher is not None:
+                audio_path = polisher.result(audio_path, index)
+            if normalizer is not None:
+                audio_path = normalizer.process([audio_path])[0]
+            polished[index] = audio_path
+            audio_segment = load_audio_segment(audio_path)
+            if audio_segment is None or not playlist.append(audio_segment):
+                state["gap"] = True
+    
+    # Cached chunks are pinned until the merge, so a book larger than the cache cannot evict its own audio
+    pinned = []
+    try:
+        audio_paths = run_synthesis_pipeline(
+            chunk_source,
+            voice_id,
+            manifest.chunks_dir,
+            synth_workers=synth_workers,
+            progress_callback=on_chunk_done,
+            stop_on_failure=True,
+            cache=cache,
+            api=api,
+            manifest=manifest,
+            sizer=sizer,
+            on_ready=publish_ready if playlist is not None else None,
+            pinned=pinned
+        )
+    
+        for i, audio_path in enumerate(audio_paths):
+            if not audio_path:
+                raise Exception(f"Failed to convert chunk {i+1}: {chunks[i][:100]}...")
+    
+        # Chunks already published to the playlist have been processed
+        remaining = [i for i in range(len(audio_paths)) if i not in polished]
+        if polisher is not None:
+            report(80, "🎚️ Normalizing and fading audio chunks...")
+            for i in remaining:
+                audio_paths[i] = polisher.result(audio_paths[i], i)
+        if normalizer is not None and remaining:
+            report(80, "🎚️ Matching loudness across the book...")
+            for i, audio_path in zip(remaining, normalizer.process([audio_paths[i] for i in remaining])):
+                audio_paths[i] = audio_path
+        audio_paths = [polished.get(i, audio_path) for i, audio_path in enumerate(audio_paths)]
+    
+        # Step 4: Merge audio files
+        report(80, "🔗 Merging audio chunks...")
+        if not download_and_merge(audio_paths, output_path, stream=True,
+                                  texts=[describe_text(chunk) for chunk in chunks]):
+            raise Exception("Failed to merge the audio chunks")
+    finally:
+        for path in pinned:
+            cache.unpin(path)
+    
+    # Chunks the merge could not read are synthesized again and spliced in
+    index = read_index(output_path)
+    if index is not None and index["missing"]:
+        report(90, f"🩺 Repairing {len(index['missing'])} chunks the merge skipped...")
+        repair = repair_audiobook(pdf_path, output_path, voice_id, chunk_size, synth_workers=synth_workers,
+                                  texts=chunks, polish=polisher is not None, loudness=normalizer is not None,
+                                  api=api)
+        recorder = metrics.current_recorder()
+        if recorder is not None:
+            recorder.extra["repair"] = repair
+        if repair["unrepaired"]:
+            raise Exception(f"Failed to repair {len(repair['unrepaired'])} chunks of the audiobook")
+    
+    metrics.mark_first_audio()
+    if playlist is not None and not state.get("gap"):
+        playlist.close()
+    manifest.finish(len(chunks))
+    note_revision()
+    report(100, "✅ Audiobook generation complete!")
+    return output_path
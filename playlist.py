@@ -0,0 +1,190 @@
+import csv
+import functools
+import math
+import os
+import subprocess
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pydub import AudioSegment
+from utils import metrics
+
+# Longest segment in a playlist; chunks are cut into pieces of at most this length
+DEFAULT_SEGMENT_SECONDS = 30
+
+PLAYLIST_NAME = "playlist.m3u8"
+
+def segments_dir(output_path):
+    """Directory holding the progressive playlist of the audiobook written to output_path."""
+    return os.path.splitext(output_path)[0] + "_segments"
+
+class PlaylistWriter:
+    """
+    Publish audio as a growing HLS playlist of short MP3 segments.
+
+    Each appended chunk is encoded once and cut into segments of at most
+    segment_seconds, and the playlist is rewritten after every chunk, so
+    players can start on the first segments while later chunks are still
+    being synthesized. The playlist is an EVENT playlist until close()
+    marks it complete.
+    """
+
+    def __init__(self, output_dir, segment_seconds=DEFAULT_SEGMENT_SECONDS, bitrate="192k", pause_ms=500):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, PLAYLIST_NAME)
+        self.segment_seconds = segment_seconds
+        self.bitrate = bitrate
+        self.pause_ms = pause_ms
+        self.segments = []
+        self.chunks_written = 0
+        self.closed = False
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def append(self, audio_segment):
+        """
+        Encode one chunk of audio as new segments and publish them.
+
+        Args:
+            audio_segment (AudioSegment): Audio to append, preceded by the
+                inter-chunk pause if it is not the first chunk
+
+        Returns:
+            bool: True if the segments were written, False otherwise
+        """
+        if self.chunks_written and self.pause_ms > 0:
+            audio_segment = AudioSegment.silent(duration=self.pause_ms, frame_rate=audio_segment.frame_rate) + audio_segment
+        audio_segment = audio_segment.set_sample_width(2)
+
+        fd, list_path = tempfile.mkstemp(suffix=".csv", dir=self.output_dir)
+        os.close(fd)
+        command = [
+            AudioSegment.converter, "-y", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(audio_segment.frame_rate), "-ac", str(audio_segment.channels),
+            "-i", "pipe:0",
+            "-b:a", self.bitrate, "-f", "segment", "-segment_time", str(self.segment_seconds),
+            "-segment_start_number", str(len(self.segments)),
+            "-segment_list", list_path, "-segment_list_type", "csv",
+            os.path.join(self.output_dir, "segment_%05d.mp3")
+        ]
+        try:
+            with metrics.timer("playlist.segment", bytes=len(audio_segment.raw_data)) as timer:
+                result = subprocess.run(command, input=audio_segment.raw_data,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                if result.returncode != 0:
+                    timer.add(errors=1)
+                    print(f"Error encoding playlist segments: {result.stderr.decode('utf-8', errors='replace').strip()}")
+                    return False
+
+                with open(list_path, "r", encoding="utf-8", newline="") as f:
+                    new_segments = [(name, float(end) - float(start)) for name, start, end in csv.reader(f)]
+                timer.add(items=len(new_segments))
+        finally:
+            os.remove(list_path)
+
+        self.segments.extend(new_segments)
+        self.chunks_written += 1
+        self._write_playlist()
+        if self.chunks_written == 1:
+            metrics.mark_first_audio()
+        return True
+
+    def _write_playlist(self):
+        """Rewrite the playlist atomically so players never read half of it."""
+        target = max([self.segment_seconds] + [math.ceil(seconds) for _, seconds in self.segments])
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{target}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:" + ("VOD" if self.closed else "EVENT")
+        ]
+        for name, seconds in self.segments:
+            lines.append(f"#EXTINF:{seconds:.3f},")
+            lines.append(name)
+        if self.closed:
+            lines.append("#EXT-X-ENDLIST")
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """Mark the playlist complete, so players stop waiting for more segments."""
+        self.closed = True
+        self._write_playlist()
+
+def read_playlist(path):
+    """
+    Read the segments published so far.
+
+    Args:
+        path (str): Path of the playlist
+
+    Returns:
+        dict: "segments" as a list of (path, seconds), "seconds" in total and
+            "complete", or None if the playlist does not exist yet
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    segments = []
+    seconds = None
+    for line in lines:
+        if line.startswith("#EXTINF:"):
+            seconds = float(line[len("#EXTINF:"):].split(",")[0])
+        elif line and not line.startswith("#") and seconds is not None:
+            segments.append((os.path.join(os.path.dirname(path), line), seconds))
+            seconds = None
+
+    return {
+        "segments": segments,
+        "seconds": sum(seconds for _, seconds in segments),
+        "complete": "#EXT-X-ENDLIST" in lines
+    }
+
+class _PlaylistHandler(SimpleHTTPRequestHandler):
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **{
+        ".m3u8": "application/vnd.apple.mpegurl",
+        ".mp3": "audio/mpeg"
+    })
+
+    def end_headers(self):
+        # Players embedded in the app are served from another port
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+_playlist_server = None
+_playlist_server_lock = threading.Lock()
+
+def serve_playlists(directory, port, host="127.0.0.1"):
+    """
+    Serve a directory of playlists and segments over HTTP for players.
+
+    Only one server is started per process; later calls return it.
+
+    Args:
+        directory (str): Directory to serve, e.g. the job queue directory
+        port (int): Port to listen on
+        host (str): Address to bind
+
+    Returns:
+        ThreadingHTTPServer: Running server
+    """
+    global _playlist_server
+    with _playlist_server_lock:
+        if _playlist_server is None:
+            handler = functools.partial(_PlaylistHandler, directory=directory)
+            _playlist_server = ThreadingHTTPServer((host, port), handler)
+            _playlist_server.daemon_threads = True
+            threading.Thread(target=_playlist_server.serve_forever, daemon=True).start()
+            print(f"Serving playlists from {directory} at http://{host}:{_playlist_server.server_address[1]}/")
+        return _playlist_server
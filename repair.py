@@ -0,0 +1,159 @@
+import mmap
+import os
+import subprocess
+from pydub import AudioSegment
+from utils.mp3_utils import Mp3PassthroughWriter, conform_chunk, iter_frames, parse_frame_header, stream_params
+from utils.chunk_index import build_index, read_index, write_index
+from utils import metrics
+
+# Reasons a chunk of a finished audiobook needs to be repaired
+MISSING = "missing"
+TRUNCATED = "truncated"
+CORRUPT = "corrupt"
+UNDECODABLE = "undecodable"
+
+def _check_chunk(data, row, sample_rate, deep):
+    """Check one chunk's byte range; returns the reason it is bad, or None."""
+    _, _, start_ms, end_ms, start_byte, end_byte = row
+    if end_byte > len(data):
+        return TRUNCATED
+
+    # The frames must tile the range exactly and last as long as the index says
+    offset = start_byte
+    samples = 0
+    for frame_offset, header in iter_frames(data, start_byte, end_byte):
+        if frame_offset != offset:
+            return CORRUPT
+        offset += header.length
+        samples += header.samples
+    if offset != end_byte or abs(round(samples * 1000 / sample_rate) - (end_ms - start_ms)) > 1:
+        return CORRUPT
+
+    if deep and _decode_errors(data[start_byte:end_byte]):
+        return UNDECODABLE
+    return None
+
+def _decode_errors(data):
+    """Decode MP3 data with ffmpeg and return whatever it reported as errors."""
+    command = [AudioSegment.converter, "-v", "error", "-err_detect", "bitstream+buffer", "-f", "mp3", "-i", "pipe:0", "-f", "null", "-"]
+    result = subprocess.run(command, input=data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        return result.stderr or b"ffmpeg failed"
+    return result.stderr.strip()
+
+def verify_audiobook(output_path, deep=False):
+    """
+    Find the chunks of a finished audiobook that are missing or damaged.
+
+    Every chunk's byte range from the chunk index must hold whole MPEG
+    frames whose length matches the index. A deep check also decodes each
+    chunk with ffmpeg, which catches damage inside the frames.
+
+    Args:
+        output_path (str): Path of the merged audiobook
+        deep (bool): Decode every chunk as well
+
+    Returns:
+        list: (chunk number, reason) of every bad chunk, in order
+
+    Raises:
+        Exception: If the audiobook has no chunk index
+    """
+    index = read_index(output_path, check_size=False)
+    if index is None:
+        raise Exception(f"No chunk index found for {output_path}")
+
+    missing = set(index["missing"])
+    bad = []
+    with metrics.timer("repair.verify", items=len(index["chunks"])):
+        with open(output_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            try:
+                for i, row in enumerate(index["chunks"]):
+                    reason = MISSING if i in missing else _check_chunk(data, row, index["sample_rate"], deep)
+                    if reason is not None:
+                        bad.append((i, reason))
+            finally:
+                if size:
+                    data.close()
+    return bad
+
+def splice_chunks(output_path, replacements):
+    """
+    Replace chunks of a finished audiobook without re-encoding the others.
+
+    The audiobook is written again from its own frames: every chunk that is
+    not replaced is copied byte for byte, the pauses between chunks are the
+    same pre-encoded silence, and only a replacement whose stream
+    parameters differ from the book's is re-encoded. The info frame and
+    the chunk index are updated to the new layout.
+
+    Only whole frames are copied, so every chunk verify_audiobook() found
+    damaged must be replaced; a damaged chunk that is kept would lose its
+    broken frames and shorten the book.
+
+    Args:
+        output_path (str): Path of the merged audiobook
+        replacements (dict): MP3 data of the new audio, by chunk number
+
+    Returns:
+        dict: The new chunk index, or None if the audiobook could not be written
+    """
+    index = read_index(output_path, check_size=False)
+    if index is None:
+        print(f"No chunk index found for {output_path}")
+        return None
+
+    if not os.path.exists(output_path) or not os.path.getsize(output_path):
+        print(f"Nothing left of {output_path} to splice into; convert the book again")
+        return None
+
+    skip = set(index["missing"]) | set(replacements)
+    tmp_path = f"{output_path}.{os.getpid()}.repair"
+    writer = Mp3PassthroughWriter(tmp_path, pause_ms=index["pause_ms"])
+    spans = []
+
+    with open(output_path, "rb") as f, metrics.timer("repair.splice", items=len(replacements)) as timer:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # Replacements take the book's stream parameters from the first chunk that is kept
+            params = None
+            for i, row in enumerate(index["chunks"]):
+                header = parse_frame_header(data, row[4]) if i not in skip and row[4] < row[5] else None
+                if header is not None:
+                    params = stream_params(header)
+                    bitrate = header.bitrate
+                    break
+
+            for i, row in enumerate(index["chunks"]):
+                if i in replacements:
+                    conformed = conform_chunk(replacements[i], params, bitrate if params else index["bitrate"])
+                    chunk = conformed[0] if conformed is not None else None
+                elif i in skip:
+                    chunk = None
+                else:
+                    chunk = data[row[4]:row[5]]
+
+                if chunk is None or not writer.append(chunk):
+                    spans.append(None)
+                    continue
+                spans.append(writer.spans[-1])
+                timer.add(bytes=len(chunk))
+
+            if not writer.close():
+                return None
+            texts = [(row[1] - row[0], text_hash) for row, text_hash in zip(index["chunks"], index["text_sha256"])]
+            new_index = build_index(output_path, writer, texts, spans)
+        except Exception:
+            writer.abort()
+            raise
+        finally:
+            data.close()
+
+    new_index["bytes"] = os.path.getsize(tmp_path)
+    os.replace(tmp_path, output_path)
+    write_index(output_path, new_index)
+    print(f"Spliced {len(replacements)} chunks into {output_path} "
+          f"({writer.passthrough_chunks} chunks copied, {writer.transcoded_chunks} re-encoded)")
+    return new_index
@@ -0,0 +1,43 @@
+"""
+Tests for the LRU audio cache
+"""
+
+import os
+import threading
+
+import pytest
+
+audio_cache = pytest.importorskip("utils.audio_cache")
+AudioCache = audio_cache.AudioCache
+
+def test_pinned_entries_survive_concurrent_eviction(tmp_path):
+    """Entries pinned by put() and get_path() are never evicted by other threads."""
+    cache = AudioCache(cache_dir=str(tmp_path / "cache"), max_size_mb=2 / 1024)
+    cache.put(cache.make_key("old", "voice"), b"o" * 512)
+    pinned = []
+    evicted = []
+
+    def worker(number):
+        for i in range(25):
+            key = cache.make_key(f"{number}-{i}", "voice")
+            path = cache.put(key, os.urandom(512), pin=True)
+            pinned.append(path)
+            if cache.get_path(key, pin=True) != path:
+                evicted.append(path)
+            pinned.append(path)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not evicted
+    assert all(os.path.exists(path) for path in pinned)
+    assert cache.get_path(cache.make_key("old", "voice")) is None
+
+    # Released entries are evicted again once the cache is written to
+    for path in pinned:
+        cache.unpin(path)
+    cache.put(cache.make_key("new", "voice"), b"n" * 512)
+    assert cache.size() <= cache.max_size_bytes
@@ -0,0 +1,48 @@
+"""
+Tests for the synthesis pipeline, run against benchmarks/mock_murf_server.py
+"""
+
+import os
+import sys
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pipeline = pytest.importorskip("utils.pipeline")
+from utils.murf_api import MurfAPI
+from utils.mp3_utils import Mp3PassthroughWriter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from mock_murf_server import start_server, LatencyModel
+
+@pytest.fixture
+def server(monkeypatch):
+    server = start_server(latency=LatencyModel("fixed", base_ms=5, per_char_ms=0.0))
+    monkeypatch.setenv("MURF_API_BASE_URL", server.base_url)
+    monkeypatch.setenv("MURF_API_KEY", "test")
+    yield server
+    server.shutdown()
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for number in range(pages):
+        text = " ".join(f"Page {number} sentence {i} is read aloud." for i in range(8))
+        doc.new_page().insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=10)
+    doc.save(path)
+
+def test_stream_stops_synthesis_when_append_fails(server, tmp_path, monkeypatch):
+    """Once the audiobook cannot be written, no further chunks are synthesized."""
+    pdf_path = str(tmp_path / "book.pdf")
+    make_pdf(pdf_path, 60)
+    append = Mp3PassthroughWriter.append
+
+    def failing_append(writer, data):
+        return writer.segments_written < 2 and append(writer, data)
+
+    monkeypatch.setattr(Mp3PassthroughWriter, "append", failing_append)
+    ok = pipeline.stream_pdf_to_audiobook(pdf_path, str(tmp_path / "book.mp3"), chunk_size=300,
+                                          synth_workers=1, api=MurfAPI())
+
+    assert not ok
+    # The third chunk fails; at most the requests read ahead of it were already made
+    assert server.counters["generate"] <= 3 + 4
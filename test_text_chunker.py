@@ -0,0 +1,38 @@
+"""
+Tests for the streaming text chunker
+"""
+
+import pytest
+
+text_chunker = pytest.importorskip("utils.text_chunker")
+iter_chunks = text_chunker.iter_chunks
+iter_chunks_from_stream = text_chunker.iter_chunks_from_stream
+
+def test_stream_without_sentence_boundaries():
+    """Text without any sentence punctuation is chunked as the pages arrive."""
+    page = " ".join(["word"] * 500)
+    read = []
+
+    def pages():
+        for i in range(100):
+            read.append(i)
+            yield page
+
+    chunks = iter_chunks_from_stream(pages(), 1000)
+    first = next(chunks)
+    assert len(read) < 5
+    assert len(first.text) <= 1000
+
+    rest = list(chunks)
+    assert len(read) == 100
+    assert [first] + rest == list(iter_chunks(" ".join([page] * 100), 1000))
+
+def test_stream_matches_joined_text():
+    """Overlong sentences split across pages give the same chunks as the joined text."""
+    pages = [
+        "Short one. " + " ".join(["long"] * 60),
+        " ".join(["more"] * 40) + ". Then a short sentence.",
+        "Another! " + " ".join(["tail"] * 30),
+    ]
+    for max_length in (20, 50, 120):
+        assert list(iter_chunks_from_stream(pages, max_length)) == list(iter_chunks(" ".join(pages), max_length))
@@ -0,0 +1,269 @@
+import hashlib
+import itertools
+import re
+import unicodedata
+import zlib
+from collections import namedtuple
+
+# A chunk of text together with its character offsets in the source text,
+# so that text == source[start:end]
+TextChunk = namedtuple("TextChunk", ["text", "start", "end"])
+
+# Whitespace following terminal punctuation (used by audio_utils.split_text)
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# A single space following a period (used by murf_api.split_text_for_tts)
+PERIOD_BOUNDARY = re.compile(r'(?<=\.) ')
+
+_WORD = re.compile(r'\S+')
+
+# On average one sentence in this many ends a chunk in iter_anchored_chunks
+ANCHOR_EVERY = 8
+
+def _strip_span(text, start, end):
+    """Move span offsets inwards past leading and trailing whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def _split_at_words(text, start, end, max_length):
+    """Split an overlong span at word boundaries, yielding (start, end) offsets."""
+    chunk_start = chunk_end = None
+    for word in _WORD.finditer(text, start, end):
+        if chunk_start is None:
+            chunk_start, chunk_end = word.span()
+        elif word.end() - chunk_start <= max_length:
+            chunk_end = word.end()
+        else:
+            yield chunk_start, chunk_end
+            chunk_start, chunk_end = word.span()
+
+    if chunk_start is not None:
+        yield chunk_start, chunk_end
+
+def _emit(text, start, end, max_length):
+    """
+    Yield (start, end, unit_start) spans for one packed run of sentences.
+
+    unit_start is the unstripped offset where the packed run begins, shared
+    by every piece of a sentence that had to be split at words.
+    """
+    unit_start = start
+    start, end = _strip_span(text, start, end)
+    if start == end:
+        return
+
+    if end - start <= max_length:
+        yield start, end, unit_start
+        return
+
+    # A single sentence is longer than a chunk, so split it at word boundaries
+    for word_start, word_end in _split_at_words(text, start, end, max_length):
+        yield word_start, word_end, unit_start
+
+def _iter_chunk_spans(text, max_length, boundary):
+    """Pack sentences greedily, yielding (start, end, unit_start) spans."""
+    next_limit = max_length if callable(max_length) else (lambda: max_length)
+    limit = next_limit()
+    chunk_start = sentence_start = 0
+    chunk_end = None
+
+    for match in boundary.finditer(text):
+        sentence_end = match.start()
+        if chunk_end is not None and sentence_end - chunk_start > limit:
+            yield from _emit(text, chunk_start, chunk_end, limit)
+            chunk_start = sentence_start
+            # Asked again only once the consumer wants the next chunk
+            limit = next_limit()
+        chunk_end = sentence_end
+        sentence_start = match.end()
+
+    if chunk_end is not None and len(text) - chunk_start > limit:
+        yield from _emit(text, chunk_start, chunk_end, limit)
+        chunk_start = sentence_start
+        limit = next_limit()
+
+    yield from _emit(text, chunk_start, len(text), limit)
+
+def iter_chunks(text, max_length=3000, boundary=SENTENCE_BOUNDARY):
+    """
+    Split text into chunks lazily, breaking at sentence boundaries.
+
+    Sentences are packed greedily into chunks of at most ``max_length``
+    characters. A sentence longer than that is split at word boundaries, and
+    a single word longer than that becomes a chunk of its own. Only running
+    offsets are tracked while packing, so the work is linear in the length
+    of the text.
+
+    ``max_length`` can also be a callable returning the limit, such as an
+    AdaptiveChunkSizer. It is called again each time a new chunk starts, so
+    the size can change while the text is being consumed.
+
+    Args:
+        text (str): Text to split
+        max_length (int or callable): Maximum length of each chunk
+        boundary (re.Pattern): Pattern matching the separators between sentences
+
+    Yields:
+        TextChunk: Chunk text with its start and end offsets in ``text``
+    """
+    for start, end, _ in _iter_chunk_spans(text, max_length, boundary):
+        yield TextChunk(text[start:end], start, end)
+
+def _is_anchor(text, start, end, anchor_every):
+    """Decide from a sentence's own content whether a chunk may end after it."""
+    start, end = _strip_span(text, start, end)
+    return zlib.crc32(text[start:end].encode("utf-8")) % anchor_every == 0
+
+def iter_anchored_chunks(text, max_length=3000, boundary=SENTENCE_BOUNDARY,
+                         anchor_every=ANCHOR_EVERY, min_length=None):
+    """
+    Split text into chunks whose boundaries depend only on nearby content.
+
+    Greedy packing moves every later boundary when one sentence changes
+    length, so a small edit changes every chunk after it. Here a chunk also
+    ends after any "anchor" sentence, chosen by a hash of the sentence
+    itself, once the chunk holds at least ``min_length`` characters. An
+    edit then only changes the chunks up to the next anchor, and the rest
+    come out identical, which lets their audio be reused. Chunks are
+    shorter on average than with iter_chunks.
+
+    Args:
+        text (str): Text to split
+        max_length (int or callable): Maximum length of each chunk
+        boundary (re.Pattern): Pattern matching the separators between sentences
+        anchor_every (int): One sentence in this many is an anchor, on average
+        min_length (int): Shortest chunk that may end at an anchor,
+            half the maximum length by default
+
+    Yields:
+        TextChunk: Chunk text with its start and end offsets in ``text``
+    """
+    next_limit = max_length if callable(max_length) else (lambda: max_length)
+    limit = next_limit()
+    chunk_start = sentence_start = 0
+    chunk_end = None
+
+    # (end of sentence, start of the next one), with the end of the text last
+    separators = itertools.chain(
+        (match.span() for match in boundary.finditer(text)),
+        [(len(text), len(text))]
+    )
+
+    for sentence_end, next_start in separators:
+        if chunk_end is not None and sentence_end - chunk_start > limit:
+            for start, end, _ in _emit(text, chunk_start, chunk_end, limit):
+                yield TextChunk(text[start:end], start, end)
+            chunk_start = sentence_start
+            limit = next_limit()
+
+        chunk_end = sentence_end
+        shortest = limit // 2 if min_length is None else min_length
+        if chunk_end - chunk_start >= shortest and _is_anchor(text, sentence_start, sentence_end, anchor_every):
+            for start, end, _ in _emit(text, chunk_start, chunk_end, limit):
+                yield TextChunk(text[start:end], start, end)
+            chunk_start = next_start
+            chunk_end = None
+            limit = next_limit()
+        sentence_start = next_start
+
+    if chunk_end is not None:
+        for start, end, _ in _emit(text, chunk_start, chunk_end, limit):
+            yield TextChunk(text[start:end], start, end)
+
+def iter_chunks_from_stream(pieces, max_length=3000, boundary=SENTENCE_BOUNDARY, separator=" "):
+    """
+    Chunk text that arrives in pieces, such as pages, without joining it first.
+
+    The chunks and offsets are the same as iter_chunks would produce for
+    ``separator.join(pieces)`` with a fixed ``max_length``. Only the current
+    piece and the unfinished chunk carried over from the previous one are
+    held in memory; a sentence longer than a chunk yields its pieces as
+    soon as they are complete, so text without sentence boundaries is
+    chunked as it arrives.
+
+    Args:
+        pieces (iterable): Pieces of text in order; generators are consumed lazily
+        max_length (int or callable): Maximum length of each chunk
+        boundary (re.Pattern): Pattern matching the separators between sentences
+        separator (str): Text placed between consecutive pieces
+
+    Yields:
+        TextChunk: Chunk text with its offsets in the joined text
+    """
+    pending = ""
+    offset = 0
+    first = True
+    # Limit of the overlong sentence whose unfinished end is pending, if any
+    split_limit = None
+
+    for piece in pieces:
+        buffer = pending + (piece if first else separator + piece)
+        first = False
+
+        if split_limit is not None:
+            # The rest of a sentence split at words runs to the next boundary
+            # and is never packed together with the sentences after it
+            match = boundary.search(buffer)
+            words = list(_split_at_words(buffer, 0, match.start() if match else len(buffer), split_limit))
+            if match is None:
+                # Only the last piece may still grow with the next piece
+                for word_start, word_end in words[:-1]:
+                    yield TextChunk(buffer[word_start:word_end], offset + word_start, offset + word_end)
+                unit_start = words[-1][0] if words else 0
+                pending = buffer[unit_start:]
+                offset += unit_start
+                continue
+
+            for word_start, word_end in words:
+                yield TextChunk(buffer[word_start:word_end], offset + word_start, offset + word_end)
+            split_limit = None
+            buffer = buffer[match.end():]
+            offset += match.end()
+
+        # The last packed run may still grow with the next piece, so every
+        # chunk belonging to it is held back
+        held = []
+        for start, end, unit_start in _iter_chunk_spans(buffer, max_length, boundary):
+            if held and held[0][2] != unit_start:
+                for held_start, held_end, _ in held:
+                    yield TextChunk(buffer[held_start:held_end], offset + held_start, offset + held_end)
+                held = []
+            held.append((start, end, unit_start))
+
+        if len(held) > 1:
+            # A run split at words is one overlong sentence, and every piece
+            # but the last is final, so text without sentence boundaries
+            # does not pile up
+            for held_start, held_end, _ in held[:-1]:
+                yield TextChunk(buffer[held_start:held_end], offset + held_start, offset + held_end)
+            split_limit = max_length() if callable(max_length) else max_length
+            unit_start = held[-1][0]
+        else:
+            # Text with no chunks yet is only whitespace, and is kept because
+            # it still counts towards the length of the next chunk
+            unit_start = held[0][2] if held else 0
+        pending = buffer[unit_start:]
+        offset += unit_start
+
+    for chunk in iter_chunks(pending, max_length, boundary):
+        yield TextChunk(chunk.text, offset + chunk.start, offset + chunk.end)
+
+def fingerprint_chunk(text):
+    """
+    Fingerprint a chunk so that repeats of the same text are recognized.
+
+    The text is NFKC-normalized and runs of whitespace are collapsed, so
+    a running header or notice matches however the PDF laid it out; case
+    and punctuation are kept, since they change how the text is read.
+
+    Args:
+        text (str): Text of the chunk
+
+    Returns:
+        str: SHA-256 of the normalized text
+    """
+    normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()